@@ -0,0 +1,51 @@
+"""Benchmarks payload generation and restore of hcpb02 backups at the 100k block scale
+
+QR-Code rendering is not part of this benchmark (see bench_qr_rendering.py), it measures the
+block payload encoding and the restore data structures (parsing, block store, missing block queries).
+
+Usage: python benchmarks/bench_large_format.py [amount of blocks, defaults to 100000] [block size, defaults to 500]
+"""
+
+import os
+import sys
+import time
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from paperstorage import PaperStorage
+from paperstorage.encoding import encodeBlockPayload
+
+
+if (__name__ == '__main__'):
+	_amountOfBlocks = int(sys.argv[1]) if (len(sys.argv) > 1) else 100000
+	_blockSize = int(sys.argv[2]) if (len(sys.argv) > 2) else 500
+	_data = os.urandom(_amountOfBlocks * _blockSize)
+	_document = PaperStorage(_data, blockSize=_blockSize, formatVersion=2)
+	print(f'{_amountOfBlocks} blocks of {_blockSize} bytes ({len(_data) / (1 << 20):.1f} MiB)')
+
+	_start = time.perf_counter()
+	_payloads = [encodeBlockPayload(n, _document._documentID, _data[(n * _blockSize) : ((n + 1) * _blockSize)], 2) for n in range(_amountOfBlocks)]
+	_time = time.perf_counter() - _start
+	print(f'{"payload generation":<28} {_time:>8.2f} s {(_amountOfBlocks / _time):>12.0f} blocks/s')
+
+	random.shuffle(_payloads) # pages are scanned in any order
+	_restored = PaperStorage()
+	_restored.restoreFromQRString(f'hcpb02,{_document._documentID.decode("ascii")},QmVuY2htYXJr,{len(_data)},{_blockSize},0')
+	_start = time.perf_counter()
+	for _payload in _payloads:
+		_restored.restoreFromQRString(_payload)
+		_restored.getMissingDataBlockCount() # like an interactive restore, after every code
+	_time = time.perf_counter() - _start
+	print(f'{"restore (parse + store)":<28} {_time:>8.2f} s {(_amountOfBlocks / _time):>12.0f} blocks/s')
+
+	_start = time.perf_counter()
+	_ready = _restored.isDataReady() and (_restored.getData() == _data)
+	print(f'{"assemble + verify":<28} {(time.perf_counter() - _start):>8.2f} s {"ok" if _ready else "FAILED":>12}')
+
+	_partial = PaperStorage()
+	_partial.restoreFromQRString(f'hcpb02,{_document._documentID.decode("ascii")},QmVuY2htYXJr,{len(_data)},{_blockSize},0')
+	for _payload in _payloads[::3]:
+		_partial.restoreFromQRString(_payload)
+	_start = time.perf_counter()
+	for n in range(100):
+		_partial.getMissingDataBlockRanges()
+	print(f'{"missing ranges (2/3 missing)":<28} {((time.perf_counter() - _start) / 100):>8.4f} s per call')
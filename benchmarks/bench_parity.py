@@ -0,0 +1,47 @@
+"""Benchmarks parity block encoding and the rebuild of missing blocks at large block counts
+
+QR-Code rendering is not part of this benchmark (see bench_qr_rendering.py), it measures the
+calculation of the parity blocks and a restore with one missing block in every parity group.
+
+Usage: python benchmarks/bench_parity.py [amount of blocks, defaults to 100000] [parity group size, defaults to 10] [block size, defaults to 1500]
+"""
+
+import os
+import sys
+import time
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from paperstorage import PaperStorage
+from paperstorage.blockstore import xorBlocks
+from paperstorage.encoding import encodeBlockPayload, encodeParityPayload
+
+
+if (__name__ == '__main__'):
+	_amountOfBlocks = int(sys.argv[1]) if (len(sys.argv) > 1) else 100000
+	_groupSize = int(sys.argv[2]) if (len(sys.argv) > 2) else 10
+	_blockSize = int(sys.argv[3]) if (len(sys.argv) > 3) else 1500
+	_data = os.urandom(_amountOfBlocks * _blockSize)
+	_blocks = [_data[n : (n + _blockSize)] for n in range(0, len(_data), _blockSize)]
+	_document = PaperStorage(_data, blockSize=_blockSize, parityGroupSize=_groupSize)
+	print(f'{_amountOfBlocks} blocks of {_blockSize} bytes ({len(_data) / (1 << 20):.1f} MiB), one parity block per {_groupSize} blocks')
+
+	_start = time.perf_counter()
+	_parityBlocks = [xorBlocks(_blocks[n : (n + _groupSize)], _blockSize) for n in range(0, _amountOfBlocks, _groupSize)]
+	_time = time.perf_counter() - _start
+	print(f'{"parity encoding":<28} {_time:>8.2f} s {(len(_data) / (1 << 20) / _time):>10.1f} MiB/s')
+
+	_payloads = [encodeBlockPayload(n, _document._documentID, _blocks[n], 2) for n in range(_amountOfBlocks) if ((n % _groupSize) != (n // _groupSize) % _groupSize)] # one block lost per group
+	_payloads += [encodeParityPayload(n, _document._documentID, _parity) for n, _parity in enumerate(_parityBlocks)]
+	random.shuffle(_payloads) # pages are scanned in any order
+	_restored = PaperStorage()
+	_restored.restoreFromQRString(f'hcpb02,{_document._documentID.decode("ascii")},QmVuY2htYXJr,{len(_data)},{_blockSize},0,p={_groupSize}')
+	_start = time.perf_counter()
+	for _payload in _payloads:
+		_restored.restoreFromQRString(_payload)
+	_ready = _restored.isDataReady()
+	_time = time.perf_counter() - _start
+	print(f'{"restore + rebuild":<28} {_time:>8.2f} s {(len(_payloads) / _time):>10.0f} codes/s, {len(_parityBlocks)} blocks rebuilt')
+
+	_start = time.perf_counter()
+	_ready = _ready and (_restored.getData() == _data)
+	print(f'{"assemble + verify":<28} {(time.perf_counter() - _start):>8.2f} s {"ok" if _ready else "FAILED":>10}')
@@ -0,0 +1,28 @@
+"""Compares render time and PDF size of raster and vector QR-Codes
+
+Usage: python benchmarks/bench_qr_rendering.py [size in KiB, defaults to 150]
+"""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from paperstorage import PaperStorage
+
+
+def benchmark(data: bytes, vectorQRCodes: bool) -> (float, int):
+	_ps = PaperStorage(data, writeDate=False, writeHostname=False, vectorQRCodes=vectorQRCodes)
+	_start = time.perf_counter()
+	_pdf = _ps.getPDF()
+	return (time.perf_counter() - _start, len(_pdf))
+
+
+if (__name__ == '__main__'):
+	_size = int(sys.argv[1]) if (len(sys.argv) > 1) else 150
+	_data = os.urandom(_size * 1024)
+	_pages = -(-len(_data) // 1500) + 1
+	print(f'{_size} KiB of random data, {_pages} pages')
+	print(f'{"mode":<8} {"time (s)":>10} {"pages/s":>10} {"pdf size (KiB)":>16}')
+	for _mode, _vector in (('raster', False), ('vector', True)):
+		_time, _pdfSize = benchmark(_data, _vector)
+		print(f'{_mode:<8} {_time:>10.2f} {(_pages / _time):>10.1f} {(_pdfSize / 1024):>16.1f}')
@@ -0,0 +1,57 @@
+"""Compares the decode time of high-dpi page scans with and without locating the QR-Code region first
+
+Without a folder, synthetic 600 dpi A4 pages are used: the data QR-Code at the position __renderPDF
+prints it, the header and footer lines and Base32-like text below it. Requires pillow and pyzbar.
+
+Usage: python benchmarks/bench_region.py [folder with scans, defaults to synthetic pages] [amount of synthetic pages, defaults to 5]
+"""
+
+import os
+import sys
+import time
+import PIL.Image
+import PIL.ImageDraw
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from paperstorage import PaperStorage, DecodeLadder
+from paperstorage.encoding import encodeQRMatrix, encodeBlockPayload
+
+
+def syntheticPage(document: PaperStorage, blockID: int, dpi: int = 600) -> PIL.Image.Image:
+	_scale = dpi / 72 # pixel per point
+	_page = PIL.Image.new('L', (round(210 / 25.4 * dpi), round(297 / 25.4 * dpi)), 255)
+	_draw = PIL.ImageDraw.Draw(_page)
+	_left, _top, _right, _bottom = document.getQRRegionHint()
+	_qrSize = (_bottom - _top) * _page.height
+	_matrix = encodeQRMatrix(encodeBlockPayload(blockID, document._documentID, os.urandom(1500), 1))
+	_module = _qrSize / len(_matrix)
+	_wPos = ((_page.width - _qrSize) / 2)
+	for y, _row in enumerate(_matrix):
+		for x, _dark in enumerate(_row):
+			if (_dark): _draw.rectangle((_wPos + (x * _module), (_top * _page.height) + (y * _module), _wPos + ((x + 1) * _module) - 1, (_top * _page.height) + ((y + 1) * _module) - 1), fill=0)
+	_lineHeight = document._fontsize * 1.15 * _scale
+	for _hPos in [2 * _lineHeight] + [(_bottom * _page.height) + (n * _lineHeight) for n in range(1, 28)] + [_page.height - (3 * _lineHeight)]:
+		_draw.text((_left * _page.width, _hPos), 'MFRGGZDFMZTWQ2LKNNWG23TPOBYXE43UOV3HO6DZPJQWEY3EMVTGO2DJNJVWY3LON5YHC' * 2, fill=0)
+	return _page
+
+
+def benchmark(images: list, ladder: DecodeLadder) -> (float, int):
+	_start = time.perf_counter()
+	_codes = sum(len(ladder.decode(n)) for n in images)
+	return (time.perf_counter() - _start, _codes)
+
+
+if (__name__ == '__main__'):
+	_folder = sys.argv[1] if ((len(sys.argv) > 1) and os.path.isdir(sys.argv[1])) else None
+	_document = PaperStorage(bytes(1500))
+	if (_folder is None):
+		_amount = int(sys.argv[1]) if (len(sys.argv) > 1) else 5
+		_images = [syntheticPage(_document, n) for n in range(_amount)]
+		print(f'{_amount} synthetic pages of {_images[0].width} x {_images[0].height} pixel')
+	else:
+		_images = [PIL.Image.open(os.path.join(_folder, n)) for n in sorted(os.listdir(_folder))]
+		for n in _images: n.load()
+		print(f'{len(_images)} images from \'{_folder}\'')
+	print(f'{"mode":<14} {"time (s)":>10} {"ms / image":>12} {"codes":>7}')
+	for _mode, _ladder in (('full image', DecodeLadder(('plain',))), ('region first', DecodeLadder(('plain',), _document.getQRRegionHint()))):
+		_time, _codes = benchmark(_images, _ladder)
+		print(f'{_mode:<14} {_time:>10.2f} {(1000 * _time / len(_images)):>12.1f} {_codes:>7}')
@@ -0,0 +1,63 @@
+"""Benchmarks the startup of the command line tool along the generation and restore paths
+
+Every path is run in fresh interpreters with python -X importtime. The wall time of the whole run
+(best of all runs) and the time spent importing modules are reported, with the heaviest top level
+imports, to see which dependencies a path loads.
+
+Usage: python benchmarks/bench_startup.py [runs per path, defaults to 10] [heaviest imports listed, defaults to 5]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+
+def importTimes(stderr: str) -> dict:
+	"""
+	Returns the cumulative import time in microseconds of every top level import, by module name
+	"""
+	_times = {}
+	for _line in stderr.splitlines():
+		if (not _line.startswith('import time:')): continue
+		_self, _cumulative, _name = _line[len('import time:'):].split('|')
+		if (_name.startswith('  ') or (not _cumulative.strip().isdigit())): continue # nested imports are part of the cumulative time
+		_times[_name.strip()] = int(_cumulative)
+	return _times
+
+
+def benchmarkPath(arguments: list, runs: int) -> tuple:
+	"""
+	Runs the command line tool with the given arguments
+
+	Returns a tuple with the best wall time in seconds and the import times of the fastest run
+	"""
+	_best, _times = None, None
+	for n in range(runs):
+		_start = time.perf_counter()
+		_result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+			cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+		_time = time.perf_counter() - _start
+		if ((_best is None) or (_time < _best)): _best, _times = _time, importTimes(_result.stderr)
+	return _best, _times
+
+
+if (__name__ == '__main__'):
+	_runs = int(sys.argv[1]) if (len(sys.argv) > 1) else 10
+	_listed = int(sys.argv[2]) if (len(sys.argv) > 2) else 5
+	with tempfile.TemporaryDirectory() as _folder:
+		with open(os.path.join(_folder, 'input'), 'wb') as _file:
+			_file.write(os.urandom(1024))
+		os.mkdir(os.path.join(_folder, 'scans'))
+		_paths = {
+			'import': ['-c', 'import paperstorage'],
+			'help': ['-m', 'paperstorage', '--help'],
+			'restore': ['-m', 'paperstorage', '-restore', os.path.join(_folder, 'scans')], # no scans, only the startup is measured
+			'generation': ['-m', 'paperstorage', '-f', os.path.join(_folder, 'input'), '-o', os.path.join(_folder, 'output.pdf')]
+		}
+		print(f'{"path":<12} {"wall":>9} {"imports":>9}   heaviest imports (ms)')
+		for _name, _arguments in _paths.items():
+			_wall, _times = benchmarkPath(_arguments, _runs)
+			_heaviest = sorted(_times.items(), key=lambda n: n[1], reverse=True)[:_listed]
+			print(f'{_name:<12} {(_wall * 1000):>7.1f}ms {(sum(_times.values()) / 1000):>7.1f}ms   {", ".join(f"{n} {(t / 1000):.1f}" for n, t in _heaviest)}')
@@ -0,0 +1,163 @@
+"""Benchmarks backup generation and restore throughput and writes the results as JSON
+
+Generation: getPDF pages/s, bytes/s, PDF size and peak memory (Python allocations, traced in a
+separate run) for every combination of data size and block size. Restore: images/s and decode
+success rate of synthetic scans, made by rendering block payloads to images and adding noise,
+blur, rotation or fading. The restore part requires pyzbar and is skipped without it.
+
+Pass the JSON file of an earlier run with --compare to list regressions, the exit code is 1 if a
+throughput dropped by more than the tolerance or a success rate dropped at all.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1K,64K,256K] [--block-sizes 50,500,1500] [--max-pages 500]
+                                        [--scans 20] [--no-memory] [-o results.json] [--compare baseline.json] [--tolerance 0.25]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import datetime
+import tracemalloc
+import PIL.Image
+import PIL.ImageFilter
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from paperstorage import PaperStorage, DecodeLadder
+from paperstorage.encoding import encodeQRMatrix, encodeBlockPayload
+
+
+PROFILES = ('clean', 'noise', 'blur', 'rotate', 'faded', 'combined')
+
+
+def parseSize(size: str) -> int:
+	_units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+	size = size.strip().upper()
+	return int(float(size[:-1]) * _units[size[-1]]) if (size[-1] in _units) else int(size)
+
+
+def benchmarkGeneration(dataSize: int, blockSize: int, memory: bool) -> dict:
+	_data = random.Random(dataSize).randbytes(dataSize) # incompressible, but the same for every run
+	_ps = PaperStorage(_data, blockSize=blockSize, writeDate=False, writeHostname=False)
+	_pages = _ps.getPageCount()
+	_start = time.perf_counter()
+	_pdf = _ps.getPDF()
+	_time = time.perf_counter() - _start
+	_result = {'dataSize': dataSize, 'blockSize': blockSize, 'pages': _pages, 'seconds': round(_time, 4),
+		'pagesPerSecond': round(_pages / _time, 2), 'bytesPerSecond': round(dataSize / _time, 1), 'pdfSize': len(_pdf), 'peakMemory': None}
+	if (memory): # traced separately, tracing slows down the rendering
+		_ps = PaperStorage(_data, blockSize=blockSize, writeDate=False, writeHostname=False)
+		tracemalloc.start()
+		_ps.getPDF()
+		_result['peakMemory'] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+	return _result
+
+
+def syntheticScan(payload: str, profile: str, seed: int) -> PIL.Image.Image:
+	"""
+	Renders a block payload as it would appear on a scanned page and degrades it according to the profile
+	"""
+	_random = random.Random(seed)
+	_matrix = encodeQRMatrix(payload, True)
+	_modules = len(_matrix) + 8 # quiet zone
+	_image = PIL.Image.new('L', (_modules, _modules), 255)
+	_image.putdata([(0 if ((0 <= (y - 4) < len(_matrix)) and (0 <= (x - 4) < len(_matrix)) and _matrix[y - 4][x - 4]) else 255) for y in range(_modules) for x in range(_modules)])
+	_image = _image.resize((_modules * 6, _modules * 6), PIL.Image.NEAREST) # 6 pixel per module, about a 300 dpi scan of a full page QR-Code
+	if (profile in ('faded', 'combined')):
+		_image = _image.point(lambda p: 130 + ((p * 90) // 255))
+	if (profile in ('blur', 'combined')):
+		_image = _image.filter(PIL.ImageFilter.GaussianBlur(2 if (profile == 'blur') else 1))
+	if (profile in ('rotate', 'combined')):
+		_image = _image.rotate(_random.uniform(-5, 5), PIL.Image.BILINEAR, expand=True, fillcolor=255)
+	if (profile in ('noise', 'combined')):
+		_noise = PIL.Image.frombytes('L', _image.size, _random.randbytes(_image.width * _image.height))
+		_image = PIL.Image.blend(_image, _noise, 0.3 if (profile == 'noise') else 0.15)
+	return _image
+
+
+def benchmarkRestore(profile: str, amount: int) -> dict:
+	_document = PaperStorage(bytes(1500), formatVersion=2)
+	_random = random.Random(amount)
+	_payloads = [encodeBlockPayload(n, _document._documentID, _random.randbytes(1500), 2) for n in range(amount)]
+	_scans = [syntheticScan(_payload, profile, n) for n, _payload in enumerate(_payloads)]
+	_ladder = DecodeLadder()
+	_decoded = 0
+	_start = time.perf_counter()
+	for _payload, _scan in zip(_payloads, _scans):
+		if (_payload in _ladder.decode(_scan)): _decoded += 1
+	_time = time.perf_counter() - _start
+	return {'profile': profile, 'images': amount, 'seconds': round(_time, 4), 'imagesPerSecond': round(amount / _time, 2),
+		'successRate': round(_decoded / amount, 4), 'steps': _ladder.stats()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+	"""
+	Returns a list of messages, one for every regression of results against baseline
+	"""
+	_regressions = []
+	_previous = {(n['dataSize'], n['blockSize']): n for n in baseline.get('generation', [])}
+	for n in results['generation']:
+		_old = _previous.get((n['dataSize'], n['blockSize']))
+		if ((_old is not None) and (n['pagesPerSecond'] < (_old['pagesPerSecond'] * (1 - tolerance)))):
+			_regressions.append(f'generation {n["dataSize"]} bytes / block size {n["blockSize"]}: {_old["pagesPerSecond"]} -> {n["pagesPerSecond"]} pages/s')
+		if ((_old is not None) and (n['peakMemory'] is not None) and (_old['peakMemory'] is not None) and (n['peakMemory'] > (_old['peakMemory'] * (1 + tolerance)))):
+			_regressions.append(f'generation {n["dataSize"]} bytes / block size {n["blockSize"]}: peak memory {_old["peakMemory"]} -> {n["peakMemory"]} bytes')
+	_previous = {n['profile']: n for n in baseline.get('restore', [])}
+	for n in results['restore']:
+		_old = _previous.get(n['profile'])
+		if (_old is None): continue
+		if (n['imagesPerSecond'] < (_old['imagesPerSecond'] * (1 - tolerance))):
+			_regressions.append(f'restore {n["profile"]}: {_old["imagesPerSecond"]} -> {n["imagesPerSecond"]} images/s')
+		if (n['successRate'] < _old['successRate']):
+			_regressions.append(f'restore {n["profile"]}: success rate {_old["successRate"]} -> {n["successRate"]}')
+	return _regressions
+
+
+if (__name__ == '__main__'):
+	parser = argparse.ArgumentParser('bench_suite')
+	parser.add_argument('--sizes', default='1K,64K,256K', help='data sizes, e.g. 1K,1M,32M')
+	parser.add_argument('--block-sizes', dest='blockSizes', default='50,500,1500', help='block sizes between 50 and 1500')
+	parser.add_argument('--max-pages', dest='maxPages', type=int, default=500, help='skip combinations with more pages')
+	parser.add_argument('--scans', type=int, default=20, help='synthetic scans per restore profile, 0 to skip the restore part')
+	parser.add_argument('--no-memory', dest='noMemory', action='store_true', default=False, help='do not measure the peak memory')
+	parser.add_argument('-o', dest='output', default=None, help='write the results to this JSON file instead of stdout')
+	parser.add_argument('--compare', default=None, help='JSON file of an earlier run')
+	parser.add_argument('--tolerance', type=float, default=0.25, help='allowed throughput drop before a regression is reported')
+	arguments = parser.parse_args()
+
+	_results = {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'platform': platform.platform(),
+		'generation': [], 'skipped': [], 'restore': []}
+	for _dataSize in [parseSize(n) for n in arguments.sizes.split(',')]:
+		for _blockSize in [int(n) for n in arguments.blockSizes.split(',')]:
+			if ((math.ceil(_dataSize / _blockSize) + 1) > arguments.maxPages):
+				_results['skipped'].append({'dataSize': _dataSize, 'blockSize': _blockSize})
+				continue
+			_result = benchmarkGeneration(_dataSize, _blockSize, (not arguments.noMemory))
+			_results['generation'].append(_result)
+			print(f'generation {_dataSize:>10} bytes, block size {_blockSize:>4}: {_result["pagesPerSecond"]:>8.1f} pages/s {_result["bytesPerSecond"]:>12.0f} bytes/s', file=sys.stderr)
+
+	if (arguments.scans > 0):
+		try:
+			import pyzbar.pyzbar
+			for _profile in PROFILES:
+				_result = benchmarkRestore(_profile, arguments.scans)
+				_results['restore'].append(_result)
+				print(f'restore {_profile:<10} {_result["imagesPerSecond"]:>8.1f} images/s, {(100 * _result["successRate"]):>5.1f}% decoded', file=sys.stderr)
+		except (ImportError):
+			print('pyzbar missing, restore benchmarks skipped', file=sys.stderr)
+
+	if (arguments.output is None):
+		print(json.dumps(_results, indent='\t'))
+	else:
+		with open(arguments.output, 'w') as _file:
+			json.dump(_results, _file, indent='\t')
+
+	if (arguments.compare is not None):
+		with open(arguments.compare, 'r') as _file:
+			_regressions = compare(_results, json.load(_file), arguments.tolerance)
+		for n in _regressions:
+			print(f'REGRESSION {n}', file=sys.stderr)
+		sys.exit(1 if (len(_regressions) > 0) else 0)
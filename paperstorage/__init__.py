@@ -2,6 +2,8 @@
 A module to create paper backups for arbitrary data that are recoverable by simple means
 """
 
-__all__ = ['PaperStorage']
+__all__ = ['PaperStorage', 'DecodeCache', 'DecodeLadder']
 
-from .paperstorage import PaperStorage
\ No newline at end of file
+from .paperstorage import PaperStorage
+from .decodecache import DecodeCache
+from .decoding import DecodeLadder
\ No newline at end of file
@@ -2,13 +2,49 @@ import argparse
 import sys
 import os
 import hashlib
-from paperstorage import PaperStorage
-import PIL
-import PIL.ImageOps
-try:
-	import pyzbar.pyzbar as pyzbar
-except (ImportError):
-	print('pyzbar could not be loaded. Please doublecheck if zbar (the library, not the python module) is installed on your system. Backup restore will fail until this is resolved.')
+import time
+from paperstorage import PaperStorage, DecodeCache, DecodeLadder
+from paperstorage.instrumentation import StatsCollector
+from paperstorage.planner import MAX_BLOCK_SIZE, planPage, formatPlan
+# pillow, pyzbar, the webcam capture and the batch mode are only imported by the modes that use them
+
+
+def __checkZbar() -> None:
+	try:
+		import pyzbar.pyzbar
+	except (ImportError):
+		print('pyzbar could not be loaded. Please doublecheck if zbar (the library, not the python module) is installed on your system. Backup restore will fail until this is resolved.')
+
+
+def __missingPages(_ps: PaperStorage) -> str:
+	return ','.join([(f'{_first}' if (_first == _last) else f'{_first}-{_last}') for _first, _last in _ps.getMissingPageRanges()])
+
+
+def __newRestore(_checkpoint: str) -> PaperStorage:
+	if (_checkpoint is None): return PaperStorage()
+	try:
+		_ps = PaperStorage.resume(_checkpoint)
+	except (ValueError):
+		print(f'Cannot open the checkpoint file \'{_checkpoint}\'.')
+		quit()
+	if (_ps._identifier is not None):
+		print(f'Resuming the restore of \'{_ps._identifier}\' recorded in \'{_checkpoint}\', {_ps.getMissingDataBlockCount()} data block(s) missing.')
+	return _ps
+
+
+def __removeCheckpoint(_ps: PaperStorage, _checkpoint: str) -> None:
+	if ((_checkpoint is None) or (not _ps.isDataReady())): return
+	_ps.setCheckpoint(None)
+	os.remove(_checkpoint)
+
+
+def __printStats(_collector: StatsCollector, _decodeLadder: DecodeLadder = None) -> None:
+	if (_collector is None): return
+	print(f'\n{_collector.report()}')
+	if ((_decodeLadder is None) or (_collector.stats()['images'] == 0)): return
+	print(f'\n{"decode step":<14} {"attempts":>9} {"successes":>10} {"seconds":>9}')
+	for _step, _counters in _decodeLadder.stats().items():
+		print(f'{_step:<14} {_counters["attempts"]:>9} {_counters["successes"]:>10} {_counters["seconds"]:>9.3f}')
 
 
 def __interactiveSave(_ps: PaperStorage) -> None:
@@ -26,25 +62,27 @@ def __interactiveSave(_ps: PaperStorage) -> None:
 	_file.write(_ps.getData())
 	_file.close()
 
-def __interactiveFolder(_ps: PaperStorage) -> None:
+def __interactiveFolder(_ps: PaperStorage, _workers: int = 1, _decodeCache: DecodeCache = None, _decodeLadder: DecodeLadder = None) -> None:
 	while (True):
 		_folder = input('\nPlease enter the path of the folder you just saved the scans to: ')
 		if (os.path.isdir(_folder)):
 			break
 		print('The path specified is not a folder or does not exist. Please try again.')
-	_ps.restoreFromFolder(_folder)
+	_ps.restoreFromFolder(_folder, workers=_workers, decodeCache=_decodeCache, decodeLadder=_decodeLadder)
 	while (not _ps.isDataReady()):
-		if (_ps.getMissingDataBlocks() == []):
+		if (_ps.getMissingDataBlockCount() == 0):
 			print(f'\nNo valid QR-Codes found. Try making sure the folder name (\'{_folder}\') is correct.\nOtherwise try rescanning the pages with a higher quality setting and try again.')
 			quit()
-		print(f'\nThe backup could not be restored completly. Page(s) {",".join([str(n+2) for n in _ps.getMissingDataBlocks()])} must be rescanned.')
+		print(f'\nThe backup could not be restored completly. Page(s) {__missingPages(_ps)} must be rescanned.')
 		print("It's also possible that paperstorage has difficulties reading non-png images. If you're using a different format, try converting them to png first.")
 		input('Please rescan the listed pages and save them to the same folder as before. Press [Enter] when you are done. ')
-		_ps.restoreFromFolder(_folder)
+		_ps.restoreFromFolder(_folder, workers=_workers, decodeCache=_decodeCache, decodeLadder=_decodeLadder)
 	__interactiveSave(_ps)
 
 
-def __interactiveWebcam(_ps: PaperStorage) -> None:
+def __interactiveWebcam(_ps: PaperStorage, _workers: int = 2) -> None:
+	import PIL.Image
+	from paperstorage.capture import CapturePipeline
 	try:
 		print('')
 		import pygame.camera
@@ -65,50 +103,33 @@ def __interactiveWebcam(_ps: PaperStorage) -> None:
 	_webcamWidth, _webcamHeight = _webcam.get_size()
 
 	print(f'\nUsing webcam \'{_cameras[0]}\' with resolution of {_webcamWidth} x {_webcamHeight}')
-	_ps = PaperStorage()
-
-	print('Please hold the first page into your webcam...\n(Press [CTRL] + [C] to abort)')
+	print('Hold the pages of the backup in front of the webcam, one after another, in any order. Start with the first page if possible.\n(Press [CTRL] + [C] to abort)')
 
-	_lastCode = str()
-	_pageRead = False
-
-	while (not _pageRead):
-		try:
-			_image = PIL.Image.frombytes('RGB', (_webcamWidth, _webcamHeight), pygame.image.tostring(_webcam.get_image(), 'RGB', False))
-			_bwImage = PIL.ImageOps.grayscale(PIL.ImageOps.posterize(PIL.ImageOps.autocontrast(_image), 2))
-			for n in (pyzbar.decode(_image) + pyzbar.decode(_bwImage)):
-				if (n.data.decode('ascii') == _lastCode): continue
-				_lastCode = n.data.decode('ascii')
-				if (n.data.decode('ascii')[:6] != 'hcpb01'):
-					print('\nQR-Code detected, but this is not the first page.\nPlease hold the first page in front of your webcam...')
-					continue
-				_ps.restoreFromQRString(n.data.decode('ascii'))
-				print(f'\nFirst page read! Restoring file \'{_ps._identifier}\' with {_ps._amountOfBlocks + 1} pages')
-				_pageRead = True
-		except (KeyboardInterrupt):
-			quit()
+	def __grabFrame() -> PIL.Image.Image:
+		return PIL.Image.frombytes('RGB', (_webcamWidth, _webcamHeight), pygame.image.tostring(_webcam.get_image(), 'RGB', False))
 
+	_pipeline = CapturePipeline(__grabFrame, workers=_workers)
+	_seenCodes = set()
+	_metaDataRead = (_ps._identifier is not None) # read before, see --checkpoint
 	try:
-		for i in _ps.getMissingDataBlocks():
-			print(f'\nPlease hold page {i + 2} in front of the webcam...')
-			_pageRead = False
-			while (not _pageRead):
-				_image = PIL.Image.frombytes('RGB', (_webcamWidth, _webcamHeight), pygame.image.tostring(_webcam.get_image(), 'RGB', False))
-				_bwImage = PIL.ImageOps.grayscale(PIL.ImageOps.posterize(PIL.ImageOps.autocontrast(_image), 2))
-				for n in (pyzbar.decode(_image) + pyzbar.decode(_bwImage)):
-					if (n.data.decode('ascii') == _lastCode): continue
-					_lastCode = n.data.decode('ascii')
-					_ps.restoreFromQRString(n.data.decode('ascii'))
-					if (i in _ps.getMissingDataBlocks()):
-						print(f'\nQR-Code detected, but this is not page {i + 2}.\nPlease hold page {i + 2} in front of the webcam...')
-						print("If you're sure you're holding the correct page, this may be a bug. Please try other methods of restoring your backup.")
-						continue
-					print(f'\nPage {i + 2} read!')
-					_pageRead = True
+		for _qrStrings in _pipeline.results():
+			for _qrString in _qrStrings:
+				if (_qrString in _seenCodes): continue
+				_seenCodes.add(_qrString)
+				if (not _ps.restoreFromQRString(_qrString)): continue
+				if (_qrString.startswith('hcpb')):
+					_metaDataRead = True
+					print(f'\nFirst page read! Restoring file \'{_ps._identifier}\' with {_ps._amountOfBlocks} data blocks')
+				elif (not _metaDataRead):
+					print('\nData block read. Please also hold the first page in front of the webcam.')
+				elif (_ps.getMissingDataBlockCount() > 0):
+					print(f'\nData block read. Missing page(s): {__missingPages(_ps)}')
+			if (_metaDataRead and _ps.isDataReady()): break
 	except (KeyboardInterrupt):
 		quit()
-
-	_webcam.stop()
+	finally:
+		_pipeline.stop()
+		_webcam.stop()
 
 	__interactiveSave(_ps)
 
@@ -126,23 +147,48 @@ def main() -> None:
 	parser.add_argument('-f', dest='inputFilename', metavar='filename', help='read the specified file, otherwise stdin', required=False)
 	parser.add_argument('-id', dest='identifier', metavar='identifier', help='identifier that will be printed on the backup file', required=False)
 	parser.add_argument('-format', dest='format', choices=['A4','Letter'], default='A4', type=str, help='uses the specified format for the output PDF file')
+	parser.add_argument('-batch', dest='batch', metavar='path', default=None, type=str, help='backs up every file inside a folder or listed in a manifest file (one path per line), one PDF per file into the folder given with -o', required=False)
 	parser.add_argument('--force-from-stdin', dest='forceStdin', action='store_true', default=False, help='forces a read from stdin, even with no piped data available', required=False)
-	parser.add_argument('-restore', dest='restore', metavar='folder_path' ,default=None, type=str, help='restores a backup from scanned images inside a folder', required=False)
+	parser.add_argument('-restore', dest='restore', metavar='folder_path' ,default=None, type=str, help='restores a backup from scanned images inside a folder, or from a single (multi-page TIFF / PDF) scan file', required=False)
 	parser.add_argument('--interactiverestore', dest='interactiveRestore', action='store_true', default=False, help='starts an interactive restore of a backup', required=False)
-	parser.add_argument('-b', dest='blocksize', choices=range(50, 1501, 50), metavar='{50-1500}', type=int, default=1500, help='use a custom block size between 50 bytes and (the default) 1500 bytes', required=False)
+	parser.add_argument('--checkpoint', dest='checkpoint', metavar='filename', default=None, type=str, help='records the progress of a restore in the file and continues the restore recorded in it, the file is removed once the backup is restored', required=False)
+	parser.add_argument('-b', dest='blocksize', choices=range(50, MAX_BLOCK_SIZE + 1, 50), metavar=f'{{50-{MAX_BLOCK_SIZE}}}', type=int, default=1500, help=f'use a custom block size between 50 bytes and {MAX_BLOCK_SIZE} bytes (default 1500), larger blocks than fit onto a page require --no-text', required=False)
+	parser.add_argument('-j', '--jobs', dest='jobs', metavar='N', type=int, nargs='?', const=(os.cpu_count() or 1), default=1, help='encode / decode QR-Codes with N processes, all available cores if N is omitted', required=False)
+	parser.add_argument('--no-decode-cache', dest='noDecodeCache', action='store_true', default=False, help='do not cache the QR-Codes of decoded images between restore runs', required=False)
+	parser.add_argument('--decode-steps', dest='decodeSteps', metavar='STEP,STEP,...', type=str, default=','.join(DecodeLadder.DEFAULT_STEPS), help=f'preprocessing steps tried in order on images without readable QR-Codes, out of {", ".join(DecodeLadder.STEPS)}', required=False)
+	parser.add_argument('--format-version', dest='formatVersion', choices=[1, 2], type=int, default=None, help='use the hcpb01 (up to 65536 blocks) or the hcpb02 format (large backups, 48 bit document ids), chosen automatically by default', required=False)
+	parser.add_argument('--compression', dest='compression', choices=['auto', 'zlib', 'lzma', 'bz2'], default=None, help='compress the data before it is printed, \'auto\' picks the best codec (if any) from a sample of the data', required=False)
+	parser.add_argument('--parity', dest='parityGroupSize', metavar='N', type=int, default=None, help='add a parity page for every N pages, so one missing page out of every N can be rebuilt on restore', required=False)
+	parser.add_argument('--grid', dest='grid', metavar='COLUMNSxROWS', type=str, default=None, help='print a grid of QR-Codes on every page, e.g. 2x2, use with a smaller block size', required=False)
+	parser.add_argument('--no-text', dest='noText', action='store_true', default=False, help='do not print the Base32 encoded data below the QR-Codes', required=False)
+	parser.add_argument('--qr-encoding', dest='qrEncoding', choices=['base64', 'base32'], default='base64', help='encoding of the data inside the QR-Codes, \'base32\' fits more data into a QR-Code for a stronger error correction (hcpb02 format)', required=False)
+	parser.add_argument('--error-correction', dest='errorCorrection', choices=['L', 'M', 'Q', 'H'], default=None, help='minimum error correction level of the QR-Codes, the smallest QR-Code version that holds a block at this level is used (hcpb02 format)', required=False)
+	parser.add_argument('--dpi', dest='dpi', metavar='N', type=int, default=300, help='resolution the pages are printed and scanned with, used by --plan (default 300)', required=False)
+	parser.add_argument('--plan', dest='plan', action='store_true', default=False, help='choose the block size, QR-Code version and error correction level that fit the most data onto a page at --dpi and --error-correction (default M)', required=False)
+	parser.add_argument('--plan-only', dest='planOnly', action='store_true', default=False, help='print the plan of --plan and the expected amount of pages of the input file, without creating a backup', required=False)
+	parser.add_argument('--stats', dest='stats', action='store_true', default=False, help='print the time spent per stage and the throughput at the end', required=False)
+	parser.add_argument('--vector', dest='vectorQRCodes', action='store_true', default=False, help='draw QR-Codes as vector shapes instead of raster images', required=False)
 	arguments = parser.parse_args(argv)
 
 	_ps = None
+	_collector = StatsCollector() if (arguments.stats) else None
+	_decodeCache = None if (arguments.noDecodeCache) else DecodeCache()
+	try:
+		_decodeLadder = DecodeLadder([n.strip() for n in arguments.decodeSteps.split(',') if (n.strip() != '')], PaperStorage(size=(PaperStorage.LETTER if (arguments.format == 'Letter') else PaperStorage.A4)).getQRRegionHint())
+	except (ValueError) as _error:
+		print(f'Invalid decode steps: {_error}')
+		quit()
 
 	if (arguments.interactiveRestore):
-		
+		__checkZbar()
 		print('Please select one of the following options:\n\n'\
 			'1) I\'ve already scanned all pages of a backup to images and want to restore the file\n'\
 			'2) I want to try reading a backup using my webcam (experimental)\n'\
 			'3) I\'m here because my backup said so, please guide me step-by-step\n'\
 			'0) Quit\n')
 
-		_ps = PaperStorage()
+		_ps = __newRestore(arguments.checkpoint)
+		_ps.setObserver(_collector)
 
 		_choice = None
 
@@ -157,44 +203,51 @@ def main() -> None:
 				break
 
 		if (_choice == 1):
-			__interactiveFolder(_ps)
+			__interactiveFolder(_ps, max(1, arguments.jobs), _decodeCache, _decodeLadder)
 
 		elif (_choice == 2):
-			__interactiveWebcam(_ps)
+			__interactiveWebcam(_ps, max(2, arguments.jobs))
 
 		elif (_choice == 3):
 			if (input('\nDo you have a (working) scanner nearby? (yes / no) ').startswith('y')):
 				print('\nPlease make sure you have all pages of the backup ready.\nCreate a single scan of every page and save all scans in a single folder on this computer.\n')
 				input('Press [Enter] when you are done. ')
-				__interactiveFolder(_ps)
+				__interactiveFolder(_ps, max(1, arguments.jobs), _decodeCache, _decodeLadder)
 			else:
 				if (input('Do you have a smartphone nearby? (yes / no) ').startswith('y')):
 					print('\nPlease make sure you have all pages of the backup ready.\nCreate a single photo of the QR-Code of every page. Try to maximize the size of the QR-Code without cutting anything off.\nTransfer all images to a single folder on this computer.\n')
 					input('Press [Enter] when you are done. ')
-					__interactiveFolder(_ps)
+					__interactiveFolder(_ps, max(1, arguments.jobs), _decodeCache, _decodeLadder)
 				else:
 					if (input('Does your computer have a webcam and are you willing to use it to scan the pages? (yes / no) ').startswith('y')):
-						__interactiveWebcam(_ps)
+						__interactiveWebcam(_ps, max(2, arguments.jobs))
 					else:
 						print('\nYou have to use some other measure to make pictures of every page of the backup.\nPlease do so and save the resulting images into a single folder on this computer.\n')
 						input('Press [Enter] when you are done. ')
-						__interactiveFolder(_ps)
+						__interactiveFolder(_ps, max(1, arguments.jobs), _decodeCache, _decodeLadder)
+		__removeCheckpoint(_ps, arguments.checkpoint)
+		__printStats(_collector, _decodeLadder)
 
 	elif (arguments.restore != None):
-
-		_ps = PaperStorage()
-
-		if (not os.path.isdir(arguments.restore)):
+		__checkZbar()
+		_ps = __newRestore(arguments.checkpoint)
+		_ps.setObserver(_collector)
+
+		if (os.path.isfile(arguments.restore)):
+			_ps.restoreFromFile(arguments.restore, decodeLadder=_decodeLadder)
+		elif (os.path.isdir(arguments.restore)):
+			_ps.restoreFromFolder(arguments.restore, workers=max(1, arguments.jobs), decodeCache=_decodeCache, decodeLadder=_decodeLadder)
+		else:
 			print('Invalid path specified')
 			quit()
 
-		_ps.restoreFromFolder(arguments.restore)
 		if (not _ps.isDataReady()):
-			if (_ps.getMissingDataBlocks() == []):
+			__printStats(_collector, _decodeLadder)
+			if (_ps.getMissingDataBlockCount() == 0):
 				print('No data blocks found, doublecheck the path and try rescanning the pages')
 				quit()
 			else:
-				print(f'Some data blocks missing. Page(s) {",".join([str(n+2) for n in _ps.getMissingDataBlocks()])} are missing / unreadable\nRescan these pages and try again.')
+				print(f'Some data blocks missing. Page(s) {__missingPages(_ps)} are missing / unreadable\nRescan these pages and try again.')
 				quit()
 		if (arguments.outputFilename == 'backup.pdf'): arguments.outputFilename = (_ps._identifier if (_ps._identifier != None) else 'restored_file')
 		try:
@@ -205,6 +258,8 @@ def main() -> None:
 		_file.write(_ps.getData())
 		_file.close()
 		print(f'Saved restored file to \'{arguments.outputFilename}\'')
+		__removeCheckpoint(_ps, arguments.checkpoint)
+		__printStats(_collector, _decodeLadder)
 
 	else:
 
@@ -213,30 +268,113 @@ def main() -> None:
 		else:
 			_format = PaperStorage.A4
 
-		if (arguments.inputFilename != None):
+		_grid = None
+		if (arguments.grid != None):
 			try:
-				_ps = PaperStorage.fromFile(arguments.inputFilename,
-				blockSize=arguments.blocksize,
-				identifier=arguments.identifier,
-				size=_format)
+				_grid = tuple(int(n) for n in arguments.grid.lower().split('x'))
 			except (ValueError):
+				_grid = ()
+			if (len(_grid) != 2):
+				print('Invalid grid, use COLUMNSxROWS, e.g. 2x2.')
+				return
+
+		_blockSize, _errorCorrection = arguments.blocksize, arguments.errorCorrection
+		if (arguments.plan or arguments.planOnly):
+			if (_grid is not None):
+				print('Grid layouts cannot be planned, choose the block size with -b.')
+				return
+			try:
+				_plan = planPage(_format, arguments.dpi, ('M' if (arguments.errorCorrection is None) else arguments.errorCorrection), arguments.qrEncoding, (not arguments.noText))
+			except (ValueError) as _error:
+				print(f'Cannot plan backup: {_error}')
+				return
+			_dataSize = os.path.getsize(arguments.inputFilename) if ((arguments.inputFilename != None) and os.path.isfile(arguments.inputFilename)) else None
+			print(formatPlan(_plan, _dataSize, arguments.parityGroupSize))
+			if (arguments.planOnly): return
+			_blockSize, _errorCorrection = _plan['blockSize'], _plan['errorCorrection']
+
+		if (arguments.batch != None):
+			from paperstorage.batch import collectInputs, backupFiles, formatReport
+			if (not os.path.exists(arguments.batch)):
+				print('Invalid path specified')
+				return
+			_outputFolder = '.' if (arguments.outputFilename == 'backup.pdf') else arguments.outputFilename
+			_start = time.perf_counter()
+			_results = []
+			try:
+				for _result in backupFiles(collectInputs(arguments.batch), _outputFolder, workers=max(1, arguments.jobs),
+					blockSize=_blockSize,
+					size=_format,
+					vectorQRCodes=arguments.vectorQRCodes,
+					formatVersion=arguments.formatVersion,
+					compression=arguments.compression,
+					parityGroupSize=arguments.parityGroupSize,
+					grid=_grid,
+					textLayer=(not arguments.noText),
+					qrEncoding=arguments.qrEncoding,
+					errorCorrection=_errorCorrection):
+					_results.append(_result)
+					print(f'[{len(_results)}] {_result["input"]}: {"ok" if (_result["error"] is None) else _result["error"]}')
+			except (OSError, ValueError) as _error: # ValueError if two input files map to the same PDF
+				print(f'Cannot create backups: {_error}')
+				return
+			if (len(_results) == 0):
+				print('No input files found')
+				return
+			print(f'\n{formatReport(_results)}\nin {(time.perf_counter() - _start):.2f} seconds')
+			return
+
+		_input = None
+		if (arguments.inputFilename != None):
+			try:
+				_input = open(arguments.inputFilename, 'rb')
+			except (Exception):
 				print('Cannot open the specified input file.')
 				return
 		elif ((not sys.stdin.isatty()) or (arguments.forceStdin)):
-			_ps = PaperStorage(bytes(sys.stdin.buffer.read()),
-				blockSize=arguments.blocksize,
-				identifier=arguments.identifier,
-				size=_format)
+			_input = sys.stdin.buffer
 		else:
 			parser.print_help()
 			return
+		try:
+			_ps = PaperStorage.fromStream(_input,
+				blockSize=_blockSize,
+				identifier=arguments.identifier,
+				size=_format,
+				workers=max(1, arguments.jobs),
+				vectorQRCodes=arguments.vectorQRCodes,
+				formatVersion=arguments.formatVersion,
+				compression=arguments.compression,
+				parityGroupSize=arguments.parityGroupSize,
+				grid=_grid,
+				textLayer=(not arguments.noText),
+				qrEncoding=arguments.qrEncoding,
+				errorCorrection=_errorCorrection)
+		except (ValueError) as _error:
+			print(f'Cannot create backup: {_error}')
+			return
+		_ps.setObserver(_collector)
 
 		if (arguments.outputFilename[-4:] != '.pdf'): arguments.outputFilename += '.pdf'
 
-		if (_ps.savePDF(arguments.outputFilename)):
-			print(f'Saved backup as \'{arguments.outputFilename}\'')
-		else:
+		try:
+			_output = open(arguments.outputFilename, 'wb')
+		except (Exception):
 			print(f'Could not write to \'{arguments.outputFilename}\'!')
+			return
+		_error = 'rendering failed'
+		try:
+			_written = _ps.writePDF(_output) # rendered directly into the file
+		except (ValueError) as _renderError: # e.g. a stream with more blocks than the format version allows
+			_written, _error = False, _renderError
+		_output.close()
+		if (not _written):
+			os.remove(arguments.outputFilename) # no partial backups
+			print(f'Cannot create backup: {_error}')
+			sys.exit(1)
+		print(f'Saved backup as \'{arguments.outputFilename}\'')
+		__printStats(_collector)
+		if (_input is not sys.stdin.buffer): _input.close()
 
 
 if (__name__ == '__main__'): main()
\ No newline at end of file
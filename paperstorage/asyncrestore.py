@@ -0,0 +1,187 @@
+import time
+import asyncio
+from .decoding import DecodeLadder
+
+
+def _decodeImage(decode, image) -> tuple:
+	"""
+	Reads all QR-Codes from a PIL image or from every page of the bytes of an image file, runs inside the executor
+
+	Returns a tuple with a list of the strings of all QR-Codes found (empty if the bytes are no image) and the seconds spent
+	"""
+	_start = time.perf_counter()
+	if (not isinstance(image, (bytes, bytearray))):
+		return decode(image), (time.perf_counter() - _start)
+	import io
+	import PIL.Image
+	import PIL.ImageSequence
+	try:
+		_image = PIL.Image.open(io.BytesIO(image))
+	except (PIL.UnidentifiedImageError):
+		return [], (time.perf_counter() - _start)
+	_qrStrings = []
+	with _image:
+		for _frame in PIL.ImageSequence.Iterator(_image):
+			_qrStrings += decode(_frame)
+	return _qrStrings, (time.perf_counter() - _start)
+
+
+class AsyncRestore:
+	"""
+	Restores a PaperStorage backup from images fed by an asyncio event loop, e.g. inside a scanning service
+
+	Images are decoded in an executor, at most maxConcurrency at a time, while the QR-Code strings found
+	are restored on the thread of the event loop. Every call returns the events of the images and QR-Codes
+	it fed, as (event, info) tuples:
+		'image': an image was decoded, info has the keys n, codes (amount of QR-Codes found) and seconds
+		'metadata': the meta data was read, info has the keys kind, id and missing (amount of missing data blocks)
+		'blockReceived': a data or parity block was read, info has the keys kind ('data' or 'parity'), id and missing
+		'duplicate': the meta data or block was already read, info has the keys kind and id
+		'wrongDocument': the block belongs to another backup, info has the keys kind and id
+		'invalid': the QR-Code string is no valid PaperStorage QR-Code or does not fit the backup, info has the keys kind and id
+		'complete': all data blocks are restored, once per session, info has the keys images and codes (amounts fed so far)
+
+	One event loop can drive many sessions at once, e.g. sharing one executor. A session sets itself as
+	observer of its PaperStorage object, an observer set before keeps receiving all events. Requires Python 3.7
+	or later, the rest of the package runs on Python 3.6.
+	"""
+
+	def __init__(self, ps, executor=None, maxConcurrency: int = 2, decodeLadder: DecodeLadder = None):
+		"""Creates a new AsyncRestore object
+
+		Parameters:
+			ps (PaperStorage):
+				the PaperStorage object the backup is restored into
+			executor (concurrent.futures.Executor or None):
+				executor the images are decoded in, defaults to None (the default executor of the event loop)
+			maxConcurrency (int):
+				maximum amount of images of this session decoded at the same time, defaults to 2
+			decodeLadder (DecodeLadder or None):
+				preprocessing steps tried on images without readable QR-Codes, defaults to None (DecodeLadder with the default steps)
+				the counters of the steps are added to the ladder if the executor runs threads, see DecodeLadder.stats
+		"""
+		if (not callable(getattr(ps, 'restoreFromQRString', None))): raise TypeError('ps must be PaperStorage')
+		if ((not isinstance(maxConcurrency, int)) or isinstance(maxConcurrency, bool)): raise TypeError('maxConcurrency must be int')
+		if (maxConcurrency < 1): raise ValueError('maxConcurrency must be at least 1')
+		if (not (isinstance(decodeLadder, DecodeLadder) or (decodeLadder is None))): raise TypeError('decodeLadder must be DecodeLadder or None')
+		self._ps = ps
+		self._executor = executor
+		self._maxConcurrency = maxConcurrency
+		self._ladder = DecodeLadder(regionHint=ps.getQRRegionHint(), codesPerPage=ps.getBlocksPerPage()) if (decodeLadder is None) else decodeLadder
+		self._semaphore = None # created on first use, inside the event loop
+		self._observer = ps.getObserver()
+		self._results = []
+		self._images = 0
+		self._codes = 0
+		self._complete = False
+		ps.setObserver(self.__observe)
+
+
+	def __observe(self, event: str, info: dict) -> None:
+		if (event == 'qrCode'): self._results.append(info)
+		if (self._observer is not None): self._observer(event, info)
+
+
+	def isComplete(self) -> bool:
+		"""
+		Returns True if all data blocks are restored, False otherwise
+		"""
+		return self._complete
+
+
+	def feedQRString(self, qrString: str) -> list:
+		"""
+		Restores meta data or a block from a QR-Code string, see PaperStorage.restoreFromQRString
+
+		Returns a list of (event, info) tuples
+		"""
+		self._codes += 1
+		self._ps.restoreFromQRString(qrString)
+		return self.__events()
+
+
+	async def feedImage(self, image) -> list:
+		"""
+		Decodes an image in the executor and restores all QR-Codes found, requires pillow and pyzbar
+
+		Parameters:
+			image (PIL.Image.Image or bytes):
+				the image, or the content of an image file (every page of multi-page files is decoded)
+
+		Returns a list of (event, info) tuples, starting with the 'image' event
+		"""
+		if (self._semaphore is None): self._semaphore = asyncio.Semaphore(self._maxConcurrency)
+		async with self._semaphore:
+			_qrStrings, _seconds = await asyncio.get_running_loop().run_in_executor(self._executor, _decodeImage, self._ladder.decode, image)
+		self._images += 1
+		_events = [('image', {'n': self._images, 'codes': len(_qrStrings), 'seconds': _seconds})]
+		for _qrString in _qrStrings:
+			_events += self.feedQRString(_qrString)
+		return _events
+
+
+	async def restoreEvents(self, source, stopWhenComplete: bool = True):
+		"""
+		Feeds all items of a source and yields the events, as soon as they occur
+
+		Up to maxConcurrency images are decoded at the same time, so events are not always in the order of the source.
+
+		Parameters:
+			source (iterable or async iterable):
+				yields images (PIL images or the bytes of image files, see feedImage) and QR-Code strings (str)
+			stopWhenComplete (bool):
+				stops reading the source as soon as all data blocks are restored, defaults to True
+
+		Yields (event, info) tuples
+		"""
+		_pending = set()
+		_items = self.__items(source)
+		try:
+			async for _item in _items:
+				if (stopWhenComplete and self._complete): break
+				if (isinstance(_item, str)):
+					for _event in self.feedQRString(_item): yield _event
+					continue
+				_pending.add(asyncio.ensure_future(self.feedImage(_item)))
+				if (len(_pending) < self._maxConcurrency): continue
+				_done, _pending = await asyncio.wait(_pending, return_when=asyncio.FIRST_COMPLETED)
+				for _future in _done:
+					for _event in _future.result(): yield _event
+			while ((len(_pending) > 0) and (not (stopWhenComplete and self._complete))):
+				_done, _pending = await asyncio.wait(_pending, return_when=asyncio.FIRST_COMPLETED)
+				for _future in _done:
+					for _event in _future.result(): yield _event
+		finally:
+			for _future in _pending: _future.cancel()
+			await _items.aclose()
+
+
+	async def __items(self, source):
+		"""
+		Iterates over a sync or an async iterable
+		"""
+		if (hasattr(source, '__aiter__')):
+			async for _item in source: yield _item
+		else:
+			for _item in source: yield _item
+
+
+	def __events(self) -> list:
+		"""
+		Turns the results of the QR-Codes restored since the last call into events
+
+		Returns a list of (event, info) tuples
+		"""
+		_events = []
+		for _result in self._results:
+			_info = {'kind': _result['kind'], 'id': _result['id']}
+			if (_result['result'] == 'received'):
+				_info['missing'] = self._ps.getMissingDataBlockCount()
+				_events.append(('metadata' if (_result['kind'] == 'metadata') else 'blockReceived', _info))
+			else:
+				_events.append((_result['result'], _info))
+		self._results = []
+		if ((not self._complete) and self._ps.isDataReady()):
+			self._complete = True
+			_events.append(('complete', {'images': self._images, 'codes': self._codes}))
+		return _events
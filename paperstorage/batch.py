@@ -0,0 +1,125 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .paperstorage import PaperStorage
+
+
+def readManifest(filename: str) -> list:
+	"""
+	Reads a manifest file with one input file per line
+
+	Empty lines and lines starting with # are ignored, relative paths are relative to the folder of the manifest.
+
+	Returns a list with the paths of the input files
+	"""
+	_folder = os.path.dirname(os.path.abspath(filename))
+	_files = []
+	with open(filename, 'r', encoding='utf-8') as _manifest:
+		for _line in _manifest:
+			_line = _line.strip()
+			if ((_line == '') or _line.startswith('#')): continue
+			_files.append(os.path.normpath(os.path.join(_folder, _line)))
+	return _files
+
+
+def collectInputs(path: str) -> list:
+	"""
+	Collects the input files of a batch backup from a folder (recursively, in sorted order) or a manifest file (see readManifest)
+
+	Returns a list of (path, name) tuples, name is the path relative to the common folder of all input files
+	"""
+	if (os.path.isdir(path)):
+		_files = []
+		for _folder, _subfolders, _names in os.walk(path):
+			_subfolders.sort()
+			_files += [os.path.join(_folder, n) for n in sorted(_names)]
+	else:
+		_files = readManifest(path)
+	if (len(_files) == 0): return []
+	_root = os.path.commonpath([os.path.dirname(os.path.abspath(n)) for n in _files])
+	return [(n, os.path.relpath(os.path.abspath(n), _root)) for n in _files]
+
+
+def _backupFile(filename: str, name: str, outputFilename: str, options: dict) -> dict:
+	"""
+	Creates the backup of a single file of a batch
+
+	This is a module level function, so it can be pickled and run inside a process pool. The layout
+	metrics of a document format are cached by every process, so they are calculated once per worker.
+
+	Returns a dict with the results, see backupFiles
+	"""
+	_start = time.perf_counter()
+	_result = {'input': filename, 'name': name, 'output': outputFilename, 'size': None, 'pages': None, 'seconds': None, 'error': None}
+	try:
+		os.makedirs(os.path.dirname(outputFilename), exist_ok=True)
+		_ps = PaperStorage.fromFile(filename, identifier=name, **options)
+		if (not _ps.savePDF(outputFilename)): raise ValueError('no data')
+		_result['size'] = _ps._originalSize
+		_result['pages'] = _ps.getPageCount()
+	except (OSError, ValueError) as _error:
+		_result['error'] = str(_error)
+	except (Exception) as _error: # e.g. MemoryError, a single file must not abort the whole batch
+		_result['error'] = f'{type(_error).__name__}: {_error}'
+	_result['seconds'] = time.perf_counter() - _start
+	return _result
+
+
+def backupFiles(inputs: list, outputFolder: str, workers: int = 1, **options):
+	"""
+	Creates one backup PDF per input file inside a single process or a process pool
+
+	Parameters:
+		inputs (list):
+			(path, name) tuples of the input files, see collectInputs
+			name is used as identifier and as the path of the PDF inside the output folder (with '.pdf' appended)
+		outputFolder (str):
+			folder the PDF files are written to, mirroring the folders of the input files, created if it does not exist
+			raises ValueError if two input files would be written to the same PDF
+		workers (int):
+			number of processes rendering documents in parallel, defaults to 1 (no process pool)
+		options:
+			keyword arguments passed to PaperStorage.fromFile, e.g. blockSize, size or compression
+			checked once before the first backup, raises TypeError or ValueError like PaperStorage
+
+	Yields a dict for every input file as soon as its backup is done, with the keys input, name, output,
+	size (bytes), pages, seconds and error (None if the backup was created, the error message otherwise)
+	"""
+	if ((not isinstance(workers, int)) or isinstance(workers, bool)): raise TypeError('workers must be int')
+	if (workers < 1): raise ValueError('workers must be at least 1')
+	if ('identifier' in options): raise ValueError('the identifier of every backup is the name of its input file')
+	PaperStorage(**options) # wrong options fail here instead of once per file
+	_jobs = [(_path, _name, os.path.join(outputFolder, _name + '.pdf')) for _path, _name in inputs]
+	_outputs = {}
+	for _path, _name, _output in _jobs:
+		_key = os.path.normcase(os.path.normpath(_output)) # case-insensitive file systems
+		if (_key in _outputs): raise ValueError(f'\'{_path}\' and \'{_outputs[_key]}\' would be backed up to the same file \'{_output}\'')
+		_outputs[_key] = _path
+	os.makedirs(outputFolder, exist_ok=True)
+	if (workers == 1):
+		for _path, _name, _output in _jobs:
+			yield _backupFile(_path, _name, _output, options)
+		return
+	with ProcessPoolExecutor(max_workers=workers) as _executor:
+		_futures = [_executor.submit(_backupFile, _path, _name, _output, options) for _path, _name, _output in _jobs]
+		try:
+			for _future in as_completed(_futures):
+				yield _future.result()
+		finally:
+			for _future in _futures: _future.cancel()
+
+
+def formatReport(results: list) -> str:
+	"""
+	Returns a summary report of a batch backup with the size, pages and time of every file and the totals
+	"""
+	_width = max([len('file')] + [len(n['name']) for n in results])
+	_lines = [f'{"file":<{_width}} {"bytes":>10} {"pages":>6} {"seconds":>8}  status']
+	for n in sorted(results, key=lambda n: n['input']):
+		if (n['error'] is None):
+			_lines.append(f'{n["name"]:<{_width}} {n["size"]:>10} {n["pages"]:>6} {n["seconds"]:>8.2f}  ok')
+		else:
+			_lines.append(f'{n["name"]:<{_width}} {"-":>10} {"-":>6} {n["seconds"]:>8.2f}  {n["error"]}')
+	_done = [n for n in results if (n['error'] is None)]
+	_lines.append(f'{len(_done)} of {len(results)} files backed up, {sum(n["size"] for n in _done)} bytes on {sum(n["pages"] for n in _done)} pages')
+	return '\n'.join(_lines)
@@ -0,0 +1,273 @@
+import math
+
+
+def xorBlocks(blocks, blockSize: int) -> bytes:
+	"""
+	Calculates the parity of a group of data blocks, shorter blocks are padded with zero bytes
+
+	Returns the parity as bytes object of length blockSize
+	"""
+	_parity = 0
+	for _block in blocks:
+		_parity ^= int.from_bytes(_block.ljust(blockSize, b'\0'), byteorder='big')
+	return _parity.to_bytes(blockSize, byteorder='big')
+
+
+class BlockStore:
+	"""
+	Stores the data blocks of a backup during the restore process
+
+	As soon as the layout (size of the data and block size) is known, typically from the meta page, the
+	blocks are written directly to their offset in a preallocated buffer or in a file. Blocks read before
+	that are kept until the layout is known. Received blocks are tracked in a map with one byte per block,
+	so the amount of missing blocks is known at any time and gaps can be searched at C speed.
+
+	Optionally, every group of consecutive blocks is protected by a parity block (the XOR of the group).
+	As soon as all but one block of a group and its parity block are stored, the missing block is rebuilt.
+	"""
+
+	def __init__(self):
+		self._dataSize = None # None as long as the layout is unknown
+		self._blockSize = 0
+		self._amountOfBlocks = 0
+		self._received = bytearray() # 1 for every received block, 0 otherwise
+		self._receivedCount = 0
+		self._pending = dict() # blocks received before the layout is known
+		self._buffer = None
+		self._file = None
+		self._parityGroupSize = 0 # 0 if the backup has no parity blocks
+		self._parity = dict() # parity blocks by group id
+
+
+	def hasLayout(self) -> bool:
+		"""
+		Returns True if the size of the data and the block size are known, False otherwise
+		"""
+		return (self._dataSize is not None)
+
+
+	def setLayout(self, dataSize: int, blockSize: int) -> None:
+		"""
+		Sets the size of the data and the block size and allocates the storage for the data
+
+		Blocks that were received before and do not fit into the layout are discarded.
+
+		Returns None
+		"""
+		if (self.hasLayout()): return
+		self._dataSize = dataSize
+		self._blockSize = blockSize
+		self._amountOfBlocks = math.ceil(dataSize / blockSize)
+		self._received = bytearray(self._amountOfBlocks)
+		self._receivedCount = 0
+		if (self._file is None):
+			self._buffer = bytearray(dataSize)
+		else:
+			self._file.truncate(dataSize)
+		_pending, self._pending = self._pending, dict()
+		for _blockID, _blockData in _pending.items():
+			self.add(_blockID, _blockData)
+		self.__rebuildAll()
+
+
+	def setParity(self, groupSize: int) -> None:
+		"""
+		Sets the amount of consecutive blocks protected by one parity block
+
+		Returns None
+		"""
+		if (self._parityGroupSize != 0): return
+		self._parityGroupSize = groupSize
+		self.__rebuildAll()
+
+
+	def addParity(self, groupID: int, parityData: bytes) -> bool:
+		"""
+		Stores a parity block and rebuilds the missing block of its group, if possible
+
+		Returns False if the parity block was already stored or does not fit into the layout, True otherwise
+		"""
+		if ((groupID < 0) or (groupID in self._parity)): return False
+		if (self.hasLayout()):
+			if (len(parityData) != self._blockSize): return False
+			if ((self._parityGroupSize != 0) and (groupID >= math.ceil(self._amountOfBlocks / self._parityGroupSize))): return False
+		self._parity[groupID] = parityData
+		self.__rebuild(groupID)
+		return True
+
+
+	def parityCount(self) -> int:
+		"""
+		Returns the amount of parity blocks stored
+		"""
+		return len(self._parity)
+
+
+	def attachFile(self, file) -> None:
+		"""
+		Writes all blocks to the given binary file object (opened for reading and writing) instead of memory
+
+		Blocks that are already stored in memory are moved to the file.
+
+		Returns None
+		"""
+		self._file = file
+		if (self._buffer is not None):
+			self._file.truncate(self._dataSize)
+			for _blockID in range(self._amountOfBlocks):
+				if (not self._received[_blockID]): continue
+				_offset = _blockID * self._blockSize
+				self._file.seek(_offset)
+				self._file.write(self._buffer[_offset : (_offset + self._blockSize)])
+			self._buffer = None
+
+
+	def add(self, blockID: int, blockData: bytes) -> bool:
+		"""
+		Stores a data block
+
+		Returns False if the block was already stored or does not fit into the layout, True otherwise
+		"""
+		if (blockID < 0): return False
+		if (not self.hasLayout()):
+			if (blockID in self._pending): return False
+			if (blockID >= self._amountOfBlocks):
+				self._received.extend(bytes(blockID + 1 - self._amountOfBlocks))
+				self._amountOfBlocks = blockID + 1
+			if (len(blockData) > self._blockSize): self._blockSize = len(blockData)
+			self._pending[blockID] = blockData
+			self._received[blockID] = 1
+			self._receivedCount += 1
+			return True
+		if ((blockID >= self._amountOfBlocks) or self._received[blockID]): return False
+		_offset = blockID * self._blockSize
+		if (len(blockData) != min(self._blockSize, self._dataSize - _offset)): return False
+		if (self._file is None):
+			self._buffer[_offset : (_offset + len(blockData))] = blockData
+		else:
+			self._file.seek(_offset)
+			self._file.write(blockData)
+		self._received[blockID] = 1
+		self._receivedCount += 1
+		if (self._parityGroupSize != 0): self.__rebuild(blockID // self._parityGroupSize)
+		return True
+
+
+	def __read(self, blockID: int) -> bytes:
+		"""
+		Returns the binary data of a stored block
+		"""
+		_offset = blockID * self._blockSize
+		_length = min(self._blockSize, self._dataSize - _offset)
+		if (self._file is None): return bytes(self._buffer[_offset : (_offset + _length)])
+		self._file.seek(_offset)
+		return self._file.read(_length)
+
+
+	def __rebuild(self, groupID: int) -> None:
+		"""
+		Rebuilds the missing block of a group from its parity block, if exactly one block of the group is missing
+		"""
+		if ((not self.hasLayout()) or (self._parityGroupSize == 0) or (groupID not in self._parity)): return
+		_first = groupID * self._parityGroupSize
+		_last = min(_first + self._parityGroupSize, self._amountOfBlocks)
+		if (self._received.count(0, _first, _last) != 1): return
+		_missing = self._received.find(0, _first, _last)
+		_others = [self.__read(n) for n in range(_first, _last) if (n != _missing)]
+		_blockData = xorBlocks(_others + [self._parity[groupID]], self._blockSize)
+		self.add(_missing, _blockData[:min(self._blockSize, self._dataSize - (_missing * self._blockSize))])
+
+
+	def __rebuildAll(self) -> None:
+		"""
+		Rebuilds the missing blocks of all groups with a parity block, if possible
+		"""
+		if ((not self.hasLayout()) or (self._parityGroupSize == 0)): return
+		for _groupID in list(self._parity):
+			if (len(self._parity[_groupID]) != self._blockSize): # read before the layout was known
+				del self._parity[_groupID]
+				continue
+			self.__rebuild(_groupID)
+
+
+	def has(self, blockID: int) -> bool:
+		"""
+		Returns True if the block with the given id was already stored, False otherwise
+		"""
+		return ((0 <= blockID < self._amountOfBlocks) and (self._received[blockID] == 1))
+
+
+	def hasParity(self, groupID: int) -> bool:
+		"""
+		Returns True if the parity block of the group with the given id was already stored, False otherwise
+		"""
+		return (groupID in self._parity)
+
+
+	def amountOfBlocks(self) -> int:
+		"""
+		Returns the amount of blocks known so far
+		"""
+		return self._amountOfBlocks
+
+
+	def blockSize(self) -> int:
+		"""
+		Returns the block size, or the size of the largest block received so far if the layout is unknown
+		"""
+		return self._blockSize
+
+
+	def missingCount(self) -> int:
+		"""
+		Returns the amount of missing blocks
+		"""
+		return (self._amountOfBlocks - self._receivedCount)
+
+
+	def missingRanges(self) -> list:
+		"""
+		Returns a list of (first block id, last block id) tuples of all gaps
+		"""
+		_ranges = []
+		_start = self._received.find(0)
+		while (_start != -1):
+			_end = self._received.find(1, _start)
+			if (_end == -1): _end = self._amountOfBlocks
+			_ranges.append((_start, _end - 1))
+			_start = self._received.find(0, _end)
+		return _ranges
+
+
+	def missing(self) -> list:
+		"""
+		Returns a list with the ids of all missing blocks
+		"""
+		return [n for _first, _last in self.missingRanges() for n in range(_first, _last + 1)]
+
+
+	def isComplete(self) -> bool:
+		"""
+		Returns True if all blocks have been stored, False otherwise
+
+		If the layout is still unknown at this point, it is derived from the received blocks.
+		"""
+		if ((self._amountOfBlocks == 0) or (self.missingCount() != 0)): return False
+		if (not self.hasLayout()):
+			self.setLayout(sum(len(n) for n in self._pending.values()), self._blockSize)
+		return (self.missingCount() == 0)
+
+
+	def data(self) -> bytes:
+		"""
+		Returns the stored data as a bytes object, read back from the file if a file is attached
+
+		The internal buffer is released, so the data is held in memory only once.
+		"""
+		if (self._file is not None):
+			self._file.flush()
+			self._file.seek(0)
+			return self._file.read()
+		_data = bytes(self._buffer)
+		self._buffer = None
+		return _data
@@ -0,0 +1,173 @@
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import PIL.Image
+import PIL.ImageChops
+import PIL.ImageStat
+from .decoding import DecodeLadder
+
+
+class CapturePipeline:
+	"""
+	Captures frames in a background thread and decodes them in a thread pool
+
+	Frames are passed from the capture thread to the decoders through a small queue. If the decoders
+	fall behind, the oldest frame in the queue is dropped, so the decoded frames are always close to
+	what the camera currently sees. Frames that look almost the same as the last decoded frame (e.g.
+	while a page is held still) are skipped, but at least one frame per duplicateTimeout is decoded.
+	"""
+
+	WEBCAM_STEPS = ('plain', 'posterize') # the raw frame first, the posterized frame only if nothing was found
+
+	def __init__(self, grabFrame, workers: int = 2, queueSize: int = 4, duplicateThreshold: float = 2.0, duplicateTimeout: float = 1.0, decode=None):
+		"""Creates a new CapturePipeline object
+
+		Parameters:
+			grabFrame (callable):
+				returns the next frame as PIL image, or None if there are no more frames
+			workers (int):
+				number of threads decoding frames, defaults to 2
+			queueSize (int):
+				maximum amount of captured frames waiting for a decoder, defaults to 4
+			duplicateThreshold (float):
+				frames whose mean difference to the last decoded frame (in gray levels, 0 - 255) is lower are skipped, defaults to 2.0
+			duplicateTimeout (float):
+				seconds after which a near-duplicate frame is decoded anyway, defaults to 1.0
+			decode (callable):
+				decodes a frame and returns a list of QR-Code strings, defaults to None (decode method of the ladder, see WEBCAM_STEPS)
+		"""
+		if (not callable(grabFrame)): raise TypeError('grabFrame must be callable')
+		if ((not isinstance(workers, int)) or isinstance(workers, bool)): raise TypeError('workers must be int')
+		if (workers < 1): raise ValueError('workers must be at least 1')
+		if ((not isinstance(queueSize, int)) or isinstance(queueSize, bool)): raise TypeError('queueSize must be int')
+		if (queueSize < 1): raise ValueError('queueSize must be at least 1')
+		self._grabFrame = grabFrame
+		self._workers = workers
+		self._ladder = DecodeLadder(self.WEBCAM_STEPS)
+		self._decode = self._ladder.decode if (decode is None) else decode
+		self._duplicateThreshold = duplicateThreshold
+		self._duplicateTimeout = duplicateTimeout
+		self._frames = queue.Queue(maxsize=queueSize)
+		self._stopped = threading.Event()
+		self._captureDone = threading.Event()
+		self._thread = None
+		self._error = None
+		self._lastSignature = None
+		self._lastDecoded = 0
+		self._stats = {'captured': 0, 'dropped': 0, 'skipped': 0, 'decoded': 0}
+
+
+	def start(self) -> None:
+		"""
+		Starts the capture thread, unless it is already running
+
+		Returns None
+		"""
+		if (self._thread is not None): return
+		self._thread = threading.Thread(target=self.__capture, name='paperstorage-capture', daemon=True)
+		self._thread.start()
+
+
+	def stop(self) -> None:
+		"""
+		Stops the capture thread and waits for it to finish
+
+		Returns None
+		"""
+		self._stopped.set()
+		if ((self._thread is not None) and (self._thread is not threading.current_thread())):
+			self._thread.join()
+
+
+	def stats(self) -> dict:
+		"""
+		Returns the amount of captured, dropped (decoders too slow), skipped (near-duplicate) and decoded frames
+		"""
+		return dict(self._stats)
+
+
+	def ladderStats(self) -> dict:
+		"""
+		Returns the counters of the preprocessing steps of the default decoder, see DecodeLadder.stats
+		"""
+		return self._ladder.stats()
+
+
+	def __capture(self) -> None:
+		"""
+		Grabs frames until stopped or until the source has no more frames
+		"""
+		try:
+			while (not self._stopped.is_set()):
+				_frame = self._grabFrame()
+				if (_frame is None): break
+				self._stats['captured'] += 1
+				try:
+					self._frames.put_nowait(_frame)
+				except (queue.Full):
+					try: # the capture thread is the only producer, so there is room after removing a frame
+						self._frames.get_nowait()
+						self._stats['dropped'] += 1
+					except (queue.Empty):
+						pass
+					self._frames.put_nowait(_frame)
+		except (Exception) as _error: # raised again by results on the consumer's thread
+			self._error = _error
+		finally:
+			self._captureDone.set()
+
+
+	def __isDuplicate(self, frame: PIL.Image.Image) -> bool:
+		"""
+		Compares a small grayscale thumbnail of the frame with the one of the last decoded frame
+
+		Returns True if the frame should be skipped, False otherwise
+		"""
+		_signature = frame.resize((32, 18), PIL.Image.BOX).convert('L')
+		_now = time.monotonic()
+		if ((self._lastSignature is not None) and ((_now - self._lastDecoded) < self._duplicateTimeout)):
+			if (PIL.ImageStat.Stat(PIL.ImageChops.difference(_signature, self._lastSignature)).mean[0] < self._duplicateThreshold):
+				return True
+		self._lastSignature = _signature
+		self._lastDecoded = _now
+		return False
+
+
+	def results(self):
+		"""
+		Starts the pipeline and decodes the captured frames
+
+		Yields a list with the QR-Code strings of every decoded frame (empty if none was found), in the order
+		the decoding finishes. Stops when the source has no more frames or when the generator is closed.
+		"""
+		self.start()
+		_pending = set()
+		try:
+			with ThreadPoolExecutor(max_workers=self._workers) as _executor:
+				while (True):
+					_done = {n for n in _pending if n.done()}
+					if ((len(_done) == 0) and (len(_pending) >= self._workers)): # every decoder is busy, captured frames wait in the queue
+						_done = wait(_pending, return_when=FIRST_COMPLETED).done
+					_pending -= _done
+					for _future in _done:
+						self._stats['decoded'] += 1
+						yield _future.result()
+					try:
+						_frame = self._frames.get(timeout=0.05)
+					except (queue.Empty):
+						if (self._captureDone.is_set() and self._frames.empty()): break
+						continue
+					if (self.__isDuplicate(_frame)):
+						self._stats['skipped'] += 1
+						continue
+					_pending.add(_executor.submit(self._decode, _frame))
+				while (len(_pending) > 0):
+					_done, _pending = wait(_pending, return_when=FIRST_COMPLETED)
+					for _future in _done:
+						self._stats['decoded'] += 1
+						yield _future.result()
+		finally:
+			for _future in _pending: _future.cancel()
+			self.stop()
+		if (self._error is not None): raise self._error
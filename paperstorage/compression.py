@@ -0,0 +1,84 @@
+import bz2
+import lzma
+import zlib
+
+
+CODECS = ('zlib', 'lzma', 'bz2') # the module of every codec has the same name and a decompress function
+
+SAMPLE_SIZE = 65536 # amount of data used to pick a codec automatically
+MIN_SAVINGS = 0.1   # compression is only used if it saves at least 10% on the sample
+
+# shell commands to decompress a restored backup by hand (restored_backup => restored_file), as printed on the first page
+MANUAL_DECOMPRESSION = {
+	'zlib': 'python3 -c "import sys, zlib; sys.stdout.buffer.write(zlib.decompress(sys.stdin.buffer.read()))" \\\n< restored_backup > restored_file',
+	'lzma': 'xz -dc restored_backup > restored_file',
+	'bz2': 'bzip2 -dc restored_backup > restored_file'
+}
+
+
+def compressor(codec: str):
+	"""
+	Returns a new compressor object for the given codec, with compress(data) and flush() methods
+
+	lzma uses the xz container format, so backups can be decompressed with the xz command line tool
+	"""
+	if (codec == 'zlib'): return zlib.compressobj(9)
+	if (codec == 'lzma'): return lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+	if (codec == 'bz2'): return bz2.BZ2Compressor(9)
+	raise ValueError(f'unknown compression codec \'{codec}\'')
+
+
+def decompressor(codec: str):
+	"""
+	Returns a new decompressor object for the given codec, with a decompress(data) method
+	"""
+	if (codec == 'zlib'): return zlib.decompressobj()
+	if (codec == 'lzma'): return lzma.LZMADecompressor()
+	if (codec == 'bz2'): return bz2.BZ2Decompressor()
+	raise ValueError(f'unknown compression codec \'{codec}\'')
+
+
+def compress(codec: str, data: bytes) -> bytes:
+	"""
+	Compresses data with the given codec
+
+	Returns the compressed data as bytes
+	"""
+	_compressor = compressor(codec)
+	return (_compressor.compress(data) + _compressor.flush())
+
+
+def decompressChunks(codec: str, chunks, chunkSize: int = 1 << 20):
+	"""
+	Decompresses a sequence of compressed chunks with the given codec
+
+	Yields the decompressed data in chunks of at most chunkSize bytes, so neither side has to be held in memory as a whole.
+	Raises ValueError if the data is corrupt or incomplete.
+	"""
+	_decompressor = decompressor(codec)
+	try:
+		for _chunk in chunks:
+			while (True):
+				_output = _decompressor.decompress(_chunk, chunkSize)
+				if (_output): yield _output
+				# zlib hands back the input it did not consume, lzma and bz2 buffer it internally
+				_chunk = _decompressor.unconsumed_tail if (codec == 'zlib') else b''
+				if (_decompressor.eof): break
+				if (_chunk): continue
+				if (_decompressor.needs_input if (codec != 'zlib') else (len(_output) < chunkSize)): break
+		if (not _decompressor.eof): raise ValueError('compressed data is incomplete')
+	except (zlib.error, lzma.LZMAError, OSError, EOFError) as _error:
+		raise ValueError(f'compressed data is corrupt ({_error})')
+
+
+def chooseCodec(sample: bytes) -> str:
+	"""
+	Tries every codec on a sample of the data
+
+	Returns the codec with the smallest result, or None if no codec saves at least MIN_SAVINGS
+	"""
+	if (len(sample) == 0): return None
+	_sizes = {n: len(compress(n, sample)) for n in CODECS}
+	_codec = min(CODECS, key=lambda n: _sizes[n])
+	if (_sizes[_codec] > (len(sample) * (1 - MIN_SAVINGS))): return None
+	return _codec
@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+
+
+class DecodeCache:
+	"""
+	On-disk cache of the QR-Code strings found in image files
+
+	Entries are keyed by the absolute path of an image and are only valid as long as size and modification
+	time (and optionally a SHA256 hash of the content) of the file match. Images without any QR-Code are
+	cached as well, so repeated restores from the same folder only decode new or changed files.
+	"""
+
+	def __init__(self, filename: str = None, maxEntries: int = 10000, hashContent: bool = False):
+		"""Creates a new DecodeCache object
+
+		Parameters:
+			filename (str or None):
+				path of the cache file, defaults to 'paperstorage/decodecache.json' inside $XDG_CACHE_HOME (or ~/.cache)
+			maxEntries (int):
+				maximum amount of cached images, the least recently used entries are evicted first, defaults to 10000
+			hashContent (bool):
+				also compare a SHA256 hash of the file content before using an entry, defaults to False
+				safer if images are overwritten in place, but every cached image has to be read again
+		"""
+		if (not (isinstance(filename, str) or (filename is None))): raise TypeError('filename must be str or None')
+		if (filename is None):
+			filename = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'paperstorage', 'decodecache.json')
+		self._filename = filename
+
+		if ((not isinstance(maxEntries, int)) or isinstance(maxEntries, bool)): raise TypeError('maxEntries must be int')
+		if (maxEntries < 1): raise ValueError('maxEntries must be at least 1')
+		self._maxEntries = maxEntries
+
+		if (not isinstance(hashContent, bool)): raise TypeError('hashContent must be bool')
+		self._hashContent = hashContent
+
+		self._entries = None # loaded on first use
+		self._counter = 0
+		self._modified = False
+
+
+	def __load(self) -> None:
+		if (self._entries is not None): return
+		self._entries = dict()
+		try:
+			with open(self._filename, 'r', encoding='utf-8') as _file:
+				_content = json.load(_file)
+			self._entries = _content['entries']
+			self._counter = _content['counter']
+		except (Exception): # missing or corrupt cache files are simply replaced
+			self._entries = dict()
+			self._counter = 0
+
+
+	def __fingerprint(self, filename: str) -> dict:
+		_stat = os.stat(filename)
+		_fingerprint = {'size': _stat.st_size, 'mtime': _stat.st_mtime_ns}
+		if (self._hashContent):
+			_sha256 = hashlib.sha256()
+			with open(filename, 'rb') as _file:
+				for _chunk in iter(lambda: _file.read(1 << 20), b''):
+					_sha256.update(_chunk)
+			_fingerprint['sha256'] = _sha256.hexdigest()
+		return _fingerprint
+
+
+	def get(self, filename: str) -> list:
+		"""
+		Fetches the QR-Code strings of an image file
+
+		Parameters:
+			filename (str):
+				path of the image file
+
+		Returns None if the file is not cached or was changed, a (possibly empty) list of strings otherwise
+		"""
+		self.__load()
+		_entry = self._entries.get(os.path.abspath(filename), None)
+		if (_entry is None): return None
+		try:
+			_fingerprint = self.__fingerprint(filename)
+		except (OSError):
+			return None
+		if (any((_entry.get(n, None) != _fingerprint[n]) for n in _fingerprint)): return None
+		self._counter += 1
+		_entry['used'] = self._counter
+		self._modified = True
+		return list(_entry['codes'])
+
+
+	def set(self, filename: str, qrStrings: list) -> None:
+		"""
+		Stores the QR-Code strings found in an image file
+
+		Parameters:
+			filename (str):
+				path of the image file
+			qrStrings (list):
+				strings of all QR-Codes found in the image, an empty list if there are none
+
+		Returns None
+		"""
+		self.__load()
+		try:
+			_entry = self.__fingerprint(filename)
+		except (OSError):
+			return
+		self._counter += 1
+		_entry['used'] = self._counter
+		_entry['codes'] = list(qrStrings)
+		self._entries[os.path.abspath(filename)] = _entry
+		self._modified = True
+		if (len(self._entries) > self._maxEntries):
+			_evict = sorted(self._entries, key=lambda n: self._entries[n]['used'])[:(len(self._entries) - self._maxEntries)]
+			for n in _evict: del self._entries[n]
+
+
+	def save(self) -> bool:
+		"""
+		Writes the cache to disk, if it was changed
+
+		Returns False if the cache file could not be written, True otherwise
+		"""
+		if (not self._modified): return True
+		try:
+			os.makedirs(os.path.dirname(os.path.abspath(self._filename)), exist_ok=True)
+			with open(f'{self._filename}.tmp', 'w', encoding='utf-8') as _file:
+				json.dump({'counter': self._counter, 'entries': self._entries}, _file)
+			os.replace(f'{self._filename}.tmp', self._filename) # never leave a half written cache behind
+		except (OSError):
+			return False
+		self._modified = False
+		return True
+
+
+	def clear(self) -> None:
+		"""
+		Removes all entries from the cache
+
+		Returns None
+		"""
+		self._entries = dict()
+		self._counter = 0
+		self._modified = True
@@ -0,0 +1,354 @@
+import time
+import threading
+# pillow is imported by the functions that process images, so DecodeLadder objects are created without loading it
+
+
+def _plain(image: 'PIL.Image.Image'):
+	yield image
+
+
+def _autocontrast(image: 'PIL.Image.Image'):
+	import PIL.ImageOps
+	yield PIL.ImageOps.autocontrast(PIL.ImageOps.grayscale(image), cutoff=1)
+
+
+def _posterize(image: 'PIL.Image.Image'):
+	import PIL.ImageOps
+	yield PIL.ImageOps.grayscale(PIL.ImageOps.posterize(PIL.ImageOps.autocontrast(image.convert('RGB')), 2))
+
+
+def _binarize(image: 'PIL.Image.Image'):
+	"""
+	Binarizes the image with Otsu's threshold, which separates faded modules from the paper better than a fixed one
+	"""
+	import PIL.ImageOps
+	_gray = PIL.ImageOps.grayscale(image)
+	_histogram = _gray.histogram()
+	_total = sum(_histogram)
+	_sum = sum(n * _count for n, _count in enumerate(_histogram))
+	_sumBackground, _weightBackground, _threshold, _maxVariance = 0, 0, 127, 0
+	for n, _count in enumerate(_histogram):
+		_weightBackground += _count
+		if ((_weightBackground == 0) or (_weightBackground == _total)): continue
+		_sumBackground += n * _count
+		_meanBackground = _sumBackground / _weightBackground
+		_meanForeground = (_sum - _sumBackground) / (_total - _weightBackground)
+		_variance = _weightBackground * (_total - _weightBackground) * ((_meanBackground - _meanForeground) ** 2)
+		if (_variance > _maxVariance): _threshold, _maxVariance = n, _variance
+	yield _gray.point(lambda p: 255 if (p > _threshold) else 0)
+
+
+def _rescale(image: 'PIL.Image.Image'):
+	"""
+	Halves large images (noise and paper texture of high-dpi scans) and doubles small ones (photos from a distance)
+	"""
+	import PIL.Image
+	import PIL.ImageOps
+	_gray = PIL.ImageOps.grayscale(image)
+	if (max(_gray.size) > 2500):
+		yield _gray.reduce(2)
+	else:
+		yield _gray.resize((_gray.width * 2, _gray.height * 2), PIL.Image.BICUBIC)
+
+
+def _rotate(image: 'PIL.Image.Image'):
+	import PIL.Image
+	import PIL.ImageOps
+	_gray = PIL.ImageOps.grayscale(image)
+	for _angle in (3, -3, 6, -6):
+		yield _gray.rotate(_angle, PIL.Image.BILINEAR, expand=True, fillcolor=255)
+
+
+def _sharpen(image: 'PIL.Image.Image'):
+	import PIL.ImageOps
+	import PIL.ImageFilter
+	yield PIL.ImageOps.grayscale(image).filter(PIL.ImageFilter.UnsharpMask(radius=2, percent=200, threshold=2))
+
+
+def _darkRuns(profile: list, threshold: int, gap: int = 1) -> list:
+	"""
+	Returns the (first, last) indices of the runs of profile values above threshold, runs separated by up to gap values are merged
+	"""
+	_runs = []
+	for n, _value in enumerate(profile):
+		if (_value <= threshold): continue
+		if ((len(_runs) > 0) and ((n - _runs[-1][1]) <= (gap + 1))):
+			_runs[-1][1] = n
+		else:
+			_runs.append([n, n])
+	return _runs
+
+
+def _span(profile: list, threshold: int) -> tuple:
+	"""
+	Returns the (first, last) indices spanning all runs at least half as long as the longest run, None if there are none
+	"""
+	_runs = _darkRuns(profile, threshold)
+	if (len(_runs) == 0): return None
+	_longest = max(_last - _first for _first, _last in _runs)
+	_runs = [n for n in _runs if ((n[1] - n[0]) >= (_longest / 2))]
+	return (_runs[0][0], _runs[-1][1])
+
+
+def locateQRRegion(image: 'PIL.Image.Image', hint: tuple = (0.0, 0.0, 1.0, 1.0), maxSize: int = 1000, margin: float = 0.1) -> tuple:
+	"""
+	Finds the region of the QR-Code(s) on a downscaled copy of a page image
+
+	Text printed at a small font size fades away when the image is downscaled by averaging, while the
+	large dark modules of the QR-Codes stay dark. The dark rows and columns of the downscaled copy are
+	grouped into runs, and the region spanning the longest runs (the QR-Codes of a grid as well) is
+	returned. Only the hinted part of the page, extended by margin, is searched.
+
+	Parameters:
+		image (PIL.Image.Image):
+			the (full resolution) page image
+		hint (tuple):
+			expected position of the QR-Code(s) as (left, top, right, bottom) fractions of the page, defaults to the whole page
+		maxSize (int):
+			longest side of the downscaled copy in pixel, defaults to 1000
+		margin (float):
+			fraction of the page the hint is extended by on every side, as scans are rarely aligned, defaults to 0.1
+
+	Returns a (left, top, right, bottom) box in pixel of the full resolution image, None if no region was found
+	"""
+	import PIL.Image
+	import PIL.ImageOps
+	_factor = max(1, -(-max(image.size) // maxSize))
+	_gray = PIL.ImageOps.grayscale(image)
+	if (_factor > 1): _gray = _gray.reduce(_factor)
+	_window = (
+		max(0, int((hint[0] - margin) * _gray.width)),
+		max(0, int((hint[1] - margin) * _gray.height)),
+		min(_gray.width, int((hint[2] + margin) * _gray.width) + 1),
+		min(_gray.height, int((hint[3] + margin) * _gray.height) + 1))
+	if ((_window[2] <= _window[0]) or (_window[3] <= _window[1])): return None
+	_dark = _gray.crop(_window).point(lambda p: 255 if (p < 128) else 0)
+	_rows = _span(list(_dark.resize((1, _dark.height), PIL.Image.BOX).tobytes()), 12) # more than ~5% dark pixel
+	if (_rows is None): return None
+	_dark = _dark.crop((0, _rows[0], _dark.width, _rows[1] + 1))
+	_columns = _span(list(_dark.resize((_dark.width, 1), PIL.Image.BOX).tobytes()), 12)
+	if (_columns is None): return None
+	_box = [_window[0] + _columns[0], _window[1] + _rows[0], _window[0] + _columns[1] + 1, _window[1] + _rows[1] + 1]
+	_padding = max(2, int(0.05 * max(_box[2] - _box[0], _box[3] - _box[1]))) # quiet zone, the QR-Codes are printed without one
+	return (
+		max(0, (_box[0] - _padding) * _factor),
+		max(0, (_box[1] - _padding) * _factor),
+		min(image.width, (_box[2] + _padding) * _factor),
+		min(image.height, (_box[3] + _padding) * _factor))
+
+
+def iterFrames(filename: str, dpi: int = 300):
+	"""
+	Iterates lazily over the pages of a scan file, only the current page is held in memory
+
+	Every frame of multi-frame images (e.g. a multi-page TIFF of a batch scan) is yielded, single images
+	yield one frame. PDF files are rendered page by page with the given resolution, which requires pymupdf.
+
+	Yields every page as PIL image, nothing if the file is neither an image nor a PDF file
+	"""
+	import PIL.Image
+	import PIL.ImageSequence
+	with open(filename, 'rb') as _file:
+		_isPDF = (_file.read(5) == b'%PDF-')
+	if (_isPDF):
+		try:
+			import pymupdf
+		except (ImportError):
+			try:
+				import fitz as pymupdf # releases before 1.24.3
+			except (ImportError):
+				raise ImportError('pymupdf missing')
+		with pymupdf.open(filename) as _document:
+			for _page in _document:
+				_pixmap = _page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY)
+				yield PIL.Image.frombytes('L', (_pixmap.width, _pixmap.height), _pixmap.samples)
+		return
+	try:
+		_image = PIL.Image.open(filename)
+	except (PIL.UnidentifiedImageError):
+		return
+	with _image:
+		for _frame in PIL.ImageSequence.Iterator(_image): # seeks to the next frame, the previous one is discarded
+			yield _frame
+
+
+class DecodeLadder:
+	"""
+	Reads QR-Codes from images, escalating through preprocessing steps only if a step finds no QR-Code
+
+	The first step is usually a plain decode of the image as loaded, so readable images cost a single
+	decode. Every step produces one or more variants of the image (e.g. several small rotations) that
+	are decoded until one of them contains a QR-Code. The number of attempts, successes and the time
+	spent are counted for every step, to tune the order of the steps for a given scanner.
+	"""
+
+	STEPS = {
+		'plain': _plain,               # the image as loaded
+		'autocontrast': _autocontrast, # grayscale with stretched contrast, for faded prints
+		'posterize': _posterize,       # autocontrast, posterize and grayscale, for webcam frames
+		'binarize': _binarize,         # black and white with Otsu's threshold, for uneven paper / toner
+		'rescale': _rescale,           # half size for large scans, double size for small photos
+		'rotate': _rotate,             # small rotations, for skewed pages
+		'sharpen': _sharpen            # unsharp mask, for blurry photos
+	}
+
+	DEFAULT_STEPS = ('plain', 'autocontrast', 'binarize', 'rescale', 'sharpen', 'rotate')
+
+	REGION_MIN_SIZE = 2500 # smaller images are decoded as a whole right away
+
+	def __init__(self, steps: tuple = DEFAULT_STEPS, regionHint: tuple = None, codesPerPage: int = 1):
+		"""Creates a new DecodeLadder object
+
+		Parameters:
+			steps (tuple):
+				the names of the steps (see DecodeLadder.STEPS) in the order they are tried, defaults to DecodeLadder.DEFAULT_STEPS
+			regionHint (tuple or None):
+				expected position of the QR-Code(s) as (left, top, right, bottom) fractions of the page, defaults to None
+				if set, the QR-Code region of large images is located (see locateQRRegion) and decoded first, the steps
+				are only tried on the whole image if no QR-Code was found in the region (counted as step 'region')
+			codesPerPage (int):
+				amount of QR-Codes a page should hold, e.g. the blocks per page of a grid layout, defaults to 1
+				if the region holds fewer QR-Codes, the steps are tried on the whole image as well
+		"""
+		if (not isinstance(steps, (tuple, list))): raise TypeError('steps must be tuple or list of str')
+		if (len(steps) == 0): raise ValueError('at least one step is required')
+		for _step in steps:
+			if (_step not in self.STEPS): raise ValueError(f'unknown step \'{_step}\', must be one of {", ".join(self.STEPS)}')
+		if (regionHint is not None):
+			if ((not isinstance(regionHint, (tuple, list))) or (len(regionHint) != 4)): raise TypeError('regionHint must be tuple of four floats or None')
+			if (not ((0 <= regionHint[0] < regionHint[2] <= 1) and (0 <= regionHint[1] < regionHint[3] <= 1))): raise ValueError('regionHint must be (left, top, right, bottom) fractions of the page')
+		if ((not isinstance(codesPerPage, int)) or isinstance(codesPerPage, bool)): raise TypeError('codesPerPage must be int')
+		if (codesPerPage < 1): raise ValueError('codesPerPage must be at least 1')
+		self._steps = tuple(steps)
+		self._regionHint = None if (regionHint is None) else tuple(regionHint)
+		self._codesPerPage = codesPerPage
+		self._lock = threading.Lock() # decode may be called from several threads
+		self.reset()
+
+
+	def __getstate__(self) -> dict:
+		_state = self.__dict__.copy()
+		del _state['_lock'] # locks cannot be pickled, e.g. to send a ladder to a process pool
+		return _state
+
+
+	def __setstate__(self, state: dict) -> None:
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+
+	def steps(self) -> tuple:
+		"""
+		Returns the names of the steps in the order they are tried
+		"""
+		return self._steps
+
+
+	def regionHint(self) -> tuple:
+		"""
+		Returns the expected position of the QR-Code(s) as (left, top, right, bottom) fractions of the page, None if the region is not located
+		"""
+		return self._regionHint
+
+
+	def codesPerPage(self) -> int:
+		"""
+		Returns the amount of QR-Codes a page should hold, fewer in the located region make the steps decode the whole image
+		"""
+		return self._codesPerPage
+
+
+	def __count(self, step: str, start: float, success: bool) -> None:
+		with self._lock:
+			self._stats[step]['attempts'] += 1
+			self._stats[step]['seconds'] += time.perf_counter() - start
+			if (success): self._stats[step]['successes'] += 1
+
+
+	def decode(self, image: 'PIL.Image.Image') -> list:
+		"""
+		Reads all QR-Codes from an image, requires pyzbar
+
+		Returns a list with the strings of all QR-Codes found by the first successful step (and in the located region, if any), an empty list if no step found any
+		"""
+		_regionStrings = []
+		if ((self._regionHint is not None) and (max(image.size) >= self.REGION_MIN_SIZE)):
+			_start = time.perf_counter()
+			_box = locateQRRegion(image, self._regionHint)
+			_regionStrings = [] if (_box is None) else self.__decodeVariants([image.crop(_box)])
+			self.__count('region', _start, len(_regionStrings) >= self._codesPerPage)
+			if (len(_regionStrings) >= self._codesPerPage): return _regionStrings
+		for _step in self._steps:
+			_start = time.perf_counter()
+			_qrStrings = self.__decodeVariants(self.STEPS[_step](image))
+			self.__count(_step, _start, len(_qrStrings) > 0)
+			if (len(_qrStrings) > 0): return _regionStrings + [n for n in _qrStrings if (n not in _regionStrings)]
+		return _regionStrings
+
+
+	def __decodeVariants(self, variants) -> list:
+		"""
+		Decodes the variants of an image until one of them contains a QR-Code
+
+		Returns a list with the strings of all QR-Codes found in that variant
+		"""
+		import pyzbar.pyzbar as pyzbar
+		for _variant in variants:
+			_codes = pyzbar.decode(_variant)
+			if (len(_codes) == 0): continue
+			_qrStrings = []
+			for n in _codes:
+				try:
+					_qrStrings.append(n.data.decode('ascii'))
+				except (UnicodeDecodeError): # not one of our QR-Codes
+					continue
+			return _qrStrings
+		return []
+
+
+	def stats(self) -> dict:
+		"""
+		Returns a dict with the attempts, successes and seconds spent of every step, by step name
+		"""
+		with self._lock:
+			return {n: dict(_counters) for n, _counters in self._stats.items()}
+
+
+	def merge(self, stats: dict) -> None:
+		"""
+		Adds the counters of another ladder (see stats), e.g. from a worker process
+
+		Returns None
+		"""
+		with self._lock:
+			for _step, _counters in stats.items():
+				if (_step not in self._stats): self._stats[_step] = {'attempts': 0, 'successes': 0, 'seconds': 0.0}
+				for _name, _value in _counters.items():
+					self._stats[_step][_name] += _value
+
+
+	def reset(self) -> None:
+		"""
+		Sets all counters to zero
+
+		Returns None
+		"""
+		with self._lock:
+			self._stats = {n: {'attempts': 0, 'successes': 0, 'seconds': 0.0} for n in ((('region',) if (self._regionHint is not None) else ()) + self._steps)}
+
+
+def decodeImageFile(filename: str, steps: tuple = DecodeLadder.DEFAULT_STEPS, regionHint: tuple = None, codesPerPage: int = 1) -> tuple:
+	"""
+	Reads all QR-Codes from every page of a scan file with a DecodeLadder of the given steps, region hint and QR-Codes per page
+
+	This is a module level function, so it can be pickled and run inside a process pool.
+	Requires pillow and pyzbar, PDF files also require pymupdf.
+
+	Returns a tuple with a list of the strings of all QR-Codes found (empty if the file is no image), the counters of the ladder and the seconds spent
+	"""
+	_start = time.perf_counter()
+	_ladder = DecodeLadder(steps, regionHint, codesPerPage)
+	_qrStrings = []
+	for _frame in iterFrames(filename):
+		_qrStrings += _ladder.decode(_frame)
+	return _qrStrings, _ladder.stats(), (time.perf_counter() - _start)
@@ -0,0 +1,151 @@
+import os
+import math
+from random import random
+from collections import deque
+from base64 import b64encode, b64decode, b32encode
+from .planner import ERROR_CORRECTION
+# qrcode (and with it pillow) is imported when the first QR-Code is encoded, restores never load it
+
+
+def encodeQRMatrix(data: str, force31: bool = False, parameters: tuple = None) -> list:
+	"""
+	Encodes a string into a QR-Code and returns its module matrix
+
+	This is a module level function, so it can be pickled and run inside a process pool.
+	parameters is a tuple of the version and the error correction level ('L', 'M', 'Q' or 'H') of a
+	planned data block QR-Code (see planner.qrParameters), None to choose them from the length of the data.
+
+	Returns a list of rows, each row a list of bools (True for a dark module)
+	"""
+	import qrcode
+	_qrCode = None
+	if (parameters is not None):
+		_qrCode = qrcode.QRCode(version=parameters[0], error_correction=ERROR_CORRECTION[parameters[1]], border=0)
+		_mode = qrcode.util.MODE_ALPHA_NUM if (data[:1] in BASE32_MARKERS) else qrcode.util.MODE_8BIT_BYTE
+		_qrCode.add_data(qrcode.util.QRData(data, mode=_mode))
+		_qrCode.make(False)
+		return _qrCode.get_matrix()
+	if (data[:1] in BASE32_MARKERS):
+		_version, _errorCorrection = base32QRParameters(len(data), force31)
+		_qrCode = qrcode.QRCode(version=_version, error_correction=_errorCorrection, border=0)
+		_qrCode.add_data(qrcode.util.QRData(data, mode=qrcode.util.MODE_ALPHA_NUM))
+		_qrCode.make(False)
+		return _qrCode.get_matrix()
+	if ((len(data) >= 262) or force31):
+		if (len(data) >= 1499):
+			_qrCode = qrcode.QRCode(version=31, error_correction=qrcode.ERROR_CORRECT_M, border=0)
+		else:
+			_qrCode = qrcode.QRCode(version=31, error_correction=qrcode.ERROR_CORRECT_Q, border=0)
+	else:
+		_qrCode = qrcode.QRCode(error_correction=qrcode.ERROR_CORRECT_M, border=0)
+	_qrCode.add_data(data, optimize=20)
+	_qrCode.make(True)
+	return _qrCode.get_matrix()
+
+
+BASE32_MARKERS = ('*', ':') # first character of Base32 encoded data and parity blocks (hcpb02 only)
+_BASE32_QR_PARAMETERS = {} # (version, error correction) by (payload length, force31), see base32QRParameters
+
+
+def base32QRParameters(length: int, force31: bool) -> tuple:
+	"""
+	Returns the version and error correction level of the QR-Code of a Base32 payload
+
+	The error correction is the strongest level that fits into the version the Base64 payload of the
+	same block would need, at the smallest version possible, so a QR-Code with a Base32 payload is
+	never larger and never less robust than one with a Base64 payload. Both only depend on the length
+	of the payload, so they are calculated once per block size.
+
+	Returns a tuple with the version and the error correction level (a qrcode.ERROR_CORRECT_* constant)
+	"""
+	if ((length, force31) in _BASE32_QR_PARAMETERS): return _BASE32_QR_PARAMETERS[(length, force31)]
+	import qrcode
+	_blockSize = (((length - 1) * 5) // 8) - 9 # without the marker and the 9 byte header
+	_base64Length = 13 + (4 * math.ceil(_blockSize / 3))
+	_start = 31 if ((_base64Length >= 262) or force31) else None # same rules as for Base64 payloads, see encodeQRMatrix
+	_levels = [qrcode.ERROR_CORRECT_H, qrcode.ERROR_CORRECT_Q]
+	if ((_start is None) or (_base64Length >= 1499)): _levels.append(qrcode.ERROR_CORRECT_M)
+	_reference = qrcode.QRCode(error_correction=_levels[-1], border=0)
+	_reference.add_data(qrcode.util.QRData(bytes(_base64Length), mode=qrcode.util.MODE_8BIT_BYTE, check_data=False))
+	_maxVersion = _reference.best_fit(_start)
+	for _errorCorrection in _levels:
+		_qrCode = qrcode.QRCode(error_correction=_errorCorrection, border=0)
+		_qrCode.add_data(qrcode.util.QRData('A' * length, mode=qrcode.util.MODE_ALPHA_NUM))
+		try:
+			_version = _qrCode.best_fit(_start)
+		except (qrcode.exceptions.DataOverflowError, ValueError): # too large for version 40, depending on the qrcode version
+			continue
+		if (_version <= _maxVersion): break
+	_BASE32_QR_PARAMETERS[(length, force31)] = (_version, _errorCorrection)
+	return _BASE32_QR_PARAMETERS[(length, force31)]
+
+
+def encodeQRMatrices(payloads, workers: int = 1, force31: bool = False, parameters: tuple = None):
+	"""
+	Encodes (payload, context) pairs into QR-Code matrices, optionally spread across a process pool
+
+	Yields (matrix, context) pairs in the same order as the input. At most a few payloads per
+	worker are in flight at any time, so payloads may be produced lazily by a generator.
+	"""
+	if (workers <= 1):
+		for _payload, _context in payloads:
+			yield (encodeQRMatrix(_payload, force31, parameters), _context)
+		return
+	from concurrent.futures import ProcessPoolExecutor
+	with ProcessPoolExecutor(max_workers=workers) as _executor:
+		_pending = deque()
+		for _payload, _context in payloads:
+			_pending.append((_executor.submit(encodeQRMatrix, _payload, force31, parameters), _context))
+			if (len(_pending) >= (workers * 4)):
+				_future, _context = _pending.popleft()
+				yield (_future.result(), _context)
+		while (_pending):
+			_future, _context = _pending.popleft()
+			yield (_future.result(), _context)
+
+
+def newDocumentID(formatVersion: int) -> bytes:
+	"""
+	Returns a random, Base64 encoded document id (16 bit for hcpb01, 48 bit for hcpb02)
+	"""
+	if (formatVersion == 1):
+		return b64encode(round((random()*65535)).to_bytes(2, byteorder='big'))
+	return b64encode(os.urandom(6))
+
+
+def encodeBlockPayload(blockID: int, documentID: bytes, blockData: bytes, formatVersion: int, base32: bool = False) -> str:
+	"""
+	Creates the QR-Code payload of a data block
+
+	hcpb01: [block id, 2 bytes][document id, 2 bytes][data], each Base64 encoded
+	hcpb02: $[block id, 3 bytes][document id, 6 bytes][data], each Base64 encoded
+	hcpb02 with base32: *[block id, 3 bytes][document id, 6 bytes][data], Base32 encoded as a whole, without padding
+		the payload only consists of characters of the QR-Code alphanumeric mode, which stores 5.5 instead of 8 bits per character
+
+	Returns the payload as str
+	"""
+	if (base32):
+		return '*' + b32encode((blockID).to_bytes(3, byteorder='big') + b64decode(documentID) + blockData).decode('ascii').rstrip('=')
+	if (formatVersion == 1):
+		_qrData = (b64encode((blockID).to_bytes(2, byteorder='big')) + documentID + b64encode(blockData))
+		# two byte (ushort) values always encode with a fill-character (=) at position 4 and 8,
+		# it marks the end of the page id and the start of the base64 encoded data block
+		if ((_qrData[3:4] != b'=') or (_qrData[7:8] != b'=')): raise ValueError('documentID must be 2 bytes, Base64 encoded, for hcpb01')
+	else:
+		_qrData = (b'$' + b64encode((blockID).to_bytes(3, byteorder='big')) + documentID + b64encode(blockData))
+		# 3 and 6 bytes encode to exactly 4 and 8 characters without padding, the data block always starts at position 14
+	return _qrData.decode('ascii')
+
+
+def encodeParityPayload(groupID: int, documentID: bytes, parityData: bytes, base32: bool = False) -> str:
+	"""
+	Creates the QR-Code payload of a parity block (hcpb02 only)
+
+	%[group id, 3 bytes][document id, 6 bytes][parity data], each Base64 encoded
+	with base32: :[group id, 3 bytes][document id, 6 bytes][parity data], Base32 encoded as a whole, without padding
+
+	Returns the payload as str
+	"""
+	if (base32):
+		return ':' + b32encode((groupID).to_bytes(3, byteorder='big') + b64decode(documentID) + parityData).decode('ascii').rstrip('=')
+	return (b'%' + b64encode((groupID).to_bytes(3, byteorder='big')) + documentID + b64encode(parityData)).decode('ascii')
@@ -0,0 +1,64 @@
+import time
+
+
+class StatsCollector:
+	"""
+	Observer (see PaperStorage.setObserver) that sums up the time spent in every stage and counts blocks, images and bytes
+
+	Collecting is cheap (a few dict updates per block), so it can be left enabled in production.
+	"""
+
+	def __init__(self, progress=None):
+		"""Creates a new StatsCollector object
+
+		Parameters:
+			progress (callable or None):
+				called with (event, info) for every 'block' and 'image' event, e.g. to print a progress bar, defaults to None
+		"""
+		if (not (callable(progress) or (progress is None))): raise TypeError('progress must be callable or None')
+		self._progress = progress
+		self._start = time.perf_counter()
+		self._stages = {} # stage name -> [calls, seconds]
+		self._counters = {'blocks': 0, 'images': 0, 'codes': 0, 'pages': 0, 'bytes': 0}
+
+
+	def __call__(self, event: str, info: dict) -> None:
+		if (event == 'stage'):
+			_stage = self._stages.setdefault(info['stage'], [0, 0.0])
+			_stage[0] += 1
+			_stage[1] += info['seconds']
+			return
+		if (event == 'block'):
+			self._counters['blocks'] += 1
+		elif (event == 'image'):
+			self._counters['images'] += 1
+			self._counters['codes'] += info['codes']
+		elif (event == 'done'):
+			self._counters['pages'] += info['pages'] or 0
+			self._counters['bytes'] += info['bytes'] or 0
+		if ((self._progress is not None) and (event in ('block', 'image'))): self._progress(event, info)
+
+
+	def stats(self) -> dict:
+		"""
+		Returns a dict with the seconds elapsed since the collector was created, the counters and the calls and seconds of every stage
+		"""
+		return {'seconds': time.perf_counter() - self._start, **self._counters,
+			'stages': {n: {'calls': _calls, 'seconds': _seconds} for n, (_calls, _seconds) in self._stages.items()}}
+
+
+	def report(self) -> str:
+		"""
+		Returns a stage breakdown (sorted by time spent) and the throughput as printable text
+		"""
+		_stats = self.stats()
+		_elapsed = max(_stats['seconds'], 1e-9)
+		_lines = [f'{"stage":<10} {"calls":>8} {"seconds":>9} {"share":>7}']
+		for _name, _stage in sorted(_stats['stages'].items(), key=lambda n: -n[1]['seconds']):
+			_lines.append(f'{_name:<10} {_stage["calls"]:>8} {_stage["seconds"]:>9.3f} {(100 * _stage["seconds"] / _elapsed):>6.1f}%')
+		_lines.append(f'{"total":<10} {"":>8} {_elapsed:>9.3f}')
+		if (_stats['blocks'] > 0):
+			_lines.append(f'{_stats["blocks"]} blocks, {_stats["pages"]} pages, {_stats["bytes"]} bytes: {(_stats["pages"] / _elapsed):.1f} pages/s, {(_stats["bytes"] / _elapsed):.0f} bytes/s')
+		if (_stats['images'] > 0):
+			_lines.append(f'{_stats["images"]} images, {_stats["codes"]} QR-Codes: {(_stats["images"] / _elapsed):.1f} images/s')
+		return '\n'.join(_lines)
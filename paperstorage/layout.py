@@ -0,0 +1,160 @@
+_METRICS = {} # FontMetrics by fontname, shared by all documents of a process, e.g. of a batch backup
+_LAYOUTS = {} # PageLayout by (fontname, width, height, border)
+
+
+class FontMetrics:
+	"""
+	Measures text of a font
+
+	Monospaced fonts (e.g. the default Courier) are measured once, the width of ASCII text is then
+	calculated from its length. The result is the exact value stringWidth would return, so text is
+	wrapped the same way. Other fonts and non-ASCII text are measured with stringWidth.
+	reportlab is imported with the first FontMetrics object, restores do not need it.
+	"""
+
+	def __init__(self, fontname: str):
+		"""Creates a new FontMetrics object
+
+		Parameters:
+			fontname (str):
+				name of a font registered with reportlab
+		"""
+		if (not isinstance(fontname, str)): raise TypeError('fontname must be str')
+		from reportlab.pdfbase.pdfmetrics import stringWidth
+		self._stringWidth = stringWidth
+		try: # stringWidth will throw an exception if the typeface does not exist
+			_widths = {stringWidth(chr(n), fontname, 1000) for n in range(32, 127)}
+		except (KeyError):
+			raise ValueError('invalid fontname specified / font not found')
+		self._fontname = fontname
+		_advance = _widths.pop() if (len(_widths) == 1) else None
+		self._advance = int(_advance) if ((_advance is not None) and float(_advance).is_integer()) else None # glyph width in 1/1000 of the fontsize
+
+
+	def fontname(self) -> str:
+		return self._fontname
+
+
+	def monospaced(self) -> bool:
+		"""
+		Returns True if the width of ASCII text is calculated from its length
+		"""
+		return (self._advance is not None)
+
+
+	def width(self, text: str, fontsize: float) -> float:
+		"""
+		Returns the width of text in points
+		"""
+		if ((self._advance is not None) and text.isascii() and text.isprintable()):
+			return (self._advance * len(text)) * 0.001 * fontsize # same order of operations as reportlab, see instanceStringWidthT1
+		return self._stringWidth(text, self._fontname, fontsize)
+
+
+	def wrap(self, line: str, fontsize: float, maxWidth: float) -> list:
+		"""
+		Splits a line of text into lines not wider than maxWidth, at spaces
+
+		Every word is followed by a space. A word wider than maxWidth gets a line of its own.
+
+		Returns a list of str
+		"""
+		if ((self._advance is not None) and line.isascii() and line.isprintable()):
+			_wordWidth = lambda word: (self._advance * (len(word) + 1)) * 0.001 * fontsize
+			if (_wordWidth(line) < (maxWidth * (1 - 1e-9))): return [f'{line} '] # fits, no need to measure every word
+		else:
+			_wordWidth = lambda word: self._stringWidth(f'{word} ', self._fontname, fontsize)
+		_lines = []
+		_textWidth = 0
+		_writeableWords = ''
+		for _word in line.split(' '):
+			_width = _wordWidth(_word)
+			_textWidth += _width
+			if (_textWidth > maxWidth):
+				_lines.append(_writeableWords)
+				_textWidth = _width
+				_writeableWords = ''
+			_writeableWords += f'{_word} '
+		_lines.append(_writeableWords)
+		return _lines
+
+
+def metricsFor(fontname: str) -> FontMetrics:
+	"""
+	Returns the FontMetrics of a font, created once per process
+	"""
+	if (fontname not in _METRICS): _METRICS[fontname] = FontMetrics(fontname)
+	return _METRICS[fontname]
+
+
+class PageLayout:
+	"""
+	Fontsize and text positions of a page format, shared by all documents with the same font and page format (see layoutFor)
+	"""
+
+	BASE32_MOCKUP = 'xx 12345678 12345678 12345678 12345678 12345678 12345678 12345678 12345678 12345678 12345678 xxxx'
+
+	def __init__(self, fontname: str, width: int, height: int, border: float):
+		"""Creates a new PageLayout object
+
+		Parameters:
+			fontname (str):
+				name of a font registered with reportlab
+			width (int):
+				width of the page in millimeters
+			height (int):
+				height of the page in millimeters
+			border (float):
+				left and right border in points
+		"""
+		from reportlab.lib.units import mm
+		self.metrics = metricsFor(fontname)
+		self.pageWidth = width * mm
+		self.pageHeight = height * mm
+		self.border = border
+		self.maxWidth = self.pageWidth - (2 * border)
+		self.fontsize = self.__fontsize()
+		self.lineHeight = self.fontsize * 1.15 # distance of the Base32 lines
+		self.spaceWidth = self.metrics.width(' ', self.fontsize)
+		self.qrSize = min(self.maxWidth, self.pageHeight - (40 * self.fontsize * 1.15)) # QR-Code of a data block, 40 lines of text are left for the rest of the page
+		_lastLine = self.pageHeight - (5 * self.fontsize) - 2 - ((6.5 * self.fontsize) + self.qrSize) # the Base32 lines start below the QR-Code and end above the footer
+		self.textLines = int(_lastLine // self.lineHeight) + 1 # Base32 lines of a data block that fit onto the page
+
+
+	def __fontsize(self) -> float:
+		"""
+		Returns the largest fontsize that fits 70 lines of text onto the page and a full Base32 line into its width
+		"""
+		_maxFontsizeHeight = round((self.pageHeight / 70), 1) # We must be able to print 70 lines of text ...
+		_maxFontsizeWidth = None # ... and at least a full base32 line with 10 blocks a 8 characters + checksum and line number
+		_start = round(_maxFontsizeHeight * 10) # fontsizes are searched in steps of 0.1, so we multiply by 10, e.g. 2.5 => 25
+		if (self.metrics.monospaced()): # the width grows linear with the fontsize, so the search can start just above the result
+			_start = min(_start, int((self.maxWidth * 10) / self.metrics.width(self.BASE32_MOCKUP, 1)) + 1)
+		for n in range(_start, 1, -1):
+			if (self.metrics.width(self.BASE32_MOCKUP, (n / 10)) < self.maxWidth):
+				_maxFontsizeWidth = (n / 10) # we must divide by 10 to get the original float value
+				break
+		if (_maxFontsizeWidth is None): raise ValueError('invalid document dimensions (too small width)')
+		return min(_maxFontsizeWidth, _maxFontsizeHeight)
+
+
+	def wrap(self, text: str, fontsize: float = None, maxWidth: float = None) -> list:
+		"""
+		Splits a text into the lines printed onto the page, see FontMetrics.wrap
+
+		Returns a list of str
+		"""
+		if (fontsize is None): fontsize = self.fontsize
+		if (maxWidth is None): maxWidth = self.maxWidth
+		_lines = []
+		for _line in text.splitlines(False):
+			_lines += self.metrics.wrap(_line, fontsize, maxWidth)
+		return _lines
+
+
+def layoutFor(fontname: str, width: int, height: int, border: float) -> PageLayout:
+	"""
+	Returns the PageLayout of a font and page format, created once per process
+	"""
+	if ((fontname, width, height, border) not in _LAYOUTS): _LAYOUTS[(fontname, width, height, border)] = PageLayout(fontname, width, height, border)
+	return _LAYOUTS[(fontname, width, height, border)]
@@ -4,19 +4,67 @@ import math
 import datetime
 import binascii
 import hashlib
-import qrcode
+import time
 from base64 import b64encode, b64decode, b32encode, b32decode, b85encode
-from socket import gethostname
-from random import random
-from reportlab.pdfgen.canvas import Canvas
-from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.units import mm
+from .decodecache import DecodeCache
+from .decoding import DecodeLadder, iterFrames, decodeImageFile
+from .encoding import BASE32_MARKERS, encodeQRMatrix, encodeQRMatrices, newDocumentID, encodeBlockPayload, encodeParityPayload
+from .layout import layoutFor
+from .planner import ERROR_CORRECTION, MAX_BLOCK_SIZE, qrParameters
+# qrcode, pillow, reportlab.pdfgen and the process pool are imported by the methods that need them, restores do not load the former
+from .blockstore import BlockStore, xorBlocks
+from .compression import CODECS, SAMPLE_SIZE, MANUAL_DECOMPRESSION, compress, compressor, decompressChunks, chooseCodec
+
+
+def _readFully(stream, size: int) -> bytes:
+	"""
+	Reads up to size bytes from a binary stream, pipes may return less than requested with a single read
+
+	Returns less than size bytes only at the end of the stream
+	"""
+	_data = bytearray()
+	while (len(_data) < size):
+		_chunk = stream.read(size - len(_data))
+		if (not _chunk): break
+		if (not isinstance(_chunk, bytes)): raise TypeError('stream must be opened in binary mode')
+		_data += _chunk
+	return bytes(_data)
+
+
+class _Checksums:
+	"""
+	Calculates the CRC32, MD5 and SHA256 checksums of data that is added in chunks
+	"""
+
+	def __init__(self):
+		self._crc32 = 0
+		self._md5 = hashlib.md5()
+		self._sha256 = hashlib.sha256()
+
+	def update(self, data: bytes) -> None:
+		self._crc32 = binascii.crc32(data, self._crc32)
+		self._md5.update(data)
+		self._sha256.update(data)
+
+	def crc32(self) -> str:
+		return hex(self._crc32)
+
+	def md5(self) -> str:
+		return self._md5.hexdigest()
+
+	def sha256(self) -> str:
+		return self._sha256.hexdigest()
+
 
 class PaperStorage:
 
 	A4 = (210, 297)     # The whole world... :-)
 	LETTER = (216, 279) # ... except north america. why are you like this. :-(
 
+	MAX_BLOCKS = {1: 65536, 2: 16777216} # block ids are 16 bit (hcpb01) or 24 bit (hcpb02) integers
+	MIN_MODULE_SIZE = 0.25 # smallest QR-Code module in a grid layout in millimeters, 3 dots at 300 dpi
+
 	_border = 20 * mm
 	_fontsize = None
 	_font = None
@@ -34,7 +82,16 @@ class PaperStorage:
 		writeDate: bool = True,
 		watermark: str = None,
 		fontname: str = 'Courier',
-		noMetaPage: bool = False):
+		noMetaPage: bool = False,
+		workers: int = 1,
+		vectorQRCodes: bool = False,
+		formatVersion: int = None,
+		compression: str = None,
+		parityGroupSize: int = None,
+		grid: (int, int) = None,
+		textLayer: bool = True,
+		qrEncoding: str = 'base64',
+		errorCorrection: str = None):
 		"""Creates a new PaperStorage object
 
 		Parameters:
@@ -44,7 +101,8 @@ class PaperStorage:
 				an identifier for the specified data, like a filename or a (very brief) description
 			blockSize (int):
 				create blocks (pages) with the following amount of bytes
-				must be between 50 and 1500 and should be multiple of 50, defaults to 1500
+				must be between 50 and 2650 and should be multiple of 50, defaults to 1500
+				the Base32 lines of a block must fit onto the page, unless textLayer is False
 			size (int, int):
 				tupel of the width and height of the new document in millimeters, defaults to DIN A4 (210mm x 297mm)
 				PaperStorage.LETTER can be used for the north american 'letter' format
@@ -59,21 +117,53 @@ class PaperStorage:
 				must be a monospace font (no exception will be raised otherwise, but the layout will look horrible)
 			noMetaPage (bool):
 				no first page (with meta information and restore instructions) is printed
+			workers (int):
+				number of processes used to encode the QR-Codes of the data blocks, defaults to 1 (no process pool)
+				the resulting document is the same for any number of workers
+			vectorQRCodes (bool):
+				draw the QR-Codes as vector shapes instead of embedding them as raster images, defaults to False
+				no raster images are created, the printer renders the QR-Codes at its native resolution
+			formatVersion (int or None):
+				1 for the hcpb01 format (16 bit block and document ids, up to 65536 blocks)
+				2 for the hcpb02 format (24 bit block ids and 48 bit document ids, for large backups)
+				defaults to None, hcpb01 is used if the data fits into it
+			compression (str or None):
+				compresses the data before it is split into blocks, 'zlib', 'lzma', 'bz2' or 'auto', defaults to None (no compression)
+				'auto' tries every codec on the first 64 KiB of the data and only compresses if it saves at least 10%
+				compressed backups use the hcpb02 format, they are decompressed transparently on restore
+			parityGroupSize (int or None):
+				adds a parity page (the XOR of the data blocks) for every group of parityGroupSize consecutive data blocks, defaults to None (no parity pages)
+				any single missing page of a group is rebuilt on restore, the overhead is 1 / parityGroupSize, must be at least 2
+				backups with parity pages use the hcpb02 format
+			grid (int, int) or None:
+				tupel of columns and rows of QR-Codes on every page, each with its own data block, defaults to None (one QR-Code per page)
+				the QR-Codes get smaller with every column / row, so the block size should be reduced accordingly
+				backups with a grid layout use the hcpb02 format
+			textLayer (bool):
+				prints the Base32 encoded data blocks below the QR-Codes for a manual restore, defaults to True
+			qrEncoding (str):
+				encoding of the data blocks inside the QR-Codes, 'base64' (QR-Code byte mode) or 'base32' (alphanumeric mode), defaults to 'base64'
+				'base32' stores about 17% more data per QR-Code, which is used for a stronger error correction or a smaller QR-Code
+				backups with Base32 encoded QR-Codes use the hcpb02 format
+			errorCorrection (str or None):
+				minimum error correction level of the data block QR-Codes, 'L', 'M', 'Q' or 'H', defaults to None (chosen from the block size)
+				the smallest QR-Code version that holds a full block at this level is used, with the strongest level that fits into it (see planner.planPage)
+				backups with planned QR-Codes use the hcpb02 format, the version and level are recorded in the metadata
 		"""
 		self._documentID = None
 		if (not (isinstance(data, bytes) or (data == None))):
 			if (isinstance(data, str)): raise TypeError('data must be bytes object or None - use classmethod fromStr to handle str')
 			else: raise TypeError('data must be bytes object or None - check classmethods for other data types')
-		elif (data != None):
-			self._documentID = b64encode(round((random()*65535)).to_bytes(2, byteorder='big'))
 		self._rawData = data
+		self._stream = None
+		self._streamConsumed = False
 		self._dataSize = 0 if (self._rawData == None) else len(self._rawData)
 
 		if (not (isinstance(identifier, str) or (identifier is None))): raise TypeError('identifier must be str or None')
 		self._identifier = identifier
 
 		if (not isinstance(blockSize, int)): raise TypeError('blockSize must be int')
-		if (not (blockSize in range(50, 1501))): raise ValueError('blockSize must be between 50 and 1500')
+		if (not (blockSize in range(50, MAX_BLOCK_SIZE + 1))): raise ValueError(f'blockSize must be between 50 and {MAX_BLOCK_SIZE}')
 		self._blockSize = blockSize
 
 		if ((not isinstance(size, type((int, int)))) or (not isinstance(size[0], int)) or (not isinstance(size[1], int))):
@@ -99,23 +189,78 @@ class PaperStorage:
 		if (not isinstance(noMetaPage, bool)): raise TypeError('noMetaPage must be bool')
 		self._noMetaPage = noMetaPage
 
-		self._blocks = dict()
+		if ((not isinstance(workers, int)) or isinstance(workers, bool)): raise TypeError('workers must be int')
+		if (workers < 1): raise ValueError('workers must be at least 1')
+		self._workers = workers
+
+		if (not isinstance(vectorQRCodes, bool)): raise TypeError('vectorQRCodes must be bool')
+		self._vectorQRCodes = vectorQRCodes
+
+		if (not ((formatVersion in (1, 2)) or (formatVersion is None))): raise ValueError('formatVersion must be 1, 2 or None')
+		self._formatVersion = formatVersion
+
+		if (not (isinstance(compression, str) or (compression is None))): raise TypeError('compression must be str or None')
+		if (not ((compression in CODECS) or (compression in ('auto', None)))): raise ValueError(f'compression must be None, \'auto\' or one of {", ".join(CODECS)}')
+		if ((compression in CODECS) and (formatVersion == 1)): raise ValueError('compressed backups require formatVersion 2')
+		self._compression = None # codec of the data in the blocks, None if the data is stored as-is
+		self._originalSize = self._dataSize # size of the uncompressed data
+		self._storedData = self._rawData # the data that is split into blocks
+		self._streamPrefix = b'' # data read from a stream in advance, to choose a codec
+		if ((self._rawData != None) and (compression is not None) and (formatVersion != 1)):
+			self._compression = chooseCodec(self._rawData[:SAMPLE_SIZE]) if (compression == 'auto') else compression
+			if (self._compression is not None):
+				self._storedData = compress(self._compression, self._rawData)
+				self._dataSize = len(self._storedData)
+
+		if (not (((isinstance(parityGroupSize, int)) and (not isinstance(parityGroupSize, bool))) or (parityGroupSize is None))): raise TypeError('parityGroupSize must be int or None')
+		if ((parityGroupSize is not None) and (parityGroupSize < 2)): raise ValueError('parityGroupSize must be at least 2')
+		if ((parityGroupSize is not None) and (formatVersion == 1)): raise ValueError('parity pages require formatVersion 2')
+		self._parityGroupSize = parityGroupSize
+
+		if (not ((grid is None) or (isinstance(grid, tuple) and (len(grid) == 2) and all(isinstance(n, int) and (not isinstance(n, bool)) for n in grid)))):
+			raise TypeError('grid must be int tupel or None, e.g. (2, 3)')
+		if ((grid is not None) and ((grid[0] < 1) or (grid[1] < 1))): raise ValueError('columns and rows of the grid must be at least 1')
+		if ((grid is not None) and (formatVersion == 1)): raise ValueError('grid layouts require formatVersion 2')
+		self._grid = grid
+		self._blocksPerPage = 1 if (grid is None) else (grid[0] * grid[1])
+
+		if (not isinstance(textLayer, bool)): raise TypeError('textLayer must be bool')
+		self._textLayer = textLayer
+
+		if (not isinstance(qrEncoding, str)): raise TypeError('qrEncoding must be str')
+		if (qrEncoding not in ('base64', 'base32')): raise ValueError('qrEncoding must be \'base64\' or \'base32\'')
+		if ((qrEncoding == 'base32') and (formatVersion == 1)): raise ValueError('Base32 encoded QR-Codes require formatVersion 2')
+		self._qrEncoding = qrEncoding
+
+		if (not (isinstance(errorCorrection, str) or (errorCorrection is None))): raise TypeError('errorCorrection must be str or None')
+		if (not ((errorCorrection in ERROR_CORRECTION) or (errorCorrection is None))): raise ValueError('errorCorrection must be None, \'L\', \'M\', \'Q\' or \'H\'')
+		if ((errorCorrection is not None) and (formatVersion == 1)): raise ValueError('planned QR-Codes require formatVersion 2')
+		self._qrParameters = None # version and error correction level of the data block QR-Codes, None if chosen from the block size
+		if (errorCorrection is not None):
+			self._qrParameters = qrParameters(blockSize, qrEncoding, errorCorrection)
+			if (self._qrParameters is None): raise ValueError(f'blockSize too large for a QR-Code with error correction level {errorCorrection}')
+
+		if (self._rawData != None):
+			if (self._formatVersion is None):
+				if ((self._compression is not None) or (self._parityGroupSize is not None) or (self._grid is not None) or (self._qrEncoding == 'base32') or (self._qrParameters is not None)): self._formatVersion = 2
+				else: self._formatVersion = 1 if (math.ceil(self._dataSize / self._blockSize) <= self.MAX_BLOCKS[1]) else 2
+			if (math.ceil(self._dataSize / self._blockSize) > self.MAX_BLOCKS[self._formatVersion]): raise ValueError('data too large for the format version / block size')
+			self._documentID = newDocumentID(self._formatVersion)
+
+		self._blockStore = BlockStore()
+		self._restoreFile = None
+		self._restoreFileComplete = False
+		self._checkpoint = None # see setCheckpoint
+		self._checkpointMetaData = None # last meta data string recorded, every pass over the first page reads it again
 		self._amountOfBlocks = 0
 		self._sha256 = None
 		self._document = None
-		self._binaryDocument = io.BytesIO()
-		_maxFontsizeHeight = round(((self._height * mm) / 70), 1) # We must be able to print 70 lines of text ...
-		_maxFontsizeWidth = None # ... and at least a full base32 line with 10 blocks a 8 characters + checksum and line number
-		_base32MockUp = "xx 12345678 12345678 12345678 12345678 12345678 12345678 12345678 12345678 12345678 12345678 xxxx"
-		for n in range(round(_maxFontsizeHeight * 10), 1, -1): # range can only use integers, so we multiply by 10, e.g. 2.5 => 25
-			try: # stringWidth will throw an exception if the typeface does not exist
-				if (stringWidth(_base32MockUp, self._font, (n / 10)) < ((self._width * mm) - (2 * self._border))):
-					_maxFontsizeWidth = (n / 10) # we must divide by 10 to get the original float value
-					break
-			except (KeyError):
-				raise ValueError('invalid fontname specified / font not found')
-		if (_maxFontsizeWidth is None): raise ValueError('invalid document dimensions (too small width)')
-		self._fontsize = min(_maxFontsizeWidth, _maxFontsizeHeight)
+		self._textState = None # font, font size and fill alpha of the text last set on the document, None if unknown, see __setTextStyle
+		self._renderedDocument = None # BytesIO with the last rendered document, see __invalidate
+		self._observer = None # see setObserver
+		self._layout = None # metrics of the font and page format, see __pageLayout
+		if ((fontname, size, blockSize, grid, textLayer) != ('Courier', self.A4, 1500, None, True)):
+			self.__pageLayout() # checked right away, the default layout always fits and is measured on first use
 
 
 	@classmethod
@@ -129,7 +274,16 @@ class PaperStorage:
 		writeDate: bool = True,
 		watermark: str = None,
 		fontname: str = 'Courier',
-		noMetaPage: bool = False):
+		noMetaPage: bool = False,
+		workers: int = 1,
+		vectorQRCodes: bool = False,
+		formatVersion: int = None,
+		compression: str = None,
+		parityGroupSize: int = None,
+		grid: (int, int) = None,
+		textLayer: bool = True,
+		qrEncoding: str = 'base64',
+		errorCorrection: str = None):
 		"""Creates a new PaperStorage object
 
 		Parameters:
@@ -141,7 +295,8 @@ class PaperStorage:
 				an identifier for the specified data, like a filename or a (very brief) description
 			blockSize (int):
 				create blocks (pages) with the following amount of bytes
-				must be between 50 and 1500 and should be multiple of 50, defaults to 1500
+				must be between 50 and 2650 and should be multiple of 50, defaults to 1500
+				the Base32 lines of a block must fit onto the page, unless textLayer is False
 			size (int, int):
 				tupel of the width and height of the new document in millimeters, defaults to DIN A4 (210mm x 297mm)
 				PaperStorage.LETTER can be used for the north american 'letter' format
@@ -156,11 +311,43 @@ class PaperStorage:
 				must be a monospace font (no exception will be raised otherwise, but the layout will look horrible)
 			noMetaPage (bool):
 				no first page (with meta information and restore instructions) is printed
+			workers (int):
+				number of processes used to encode the QR-Codes of the data blocks, defaults to 1 (no process pool)
+				the resulting document is the same for any number of workers
+			vectorQRCodes (bool):
+				draw the QR-Codes as vector shapes instead of embedding them as raster images, defaults to False
+				no raster images are created, the printer renders the QR-Codes at its native resolution
+			formatVersion (int or None):
+				1 for the hcpb01 format (16 bit block and document ids, up to 65536 blocks)
+				2 for the hcpb02 format (24 bit block ids and 48 bit document ids, for large backups)
+				defaults to None, hcpb01 is used if the data fits into it
+			compression (str or None):
+				compresses the data before it is split into blocks, 'zlib', 'lzma', 'bz2' or 'auto', defaults to None (no compression)
+				'auto' tries every codec on the first 64 KiB of the data and only compresses if it saves at least 10%
+				compressed backups use the hcpb02 format, they are decompressed transparently on restore
+			parityGroupSize (int or None):
+				adds a parity page (the XOR of the data blocks) for every group of parityGroupSize consecutive data blocks, defaults to None (no parity pages)
+				any single missing page of a group is rebuilt on restore, the overhead is 1 / parityGroupSize, must be at least 2
+				backups with parity pages use the hcpb02 format
+			grid (int, int) or None:
+				tupel of columns and rows of QR-Codes on every page, each with its own data block, defaults to None (one QR-Code per page)
+				the QR-Codes get smaller with every column / row, so the block size should be reduced accordingly
+				backups with a grid layout use the hcpb02 format
+			textLayer (bool):
+				prints the Base32 encoded data blocks below the QR-Codes for a manual restore, defaults to True
+			qrEncoding (str):
+				encoding of the data blocks inside the QR-Codes, 'base64' (QR-Code byte mode) or 'base32' (alphanumeric mode), defaults to 'base64'
+				'base32' stores about 17% more data per QR-Code, which is used for a stronger error correction or a smaller QR-Code
+				backups with Base32 encoded QR-Codes use the hcpb02 format
+			errorCorrection (str or None):
+				minimum error correction level of the data block QR-Codes, 'L', 'M', 'Q' or 'H', defaults to None (chosen from the block size)
+				the smallest QR-Code version that holds a full block at this level is used, with the strongest level that fits into it (see planner.planPage)
+				backups with planned QR-Codes use the hcpb02 format, the version and level are recorded in the metadata
 		"""
 		if ((not isinstance(data, str)) or (not isinstance(encoding, str))): raise TypeError('expected str')
 
 		_strToBytes = bytes(data, encoding)
-		return cls(_strToBytes, identifier=identifier, blockSize=blockSize, size=size, writeHostname=writeHostname, writeDate=writeDate, watermark=watermark, fontname=fontname, noMetaPage=noMetaPage)
+		return cls(_strToBytes, identifier=identifier, blockSize=blockSize, size=size, writeHostname=writeHostname, writeDate=writeDate, watermark=watermark, fontname=fontname, noMetaPage=noMetaPage, workers=workers, vectorQRCodes=vectorQRCodes, formatVersion=formatVersion, compression=compression, parityGroupSize=parityGroupSize, grid=grid, textLayer=textLayer, qrEncoding=qrEncoding, errorCorrection=errorCorrection)
 
 
 	@classmethod
@@ -173,7 +360,16 @@ class PaperStorage:
 		writeDate: bool = True,
 		watermark: str = None,
 		fontname: str = 'Courier',
-		noMetaPage: bool = False):
+		noMetaPage: bool = False,
+		workers: int = 1,
+		vectorQRCodes: bool = False,
+		formatVersion: int = None,
+		compression: str = None,
+		parityGroupSize: int = None,
+		grid: (int, int) = None,
+		textLayer: bool = True,
+		qrEncoding: str = 'base64',
+		errorCorrection: str = None):
 		"""Creates a new PaperStorage object
 
 		Parameters:
@@ -183,7 +379,8 @@ class PaperStorage:
 				an identifier for the specified data, like a filename or a (very brief) description
 			blockSize (int):
 				create blocks (pages) with the following amount of bytes
-				must be between 50 and 1500 and should be multiple of 50, defaults to 1500
+				must be between 50 and 2650 and should be multiple of 50, defaults to 1500
+				the Base32 lines of a block must fit onto the page, unless textLayer is False
 			size (int, int):
 				tupel of the width and height of the new document in millimeters, defaults to DIN A4 (210mm x 297mm)
 				PaperStorage.LETTER can be used for the north american 'letter' format
@@ -198,6 +395,38 @@ class PaperStorage:
 				must be a monospace font (no exception will be raised otherwise, but the layout will look horrible)
 			noMetaPage (bool):
 				no first page (with meta information and restore instructions) is printed
+			workers (int):
+				number of processes used to encode the QR-Codes of the data blocks, defaults to 1 (no process pool)
+				the resulting document is the same for any number of workers
+			vectorQRCodes (bool):
+				draw the QR-Codes as vector shapes instead of embedding them as raster images, defaults to False
+				no raster images are created, the printer renders the QR-Codes at its native resolution
+			formatVersion (int or None):
+				1 for the hcpb01 format (16 bit block and document ids, up to 65536 blocks)
+				2 for the hcpb02 format (24 bit block ids and 48 bit document ids, for large backups)
+				defaults to None, hcpb01 is used if the data fits into it
+			compression (str or None):
+				compresses the data before it is split into blocks, 'zlib', 'lzma', 'bz2' or 'auto', defaults to None (no compression)
+				'auto' tries every codec on the first 64 KiB of the data and only compresses if it saves at least 10%
+				compressed backups use the hcpb02 format, they are decompressed transparently on restore
+			parityGroupSize (int or None):
+				adds a parity page (the XOR of the data blocks) for every group of parityGroupSize consecutive data blocks, defaults to None (no parity pages)
+				any single missing page of a group is rebuilt on restore, the overhead is 1 / parityGroupSize, must be at least 2
+				backups with parity pages use the hcpb02 format
+			grid (int, int) or None:
+				tupel of columns and rows of QR-Codes on every page, each with its own data block, defaults to None (one QR-Code per page)
+				the QR-Codes get smaller with every column / row, so the block size should be reduced accordingly
+				backups with a grid layout use the hcpb02 format
+			textLayer (bool):
+				prints the Base32 encoded data blocks below the QR-Codes for a manual restore, defaults to True
+			qrEncoding (str):
+				encoding of the data blocks inside the QR-Codes, 'base64' (QR-Code byte mode) or 'base32' (alphanumeric mode), defaults to 'base64'
+				'base32' stores about 17% more data per QR-Code, which is used for a stronger error correction or a smaller QR-Code
+				backups with Base32 encoded QR-Codes use the hcpb02 format
+			errorCorrection (str or None):
+				minimum error correction level of the data block QR-Codes, 'L', 'M', 'Q' or 'H', defaults to None (chosen from the block size)
+				the smallest QR-Code version that holds a full block at this level is used, with the strongest level that fits into it (see planner.planPage)
+				backups with planned QR-Codes use the hcpb02 format, the version and level are recorded in the metadata
 		"""
 		if (not isinstance(filename, str)): raise TypeError('expected str')
 
@@ -208,11 +437,140 @@ class PaperStorage:
 		_fileToBytes = bytes(_file.read())
 		_file.close()
 		if (identifier == None): identifier = filename
-		return cls(_fileToBytes, identifier=identifier, blockSize=blockSize, size=size, writeHostname=writeHostname, writeDate=writeDate, watermark=watermark, fontname=fontname, noMetaPage=noMetaPage)
+		return cls(_fileToBytes, identifier=identifier, blockSize=blockSize, size=size, writeHostname=writeHostname, writeDate=writeDate, watermark=watermark, fontname=fontname, noMetaPage=noMetaPage, workers=workers, vectorQRCodes=vectorQRCodes, formatVersion=formatVersion, compression=compression, parityGroupSize=parityGroupSize, grid=grid, textLayer=textLayer, qrEncoding=qrEncoding, errorCorrection=errorCorrection)
 
 
+	@classmethod
+	def fromStream(cls,
+		stream,
+		identifier: str = None,
+		blockSize: int = 1500,
+		size: (int, int) = A4,
+		writeHostname: bool = True,
+		writeDate: bool = True,
+		watermark: str = None,
+		fontname: str = 'Courier',
+		noMetaPage: bool = False,
+		workers: int = 1,
+		vectorQRCodes: bool = False,
+		formatVersion: int = None,
+		compression: str = None,
+		parityGroupSize: int = None,
+		grid: (int, int) = None,
+		textLayer: bool = True,
+		qrEncoding: str = 'base64',
+		errorCorrection: str = None):
+		"""Creates a new PaperStorage object that reads its data from a binary stream
+
+		The stream is read block by block while the document is rendered (by savePDF or getPDF), so the
+		data is never held in memory as a whole. Checksums and sizes on the first page and in the page
+		headers are filled in once the stream is exhausted. As the stream is consumed by rendering, the
+		document can only be rendered once (it is cached by savePDF and getPDF, but not by writePDF on
+		first use) and getData will return None.
+
+		Streams use the hcpb01 format by default, unless the size of a regular file is known to exceed its
+		block limit. Larger streams of unknown size (e.g. pipes) need formatVersion 2, rendering them as
+		hcpb01 raises ValueError when the block limit is reached.
 
-	def restoreMetaData(self, identifier: str, size: int, documentID: str = None, blockSize: int = 1500, sha256Hash: str = None) -> bool:
+		Parameters:
+			stream (binary file object):
+				the stream to read the data from, e.g. an opened file or sys.stdin.buffer
+			identifier (str or None):
+				an identifier for the specified data, like a filename or a (very brief) description
+			blockSize (int):
+				create blocks (pages) with the following amount of bytes
+				must be between 50 and 2650 and should be multiple of 50, defaults to 1500
+				the Base32 lines of a block must fit onto the page, unless textLayer is False
+			size (int, int):
+				tupel of the width and height of the new document in millimeters, defaults to DIN A4 (210mm x 297mm)
+				PaperStorage.LETTER can be used for the north american 'letter' format
+			writeHostname (bool):
+				prints the hostname of this machine onto the document, defaults to True
+			writeDate (bool):
+				prints the current date onto the document, defaults to True
+			watermark (str or None):
+				embed a string as a watermark on every page, defaults to None
+			fontname (str):
+				sets the font to use in the pdf, defaults to Courier (built-in),
+				must be a monospace font (no exception will be raised otherwise, but the layout will look horrible)
+			noMetaPage (bool):
+				no first page (with meta information and restore instructions) is printed
+			workers (int):
+				number of processes used to encode the QR-Codes of the data blocks, defaults to 1 (no process pool)
+				the resulting document is the same for any number of workers
+			vectorQRCodes (bool):
+				draw the QR-Codes as vector shapes instead of embedding them as raster images, defaults to False
+				no raster images are created, the printer renders the QR-Codes at its native resolution
+			formatVersion (int or None):
+				1 for the hcpb01 format (16 bit block and document ids, up to 65536 blocks)
+				2 for the hcpb02 format (24 bit block ids and 48 bit document ids, for large backups)
+				defaults to None, hcpb01 is used if the data fits into it
+			compression (str or None):
+				compresses the data before it is split into blocks, 'zlib', 'lzma', 'bz2' or 'auto', defaults to None (no compression)
+				'auto' tries every codec on the first 64 KiB of the data and only compresses if it saves at least 10%
+				compressed backups use the hcpb02 format, they are decompressed transparently on restore
+			parityGroupSize (int or None):
+				adds a parity page (the XOR of the data blocks) for every group of parityGroupSize consecutive data blocks, defaults to None (no parity pages)
+				any single missing page of a group is rebuilt on restore, the overhead is 1 / parityGroupSize, must be at least 2
+				backups with parity pages use the hcpb02 format
+			grid (int, int) or None:
+				tupel of columns and rows of QR-Codes on every page, each with its own data block, defaults to None (one QR-Code per page)
+				the QR-Codes get smaller with every column / row, so the block size should be reduced accordingly
+				backups with a grid layout use the hcpb02 format
+			textLayer (bool):
+				prints the Base32 encoded data blocks below the QR-Codes for a manual restore, defaults to True
+			qrEncoding (str):
+				encoding of the data blocks inside the QR-Codes, 'base64' (QR-Code byte mode) or 'base32' (alphanumeric mode), defaults to 'base64'
+				'base32' stores about 17% more data per QR-Code, which is used for a stronger error correction or a smaller QR-Code
+				backups with Base32 encoded QR-Codes use the hcpb02 format
+			errorCorrection (str or None):
+				minimum error correction level of the data block QR-Codes, 'L', 'M', 'Q' or 'H', defaults to None (chosen from the block size)
+				the smallest QR-Code version that holds a full block at this level is used, with the strongest level that fits into it (see planner.planPage)
+				backups with planned QR-Codes use the hcpb02 format, the version and level are recorded in the metadata
+		"""
+		if (not callable(getattr(stream, 'read', None))): raise TypeError('stream must be a binary file object')
+
+		if ((identifier == None) and isinstance(getattr(stream, 'name', None), str) and (not stream.name.startswith('<'))):
+			identifier = stream.name # e.g. opened files, but not <stdin>
+		_ps = cls(None, identifier=identifier, blockSize=blockSize, size=size, writeHostname=writeHostname, writeDate=writeDate, watermark=watermark, fontname=fontname, noMetaPage=noMetaPage, workers=workers, vectorQRCodes=vectorQRCodes, formatVersion=formatVersion, compression=compression, parityGroupSize=parityGroupSize, grid=grid, textLayer=textLayer, qrEncoding=qrEncoding, errorCorrection=errorCorrection)
+		if ((compression == 'auto') and (_ps._formatVersion != 1)):
+			_ps._streamPrefix = _readFully(stream, SAMPLE_SIZE) # kept and rendered first
+			_ps._compression = chooseCodec(_ps._streamPrefix)
+		elif (compression in CODECS): # 'auto' means no compression with hcpb01, explicit codecs were rejected by the constructor
+			_ps._compression = compression
+		if ((_ps._formatVersion is None) and ((_ps._compression is not None) or (parityGroupSize is not None) or (grid is not None) or (qrEncoding == 'base32') or (errorCorrection is not None))):
+			_ps._formatVersion = 2
+		elif (_ps._formatVersion is None):
+			try: # the size of regular files is known in advance, hcpb02 only if it exceeds the hcpb01 block limit
+				_expectedSize = os.fstat(stream.fileno()).st_size if (stream.seekable()) else None
+			except (Exception):
+				_expectedSize = None
+			_ps._formatVersion = 2 if ((_expectedSize is not None) and (math.ceil(_expectedSize / blockSize) > cls.MAX_BLOCKS[1])) else 1
+		_ps._documentID = newDocumentID(_ps._formatVersion)
+		_ps._stream = stream
+		return _ps
+
+
+	@classmethod
+	def resume(cls, filename: str):
+		"""Creates a new PaperStorage object that continues the restore recorded in a checkpoint file
+
+		The meta data and the blocks recorded in the file are restored, every QR-Code restored from now on is
+		appended to it, see setCheckpoint. A new checkpoint file is created if the file does not exist.
+
+		Parameters:
+			filename (str):
+				path of the checkpoint file
+
+		Returns a new PaperStorage object, raises ValueError if the checkpoint file cannot be opened
+		"""
+		if ((not isinstance(filename, str)) or (len(filename) == 0)): raise TypeError('filename must be non-empty str')
+		_ps = cls()
+		if (not _ps.setCheckpoint(filename)): raise ValueError('cannot open checkpoint file with given filename')
+		return _ps
+
+
+	def restoreMetaData(self, identifier: str, size: int, documentID: str = None, blockSize: int = 1500, sha256Hash: str = None, compression: str = None, originalSize: int = None, parityGroupSize: int = None, blocksPerPage: int = None, qrVersion: int = None, errorCorrection: str = None) -> bool:
 		"""Sets the meta data, typically to start the restore process of a backup
 
 		Parameters:
@@ -221,26 +579,57 @@ class PaperStorage:
 			size (int):
 				the size of the file in bytes
 			documentID (str or None):
-				the four character, base64 encoded document id or None to disable document id checks
+				the four (hcpb01) or eight (hcpb02) character, base64 encoded document id or None to disable document id checks
 				if no document id is specified, it's possible that two backups are mixed together
 			blockSize (int)
 				the block size used in the backup, can also be calculated with (number of base32 lines * 50), defaults to 1500
 			sha256Hash (str or None)
 				the sha256 hash of the file or None to disable any integrity check
+			compression (str or None)
+				the codec the data blocks are compressed with ('zlib', 'lzma' or 'bz2') or None if the data is not compressed
+			originalSize (int or None)
+				the size of the file before compression, None if unknown
+			parityGroupSize (int or None)
+				the amount of consecutive data blocks protected by one parity block or None if the backup has no parity blocks
+			blocksPerPage (int or None)
+				the amount of data blocks (QR-Codes) per page of a grid layout or None for one data block per page
+			qrVersion (int or None)
+				the version of the data block QR-Codes of a backup with planned QR-Codes or None if chosen from the block size
+			errorCorrection (str or None)
+				the error correction level ('L', 'M', 'Q' or 'H') of the planned QR-Codes, given together with qrVersion
 
 		Returns False if any binary data is already loaded, True otherwise
 		"""
 		if (not isinstance(size, int)): raise TypeError('size must be int')
 		if (not isinstance(blockSize, int)): raise TypeError('blockSize must be int')
-		if (not (blockSize in range(50, 1501, 50))): raise ValueError('blocksize invalid, must be any multiple of 50 between 50 and 1500')
-		if (self._rawData != None): return False
+		if (not (blockSize in range(50, MAX_BLOCK_SIZE + 1, 50))): raise ValueError(f'blocksize invalid, must be any multiple of 50 between 50 and {MAX_BLOCK_SIZE}')
+		if (not ((compression in CODECS) or (compression is None))): raise ValueError(f'compression must be None or one of {", ".join(CODECS)}')
+		if (not (isinstance(originalSize, int) or (originalSize is None))): raise TypeError('originalSize must be int or None')
+		if (not (isinstance(parityGroupSize, int) or (parityGroupSize is None))): raise TypeError('parityGroupSize must be int or None')
+		if ((parityGroupSize is not None) and (parityGroupSize < 2)): raise ValueError('parityGroupSize must be at least 2')
+		if (not (isinstance(blocksPerPage, int) or (blocksPerPage is None))): raise TypeError('blocksPerPage must be int or None')
+		if ((blocksPerPage is not None) and (blocksPerPage < 1)): raise ValueError('blocksPerPage must be at least 1')
+		if (not ((isinstance(qrVersion, int) and (not isinstance(qrVersion, bool))) or (qrVersion is None))): raise TypeError('qrVersion must be int or None')
+		if (not ((errorCorrection in ERROR_CORRECTION) or (errorCorrection is None))): raise ValueError('errorCorrection must be None, \'L\', \'M\', \'Q\' or \'H\'')
+		if ((qrVersion is None) != (errorCorrection is None)): raise ValueError('qrVersion and errorCorrection must be given together')
+		if ((qrVersion is not None) and ((not (1 <= qrVersion <= 40)) or (qrParameters(blockSize, 'base32', errorCorrection, qrVersion) is None))): # Base32 is the smaller payload
+			raise ValueError('qrVersion invalid, a block does not fit into a QR-Code of that version and error correction level')
+		if (self._rawData != None): return self.__restored('metadata', None, 'duplicate')
 
 		self._identifier = identifier
 		self._dataSize = size
 		self._documentID = documentID
 		self._blockSize = blockSize
-		self._amountOfBlocks = math.ceil(self._dataSize / self._blockSize)
 		self._sha256 = sha256Hash
+		self._compression = compression
+		self._originalSize = size if (originalSize is None) else originalSize
+		self._parityGroupSize = parityGroupSize
+		self._blocksPerPage = 1 if (blocksPerPage is None) else blocksPerPage
+		self._qrParameters = None if (qrVersion is None) else (qrVersion, errorCorrection)
+		if (parityGroupSize is not None): self._blockStore.setParity(parityGroupSize)
+		self._blockStore.setLayout(self._dataSize, self._blockSize)
+		self._amountOfBlocks = self._blockStore.amountOfBlocks()
+		return self.__restored('metadata', None, 'received')
 
 
 	def restoreDataBlock(self, blockID: int, blockData: bytes, documentID: str = None):
@@ -253,20 +642,43 @@ class PaperStorage:
 			blockData (bytes):
 				binary data of the data block
 			documentID (str or None):
-				the four character, base64 encoded document id or None to disable document id checks
+				the four (hcpb01) or eight (hcpb02) character, base64 encoded document id or None to disable document id checks
 				if no document id is specified, it's possible that two backups are mixed together
 
 		Returns False is the block is already loaded or the document id is invalid, True otherwise
 		"""
 		if (not isinstance(blockID, int)): raise TypeError('blockID must be int')
 		if (not isinstance(blockData, bytes)): raise TypeError('blockData must be bytes')
-		if (self._rawData != None): return False
-		if (self._blocks.get(blockID, None) != None): return False
-		if ((self._documentID != None) and (documentID != None) and (self._documentID != documentID)): return False
-		if (self._amountOfBlocks < (blockID + 1)): self._amountOfBlocks = blockID + 1
-		if (len(blockData) > self._blockSize): self._blockSize = len(blockData)
-		self._blocks[blockID] = blockData
-		return True
+		if (self._rawData != None): return self.__restored('data', blockID, 'duplicate')
+		if ((self._documentID != None) and (documentID != None) and (self._documentID != documentID)): return self.__restored('data', blockID, 'wrongDocument')
+		if (not self._blockStore.add(blockID, blockData)): return self.__restored('data', blockID, 'duplicate' if (self._blockStore.has(blockID)) else 'invalid')
+		self._amountOfBlocks = self._blockStore.amountOfBlocks()
+		self._blockSize = self._blockStore.blockSize()
+		return self.__restored('data', blockID, 'received')
+
+
+	def restoreParityBlock(self, groupID: int, parityData: bytes, documentID: str = None) -> bool:
+		"""
+		Sets a parity block, typically during the restore process of a backup
+
+		As soon as all but one data block of its group are read, the missing data block is rebuilt from the parity block.
+
+		Parameters:
+			groupID (int):
+				id of the group of data blocks the parity block belongs to
+			parityData (bytes):
+				binary data of the parity block
+			documentID (str or None):
+				the eight character, base64 encoded document id or None to disable document id checks
+
+		Returns False is the parity block is already loaded or the document id is invalid, True otherwise
+		"""
+		if (not isinstance(groupID, int)): raise TypeError('groupID must be int')
+		if (not isinstance(parityData, bytes)): raise TypeError('parityData must be bytes')
+		if (self._rawData != None): return self.__restored('parity', groupID, 'duplicate')
+		if ((self._documentID != None) and (documentID != None) and (self._documentID != documentID)): return self.__restored('parity', groupID, 'wrongDocument')
+		if (not self._blockStore.addParity(groupID, parityData)): return self.__restored('parity', groupID, 'duplicate' if (self._blockStore.hasParity(groupID)) else 'invalid')
+		return self.__restored('parity', groupID, 'received')
 
 
 	def restoreFromQRString(self, qrData: str) -> bool:
@@ -274,25 +686,50 @@ class PaperStorage:
 		Restores meta data or a data block from a QR data string
 
 		Parameters:
-			qrData (str):
-				a string from a QR code, as-is without any modifications
+			qrData (str or bytes):
+				a string from a QR code, as-is without any modifications, or the raw data of the QR code (e.g. as returned by pyzbar)
 
 		Returns False if the string is invalid, True otherwise
 		"""
-		if (qrData[:6] == 'hcpb01'):
-			qrDataChunks = qrData.split(',')
-			if (len(qrDataChunks) != 6):
-				return False
-			return self.restoreMetaData(b64decode(qrDataChunks[2].encode('ascii')).decode('utf-8'), int(qrDataChunks[3]), qrDataChunks[1], int(qrDataChunks[4]), qrDataChunks[5])
-		elif ((len(qrData) > 8) and (qrData[3] == '=') and (qrData[7] == '=')):
-			return self.restoreDataBlock(int.from_bytes(b64decode(qrData[0:4]), byteorder='big', signed=False), b64decode(qrData[8:]), str(qrData[4:8]))
-		return False
+		if (not self.__restoreQRString(qrData)): return False
+		if (self._checkpoint is not None): self.__appendCheckpoint(qrData.encode('ascii') if (isinstance(qrData, str)) else bytes(qrData))
+		return True
 
 
-	def restoreFromFolder(self, folder: str, supressImportError: bool = True) -> bool:
+	def __restoreQRString(self, qrData: str) -> bool:
+		"""
+		Parses a QR data string and restores its meta data or block, see restoreFromQRString
+		"""
+		try:
+			if (isinstance(qrData, bytes)): qrData = qrData.decode('ascii')
+			if (qrData[:6] in ('hcpb01', 'hcpb02')):
+				qrDataChunks = qrData.split(',')
+				if ((len(qrDataChunks) != 6) and ((qrData[:6] == 'hcpb01') or (len(qrDataChunks) < 6))): # hcpb02 may be extended by further fields
+					return self.__restored('metadata', None, 'invalid')
+				_extensions = dict(n.split('=', 1) for n in qrDataChunks[6:] if ('=' in n)) # hcpb02 extension fields, unknown ones are ignored
+				return self.restoreMetaData(b64decode(qrDataChunks[2].encode('ascii')).decode('utf-8'), int(qrDataChunks[3]), qrDataChunks[1], int(qrDataChunks[4]), qrDataChunks[5],
+					_extensions.get('c'), (int(_extensions['o']) if ('o' in _extensions) else None), (int(_extensions['p']) if ('p' in _extensions) else None),
+					(int(_extensions['b']) if ('b' in _extensions) else None), (int(_extensions['v']) if ('v' in _extensions) else None), _extensions.get('e'))
+			elif ((len(qrData) > 8) and (qrData[3] == '=') and (qrData[7] == '=')): # hcpb01 data block
+				return self.restoreDataBlock(int.from_bytes(b64decode(qrData[0:4]), byteorder='big', signed=False), b64decode(qrData[8:]), str(qrData[4:8]))
+			elif ((len(qrData) > 13) and (qrData[0] == '$')): # hcpb02 data block
+				return self.restoreDataBlock(int.from_bytes(b64decode(qrData[1:5]), byteorder='big', signed=False), b64decode(qrData[13:]), str(qrData[5:13]))
+			elif ((len(qrData) > 13) and (qrData[0] == '%')): # hcpb02 parity block
+				return self.restoreParityBlock(int.from_bytes(b64decode(qrData[1:5]), byteorder='big', signed=False), b64decode(qrData[13:]), str(qrData[5:13]))
+			elif ((len(qrData) > 15) and (qrData[0] in BASE32_MARKERS)): # hcpb02 data or parity block, Base32 encoded
+				_raw = b32decode(qrData[1:] + ('=' * (-(len(qrData) - 1) % 8)))
+				_restore = self.restoreDataBlock if (qrData[0] == '*') else self.restoreParityBlock
+				return _restore(int.from_bytes(_raw[:3], byteorder='big', signed=False), _raw[9:], b64encode(_raw[3:9]).decode('ascii'))
+		except (binascii.Error, ValueError): # ValueError includes UnicodeDecodeError
+			return self.__restored(None, None, 'invalid')
+		return self.__restored(None, None, 'invalid')
+
+
+	def restoreFromFolder(self, folder: str, supressImportError: bool = True, workers: int = 1, decodeCache: DecodeCache = None, decodeLadder: DecodeLadder = None) -> bool:
 		"""
 		Tries to restore a backup from the image files in a folder
 
+		Every page of multi-page images (e.g. TIFF files of a batch scan) is decoded, PDF files of scans require pymupdf.
 		This method requires pillow and pyzbar. A resulting ImportError will be supressed if not otherwise specified.
 
 		Parameters:
@@ -301,10 +738,25 @@ class PaperStorage:
 				must be a valid folder path or FileNotFound etc. exceptions will be raised
 			supressImportError (bool):
 				defaults to True, must be set to False if this function should not silently fail if pillow or pyzbar are not installed
+				PDF files are skipped if pymupdf is not installed
+			workers (int):
+				number of processes used to load and decode the images, defaults to 1 (no process pool)
+				decoding stops as soon as all data blocks have been restored
+			decodeCache (DecodeCache or None):
+				cache of the QR-Codes found in previously decoded images, defaults to None (no cache)
+				only new or changed images are decoded, useful if the same folder is restored from repeatedly
+			decodeLadder (DecodeLadder or None):
+				preprocessing steps tried on images without readable QR-Codes, defaults to None (DecodeLadder with the default steps)
+				the default ladder locates the QR-Code region of large scans from the page layout and decodes it first
+				the counters of the steps are added to the ladder, see DecodeLadder.stats
 
 		Returns True if all data has been restored, False otherwise
 		In the latter case, use getMissingDataBlocks to get the missing pages
 		"""
+		if ((not isinstance(workers, int)) or isinstance(workers, bool)): raise TypeError('workers must be int')
+		if (workers < 1): raise ValueError('workers must be at least 1')
+		if (not (isinstance(decodeCache, DecodeCache) or (decodeCache is None))): raise TypeError('decodeCache must be DecodeCache or None')
+		if (not (isinstance(decodeLadder, DecodeLadder) or (decodeLadder is None))): raise TypeError('decodeLadder must be DecodeLadder or None')
 		try:
 			import PIL
 			import PIL.ImageOps
@@ -316,36 +768,150 @@ class PaperStorage:
 		except (ImportError):
 			if (not supressImportError): raise ImportError('pyzbar missing')
 			return False
-		for file in os.listdir(folder):
-			if (not os.path.isfile(os.path.join(folder, file))): continue
-			try:
-				_image = PIL.Image.open(os.path.join(folder, file))
-			except (PIL.UnidentifiedImageError):
+		if (decodeLadder is None): decodeLadder = DecodeLadder(regionHint=self.getQRRegionHint(), codesPerPage=self.getBlocksPerPage())
+		_files = []
+		for _file in [os.path.join(folder, n) for n in sorted(os.listdir(folder)) if os.path.isfile(os.path.join(folder, n))]:
+			_cachedStrings = None if (decodeCache is None) else decodeCache.get(_file)
+			if (_cachedStrings is None):
+				_files.append(_file)
 				continue
-			for n in pyzbar.decode(_image):
-				self.restoreFromQRString(n.data.decode('ascii'))
+			for _qrString in _cachedStrings:
+				self.restoreFromQRString(_qrString)
+		_decoded = 0
+		try:
+			if (self.isDataReady()): return True
+			if (workers == 1):
+				for _file in _files:
+					try:
+						_qrStrings, _stats, _seconds = decodeImageFile(_file, decodeLadder.steps(), decodeLadder.regionHint(), decodeLadder.codesPerPage())
+					except (ImportError): # a PDF file without pymupdf installed
+						if (not supressImportError): raise
+						continue
+					decodeLadder.merge(_stats)
+					_decoded += 1
+					self.__notify('stage', stage='decode', seconds=_seconds)
+					self.__notify('image', filename=_file, n=_decoded, of=len(_files), codes=len(_qrStrings))
+					if (decodeCache is not None): decodeCache.set(_file, _qrStrings)
+					for _qrString in _qrStrings:
+						self.restoreFromQRString(_qrString)
+					if (self.isDataReady()): break
+				return self.isDataReady()
+			from concurrent.futures import ProcessPoolExecutor, as_completed
+			with ProcessPoolExecutor(max_workers=workers) as _executor:
+				_futures = {_executor.submit(decodeImageFile, _file, decodeLadder.steps(), decodeLadder.regionHint(), decodeLadder.codesPerPage()): _file for _file in _files}
+				try:
+					for _future in as_completed(_futures):
+						try:
+							_qrStrings, _stats, _seconds = _future.result()
+						except (ImportError): # a PDF file without pymupdf installed
+							if (not supressImportError): raise
+							continue
+						decodeLadder.merge(_stats) # the ladders of the worker processes count separately
+						_decoded += 1
+						self.__notify('stage', stage='decode', seconds=_seconds) # seconds of the worker, they add up to more than the elapsed time
+						self.__notify('image', filename=_futures[_future], n=_decoded, of=len(_files), codes=len(_qrStrings))
+						if (decodeCache is not None): decodeCache.set(_futures[_future], _qrStrings)
+						for _qrString in _qrStrings:
+							self.restoreFromQRString(_qrString)
+						if (self.isDataReady()): break
+				finally:
+					for _future in _futures: _future.cancel() # the remaining images are not needed anymore
+			return self.isDataReady()
+		finally:
+			if (decodeCache is not None): decodeCache.save()
+
+
+	def restoreFromFile(self, filename: str, supressImportError: bool = True, decodeLadder: DecodeLadder = None) -> bool:
+		"""
+		Tries to restore a backup from a single scan file, e.g. a multi-page TIFF or PDF file of a batch scan
+
+		The pages are loaded and decoded one after another, so only one page is held in memory at a time.
+		This method requires pillow and pyzbar, PDF files also require pymupdf. A resulting ImportError will
+		be supressed if not otherwise specified.
+
+		Parameters:
+			filename (str):
+				path of the scan file
+				must be a valid file path or FileNotFound etc. exceptions will be raised
+			supressImportError (bool):
+				defaults to True, must be set to False if this function should not silently fail if pillow, pyzbar or pymupdf are not installed
+			decodeLadder (DecodeLadder or None):
+				preprocessing steps tried on pages without readable QR-Codes, defaults to None (see restoreFromFolder)
+
+		Returns True if all data has been restored, False otherwise
+		In the latter case, use getMissingDataBlocks to get the missing pages
+		"""
+		if (not isinstance(filename, str)): raise TypeError('filename must be str')
+		if (not (isinstance(decodeLadder, DecodeLadder) or (decodeLadder is None))): raise TypeError('decodeLadder must be DecodeLadder or None')
+		try:
+			import pyzbar.pyzbar as pyzbar
+		except (ImportError):
+			if (not supressImportError): raise ImportError('pyzbar missing')
+			return False
+		if (decodeLadder is None): decodeLadder = DecodeLadder(regionHint=self.getQRRegionHint(), codesPerPage=self.getBlocksPerPage())
+		try:
+			_start = time.perf_counter()
+			for n, _frame in enumerate(iterFrames(filename)):
+				_qrStrings = decodeLadder.decode(_frame)
+				self.__notify('stage', stage='decode', seconds=(time.perf_counter() - _start))
+				self.__notify('image', filename=filename, n=(n + 1), of=None, codes=len(_qrStrings))
+				for _qrString in _qrStrings:
+					self.restoreFromQRString(_qrString)
+				if (self.isDataReady()): return True
+				_start = time.perf_counter()
+		except (ImportError):
+			if (not supressImportError): raise
+			return False
 		return self.isDataReady()
 
 
-	def __renderQRCode(self, data: str, wPos: int, hPos: int, size: int, force31: bool = False) -> None:
-		_qrCode = None
-		if ((len(data) >= 262) or force31):
-			if (len(data) >= 1499):
-				_qrCode = qrcode.QRCode(version=31, error_correction=qrcode.ERROR_CORRECT_M, border=0, box_size=16)
-			else:
-				_qrCode = qrcode.QRCode(version=31, error_correction=qrcode.ERROR_CORRECT_Q, border=0, box_size=16)
+	def __renderQRCode(self, matrix: list, wPos: int, hPos: int, size: int) -> None:
+		_start = time.perf_counter()
+		if (self._vectorQRCodes):
+			self.__renderQRCodeVector(matrix, wPos, hPos, size)
 		else:
-			_qrCode = qrcode.QRCode(error_correction=qrcode.ERROR_CORRECT_M, border=0, box_size=16)
-		_qrCode.add_data(data, optimize=20)
-		_qrCode.make(True)
-		assert(_qrCode != None)
-		self._document.drawInlineImage(_qrCode.make_image().get_image(), wPos, (self._height * mm) - hPos - size, size, size)
+			import PIL.Image
+			_modules = len(matrix)
+			_image = PIL.Image.new('1', (_modules, _modules), 1)
+			_image.putdata([0 if _module else 1 for _row in matrix for _module in _row])
+			_image = _image.resize((_modules * 16, _modules * 16), PIL.Image.NEAREST) # 16 pixel per module, as qrcode would render it
+			self._document.drawInlineImage(_image, wPos, (self._height * mm) - hPos - size, size, size)
+		self.__notify('stage', stage='qrDraw', seconds=(time.perf_counter() - _start))
+
+
+	def __renderQRCodeVector(self, matrix: list, wPos: int, hPos: int, size: int) -> None:
+		"""
+		Renders a QR-Code matrix as dashed lines onto the PDF document
+
+		Every row of modules is one horizontal line, one module wide, from the first to the last dark module.
+		The dash pattern of the line holds the lengths of the alternating dark and light runs of the row, so
+		only small integers (module units under a single transformation) are written per run, instead of
+		the coordinates of a rectangle. This keeps the content stream smaller than the raster image.
+		"""
+		_modules = len(matrix)
+		_lines = []
+		for _rowIndex, _row in enumerate(matrix):
+			_edges = [n for n in range(_modules + 1) if (((n < _modules) and _row[n]) != ((n > 0) and _row[n - 1]))] # columns where a dark run starts or ends
+			if (len(_edges) == 0): continue
+			_dashes = [(_edges[n + 1] - _edges[n]) for n in range(len(_edges) - 1)] + [_modules] # dark, light, ..., dark, and a closing gap
+			_y = _modules - _rowIndex - 1
+			_lines.append(f'[{" ".join(str(n) for n in _dashes)}] 0 d {_edges[0]} {_y} m {_edges[-1]} {_y} l S')
+		self._document.saveState()
+		self._document.translate(wPos, (self._height * mm) - hPos - size)
+		self._document.scale(size / _modules, size / _modules)
+		self._document.translate(0, 0.5) # the lines run through the middle of their row
+		self._document.setStrokeColorRGB(0, 0, 0)
+		self._document.setLineWidth(1)
+		self._document.setLineCap(0) # butt caps, the dashes end exactly at the module borders
+		self._document.addLiteral('\n'.join(_lines))
+		self._document.restoreState()
 
 
 	def __newPage(self, notFirstPage: bool = True) -> None:
 		if (notFirstPage): self._document.showPage() # page break
 		self._document.setFillColorRGB(1,1,1)
 		self._document.rect(0, 0, self._width * mm, self._height * mm, fill=1, stroke=0)
+		self._textState = None # new page, white fill
 		if (self._watermark != None):
 			self._document.saveState()
 			self._document.translate(1 * self._width * mm * 0.225, -1 * self._height * mm * 0.45)
@@ -356,17 +922,122 @@ class PaperStorage:
 			self._document.drawCentredString((self._width * mm) / 2, (self._height * mm) / 2, self._watermark)
 			self._document.restoreState()
 		self.__renderLine(4 * self._fontsize)
-		self.__renderText(f'Page {self._document.getPageNumber()} of {math.ceil(self._dataSize / self._blockSize) + (0 if self._noMetaPage else 1)}', 2.3 * self._fontsize, alignRight=True);
 		self.__renderText(self._softwareIdentifier, 2.3 * self._fontsize)
-
 		self.__renderLine((self._height * mm) - (4 * self._fontsize))
-		self.__renderText(self._identifier, (self._height * mm) - (4 * self._fontsize))
 		if (self._writeDate):
 			self.__renderText(f'Created on {self._date}', (self._height * mm) - (4 * self._fontsize), alignRight=True)
 		elif (self._writeHostname):
+			from socket import gethostname
 			self.__renderText(gethostname(), (self._height * mm) - (4 * self._fontsize), alignRight=True)
+		_pageNumber = self._document.getPageNumber()
+		self.__renderWhenComplete(f'paperstoragePage{_pageNumber}', lambda: self.__renderPageNumber(_pageNumber))
+
+
+	def __renderPageNumber(self, pageNumber: int) -> None:
+		"""
+		Renders the page number, the total amount of pages and the identifier onto the current page
+		"""
+		_amountOfPages = self.getPageCount()
+		self.__renderText(f'Page {pageNumber} of {_amountOfPages}', 2.3 * self._fontsize, alignRight=True)
+		self.__renderText(self._identifier, (self._height * mm) - (4 * self._fontsize))
+		if ((not self._writeDate) and (not self._writeHostname)):
+			self.__renderText(f'Page {pageNumber} of {_amountOfPages}', (self._height * mm) - (4 * self._fontsize), alignRight=True)
+
+
+	def __amountOfParityBlocks(self) -> int:
+		"""
+		Returns the amount of parity blocks (pages) of the document
+		"""
+		if (self._parityGroupSize is None): return 0
+		return math.ceil(math.ceil(self._dataSize / self._blockSize) / self._parityGroupSize)
+
+
+	def __linesPerBlock(self) -> int:
+		"""
+		Returns the amount of Base32 lines of a full data block
+		"""
+		return math.ceil((math.ceil(self._blockSize / 5) * 8) / 80)
+
+
+	def __pageLayout(self):
+		"""
+		Returns the PageLayout of the font and page format, created on first use (rendering or getQRRegionHint)
+
+		Raises ValueError if the font does not exist or the blocks do not fit onto the page
+		"""
+		if (self._layout is not None): return self._layout
+		_layout = layoutFor(self._font, self._width, self._height, self._border) # cached per process
+		self._fontsize = _layout.fontsize
+		if ((self._grid is None) and self._textLayer and (self.__linesPerBlock() > _layout.textLines)):
+			raise ValueError(f'blockSize too large for the document size, at most {_layout.textLines * 50} bytes fit above the footer with the text layer')
+		if (self._grid is not None):
+			_largestQRCode = len(encodeQRMatrix(encodeBlockPayload(0, b'AAAAAAAA', bytes(self._blockSize), 2, (self._qrEncoding == 'base32')), parameters=self._qrParameters))
+			if ((self.__gridCellSize() - self._fontsize) / _largestQRCode < self.MIN_MODULE_SIZE * mm):
+				raise ValueError(f'grid too dense for the document size / block size, QR-Code modules would be smaller than {self.MIN_MODULE_SIZE}mm')
+		self._layout = _layout
+		return self._layout
+
+
+	def __gridCellSize(self) -> float:
+		"""
+		Returns the size of a cell of the grid layout, a QR-Code and its margin, in points
+		"""
+		_textHeight = 0 if (not self._textLayer) else ((self._blocksPerPage * (self.__linesPerBlock() + 1) * self._fontsize * 1.15) + self._fontsize)
+		_gridHeight = (self._height * mm) - (5 * self._fontsize) - (5.5 * self._fontsize) - _textHeight
+		return min(((self._width * mm) - (2 * self._border)) / self._grid[0], _gridHeight / self._grid[1])
+
+
+	def __renderGridBlock(self, cell: int, matrix: list, block: bytes, label: str) -> None:
+		"""
+		Renders the QR-Code of a block into a cell of the grid layout and its Base32 lines (if any) below the grid
+		"""
+		_cellSize = self.__gridCellSize()
+		_column, _row = (cell % self._grid[0]), (cell // self._grid[0])
+		self._document.setFillColorRGB(0, 0, 0, 1) # the Base32 lines of the previous cell leave a translucent fill behind
+		self._textState = None
+		_wPos = self._border + ((((self._width * mm) - (2 * self._border)) - (self._grid[0] * _cellSize)) / 2) + (_column * _cellSize) + (self._fontsize / 2)
+		self.__renderQRCode(matrix, _wPos, (5.5 * self._fontsize) + (_row * _cellSize) + (self._fontsize / 2), _cellSize - self._fontsize)
+		if (not self._textLayer): return
+		_hPos = (5.5 * self._fontsize) + (self._grid[1] * _cellSize) + self._fontsize + (cell * (self.__linesPerBlock() + 1) * self._fontsize * 1.15)
+		self.__renderText(label, _hPos, alpha=0.4)
+		self.__renderBase32Lines(block, _hPos + (self._fontsize * 1.15))
+
+
+	def __renderBase32Lines(self, block: bytes, hPos: float) -> None:
+		"""
+		Renders the Base32 encoded data of a block, 80 characters per line with line number and CRC32 checksum
+
+		With a monospaced font all lines are written as a single text object, column by column: the line
+		numbers and checksums first, then the data, so the font and the transparency are only set once.
+		"""
+		_start = time.perf_counter()
+		_b32DataBlock = b32encode(block)
+		_numbers, _lines, _checksums = [], [], []
+		for k in range(math.ceil(len(_b32DataBlock) / 80)):
+			_lineData = _b32DataBlock[(k * 80) : ((k+1) * 80)]
+			_numbers.append(f'{(k+1):02d}')
+			_lines.append(' '.join(_lineData[(i * 8) : ((i+1) * 8)].decode('ascii') for i in range(math.ceil(len(_lineData) / 8))))
+			_checksums.append(b85encode(binascii.crc32(b32decode(_lineData)).to_bytes(4, byteorder='big')).decode('ascii'))
+		if (not self._layout.metrics.monospaced()): # lines of proportional fonts may wrap, they are rendered one by one
+			for k in range(len(_lines)):
+				_hPos = hPos + (k * self._layout.lineHeight)
+				self.__renderText(_numbers[k], _hPos, alpha=0.4)
+				self.__renderText(f'   {_lines[k]}', _hPos)
+				self.__renderText(_checksums[k], _hPos, alignRight=True, alpha=0.4)
 		else:
-			self.__renderText(f'Page {self._document.getPageNumber()} of {math.ceil(self._dataSize / self._blockSize) + (0 if self._noMetaPage else 1)}',  (self._height * mm) - (4 * self._fontsize), alignRight=True);
+			_vPos = self._layout.pageHeight - hPos - (self._fontsize + 2) # baseline of the first line
+			self.__setTextStyle(self._font, self._fontsize, 0.4)
+			_text = self._document.beginText(self._border, _vPos)
+			_text.setLeading(self._layout.lineHeight)
+			_text.textLines(_numbers, trim=0)
+			_text.setTextOrigin(self._layout.pageWidth - self._border - self._layout.metrics.width(_checksums[0], self._fontsize), _vPos) # right aligned, all checksums have the same width
+			_text.textLines(_checksums, trim=0)
+			_text.setFillAlpha(1)
+			_text.setTextOrigin(self._border + (3 * self._layout.spaceWidth), _vPos)
+			_text.textLines(_lines, trim=0)
+			self._document.drawText(_text)
+			self._textState = (self._font, self._fontsize, 1) # the text object leaves the fill opaque
+		self.__notify('stage', stage='text', seconds=(time.perf_counter() - _start))
 
 
 	def __renderText(self, text: str,
@@ -385,39 +1056,35 @@ class PaperStorage:
 		"""
 		if (fontsize == None):
 			fontsize = self._fontsize
-		if (bold):
-			self._document.setFont(f'{self._font}-Bold', fontsize)
-		else:
-			self._document.setFont(self._font, fontsize)
+		self.__setTextStyle(f'{self._font}-Bold' if (bold) else self._font, fontsize, alpha)
 		if (maxWidth == None):
-			maxWidth = (self._width * mm) - (2 * self._border)
+			maxWidth = self._layout.maxWidth
 		if (alignCenter):
 			_drawString = self._document.drawCentredString
-			wPos = (self._width * mm) / 2
+			wPos = self._layout.pageWidth / 2
 		elif (alignRight):
 			_drawString = self._document.drawRightString
-			wPos = (self._width * mm) - wPos + stringWidth(' ', self._font, fontsize)
+			wPos = self._layout.pageWidth - wPos + (self._layout.spaceWidth if (fontsize == self._fontsize) else self._layout.metrics.width(' ', fontsize))
 		else:
 			_drawString = self._document.drawString
-		self._document.setFillColorRGB(0, 0, 0, alpha)
-		_textHeight = 1
-		_lines = text.splitlines(False)
-		for _line in _lines:
-			_words = _line.split(' ')
-			_textWidth = 0
-			_writeableWords = ''
-			for _word in _words:
-				_wordWidth = stringWidth(f'{_word} ', self._font, fontsize)
-				_textWidth += _wordWidth
-				if (_textWidth > maxWidth):
-					_drawString(wPos, (self._height * mm) - hPos - ((fontsize + 2) * _textHeight), _writeableWords)
-					_textHeight += 1
-					_textWidth = _wordWidth
-					_writeableWords = ''
-				_writeableWords += f'{_word} '
-			_drawString(wPos, (self._height * mm) - hPos - ((fontsize + 2) * _textHeight), _writeableWords)
-			_textHeight += 1
-		return (_textHeight * (fontsize + 2))
+		_lines = self._layout.wrap(text, fontsize, maxWidth)
+		for _textHeight, _line in enumerate(_lines, 1):
+			_drawString(wPos, self._layout.pageHeight - hPos - ((fontsize + 2) * _textHeight), _line)
+		return ((len(_lines) + 1) * (fontsize + 2))
+
+
+	def __setTextStyle(self, fontname: str, fontsize: float, alpha: float) -> None:
+		"""
+		Sets the font and the (black) fill color of the text, unless they are already set
+		"""
+		_state = self._textState
+		if ((_state is None) or (_state[:2] != (fontname, fontsize))):
+			self._document.setFont(fontname, fontsize)
+		if (_state is None):
+			self._document.setFillColorRGB(0, 0, 0)
+		if ((_state is None) or (_state[2] != alpha)):
+			self._document.setFillAlpha(alpha)
+		self._textState = (fontname, fontsize, alpha)
 
 
 	def __renderLine(self, hPos: int) -> None:
@@ -428,109 +1095,276 @@ class PaperStorage:
 		self._document.line(self._border, (self._height * mm) - hPos, (self._width * mm) - self._border, (self._height * mm) - hPos)
 
 
-	def __renderPDF(self) -> bool:
+	def __dataBlocks(self):
 		"""
-		Creates the PDF document from the available data
+		Splits the raw data or the stream into data blocks
 
-		Returns False if generation failed, True otherwise
+		Yields the binary data of every block in block order. Data read from a stream is added to
+		the checksums as it arrives (and compressed on the fly), so the stream is only read once and
+		never held in memory.
 		"""
-		if (self._rawData is None): return False
-		if (self._identifier is None): self._identifier = f'Backup of {self._dataSize} byte file'
-		self._document = Canvas(filename=self._binaryDocument, pagesize=(self._width * mm, self._height * mm))
+		if (self._stream is None):
+			for n in range(self._amountOfBlocks):
+				yield self._storedData[(n * self._blockSize) : ((n+1) * self._blockSize)]
+			return
+		_compressor = None if (self._compression is None) else compressor(self._compression)
+		_readSize = self._blockSize if (_compressor is None) else SAMPLE_SIZE # compressors work better on larger chunks
+		_pending = bytearray() # stored data that does not fill a block yet
+		_chunk, self._streamPrefix = self._streamPrefix, b''
+		while (True):
+			if (not _chunk): _chunk = _readFully(self._stream, _readSize)
+			if (not _chunk): break
+			self._checksums.update(_chunk)
+			self._originalSize += len(_chunk)
+			_pending += _chunk if (_compressor is None) else _compressor.compress(_chunk)
+			_chunk = b''
+			while (len(_pending) >= self._blockSize):
+				yield self.__takeBlock(_pending)
+		if (_compressor is not None): _pending += _compressor.flush()
+		while (len(_pending) > 0):
+			yield self.__takeBlock(_pending)
+
+
+	def __takeBlock(self, pending: bytearray) -> bytes:
+		"""
+		Removes the next data block from the stored data read from a stream and counts it
 
-		self._amountOfBlocks = math.ceil(self._dataSize / self._blockSize)
-		_crc32 = hex(binascii.crc32(self._rawData))
-		_md5 = hashlib.md5(self._rawData).hexdigest()
-		_sha256 = hashlib.sha256(self._rawData).hexdigest()
-		
-		self._document.setTitle(f'{self._softwareIdentifier} - {self._identifier}')
-		# first page with meta info
-		if (not self._noMetaPage):
-			self.__newPage(False)
-			self.__renderText(f'This document contains a paper backup of {self._backupType}', 5 * self._fontsize, fontsize=(self._fontsize * 1.3),
-				bold=True, alignCenter=True)
-			_hPos = 8 * self._fontsize
-			_hPos += self.__renderText(f'Identifier:           {self._identifier}\n'\
-				f'Size of binary data:  {len(self._rawData)} bytes\n'\
-				f'{f"Date of backup:       {self._date}" if self._writeDate else ""}\n'\
-				f'{f"Backup created on:    {gethostname()}" if self._writeHostname else ""}\n'\
-				f'\n'\
-				f'Block size of backup: {self._blockSize} bytes\n'\
-				f'Blocks used:          {self._amountOfBlocks}\n'\
-				f'CRC32 checksum:       {_crc32}\n'\
-				f'MD5 hash:             {_md5}\n', _hPos, self._border + (0.24 * self._width * mm), fontsize=(self._fontsize * 1.2), maxWidth=(0.6 * self._width * mm))
-
-			_metadata = f'hcpb01,{self._documentID.decode("ascii")},{b64encode((self._identifier).encode("utf-8")).decode("ascii")},{str(len(self._rawData))},{str(self._blockSize)},{_sha256}'
-			self.__renderQRCode(_metadata, self._border + (0.02 * self._width * mm), 8 * self._fontsize, (0.20 * self._width * mm) - self._fontsize)
-
-			if (self._customFirstPage != ''):
-				self.__renderText(self._customFirstPage, _hPos, fontsize=(self._fontsize * 1.1))
+		Returns the binary data of the block
+		"""
+		_block = bytes(pending[:self._blockSize])
+		del pending[:self._blockSize]
+		self._dataSize += len(_block)
+		self._amountOfBlocks += 1
+		return _block
+
+
+	def __blockPayloads(self):
+		"""
+		Creates the QR-Code payloads of the data blocks
+
+		Yields (QR-Code payload, binary data of the block) pairs in block order, followed by the parity
+		blocks (if any). Only the parity blocks are kept in memory until all data blocks are rendered.
+		"""
+		_parityBlocks = []
+		_group = []
+		for n, _block in enumerate(self.__dataBlocks()):
+			if (n >= self.MAX_BLOCKS[self._formatVersion]): raise ValueError('data too large for the format version / block size')
+			yield (encodeBlockPayload(n, self._documentID, _block, self._formatVersion, (self._qrEncoding == 'base32')), _block)
+			if (self._parityGroupSize is None): continue
+			_group.append(_block)
+			if (len(_group) == self._parityGroupSize):
+				_parityBlocks.append(xorBlocks(_group, self._blockSize))
+				_group = []
+		if (len(_group) > 0): _parityBlocks.append(xorBlocks(_group, self._blockSize))
+		for n, _parity in enumerate(_parityBlocks):
+			yield (encodeParityPayload(n, self._documentID, _parity, (self._qrEncoding == 'base32')), _parity)
+
+
+	def __renderWhenComplete(self, name: str, render) -> None:
+		"""
+		Renders content that depends on the size or the checksums of the data
+
+		If the data is read from a stream, these are only known after the last block was rendered.
+		In this case, a reference to a PDF form is placed on the current page and render is called
+		to fill the form once the stream is exhausted.
+		"""
+		if (self._stream is None):
+			render()
+			return
+		self._document.doForm(name)
+		self._deferredForms.append((name, render))
+
+
+	def __renderMetaPage(self) -> None:
+		"""
+		Renders the meta information, the metadata QR-Code and the restore instructions of the first page
+		"""
+		self.__renderText(f'This document contains a paper backup of {self._backupType}', 5 * self._fontsize, fontsize=(self._fontsize * 1.3),
+			bold=True, alignCenter=True)
+		from socket import gethostname
+		_hPos = 8 * self._fontsize
+		_compressionInfo = '' if (self._compression is None) else f'Compression:          {self._compression}, original size {self._originalSize} bytes\n'
+		_parityInfo = '' if (self._parityGroupSize is None) else f'Parity blocks:        {self.__amountOfParityBlocks()}, one per {self._parityGroupSize} blocks\n'
+		_gridInfo = '' if (self._grid is None) else f'Blocks per page:      {self._blocksPerPage} ({self._grid[0]} x {self._grid[1]})\n'
+		_encodingInfo = '' if (self._qrEncoding == 'base64') else 'QR-Code encoding:     Base32 (alphanumeric mode)\n'
+		_qrCodeInfo = '' if (self._qrParameters is None) else f'QR-Codes:             version {self._qrParameters[0]}, error correction level {self._qrParameters[1]}\n'
+		_hPos += self.__renderText(f'Identifier:           {self._identifier}\n'\
+			f'Size of binary data:  {self._dataSize} bytes\n'\
+			f'{_compressionInfo}'\
+			f'{f"Date of backup:       {self._date}" if self._writeDate else ""}\n'\
+			f'{f"Backup created on:    {gethostname()}" if self._writeHostname else ""}\n'\
+			f'\n'\
+			f'Block size of backup: {self._blockSize} bytes\n'\
+			f'Blocks used:          {self._amountOfBlocks}\n'\
+			f'{_parityInfo}'\
+			f'{_gridInfo}'\
+			f'{_encodingInfo}'\
+			f'{_qrCodeInfo}'\
+			f'CRC32 checksum:       {self._checksums.crc32()}\n'\
+			f'MD5 hash:             {self._checksums.md5()}\n', _hPos, self._border + (0.24 * self._width * mm), fontsize=(self._fontsize * 1.2), maxWidth=(0.6 * self._width * mm))
+
+		_metadata = f'hcpb0{self._formatVersion},{self._documentID.decode("ascii")},{b64encode((self._identifier).encode("utf-8")).decode("ascii")},{str(self._dataSize)},{str(self._blockSize)},{self._checksums.sha256()}'
+		if (self._compression is not None): # hcpb02 extension fields
+			_metadata += f',c={self._compression},o={self._originalSize}'
+		if (self._parityGroupSize is not None):
+			_metadata += f',p={self._parityGroupSize}'
+		if (self._grid is not None):
+			_metadata += f',b={self._blocksPerPage}'
+		if (self._qrParameters is not None):
+			_metadata += f',v={self._qrParameters[0]},e={self._qrParameters[1]}'
+		self.__renderQRCode(encodeQRMatrix(_metadata), self._border + (0.02 * self._width * mm), 8 * self._fontsize, (0.20 * self._width * mm) - self._fontsize)
+
+		if (self._customFirstPage != ''):
+			self.__renderText(self._customFirstPage, _hPos, fontsize=(self._fontsize * 1.1))
+		else:
+			_offset = self._layout.metrics.width('   ', self._fontsize)
+			if (self._compression is None):
+				_concatenate, _decompress = 'Concatenate the binary data in the correct order to restore the original file.', ''
 			else:
-				_offset = stringWidth('   ', self._font, self._fontsize)
-				_hPos += self.__renderText('To restore this backup, follow one of the following restore methods:', _hPos + (self._fontsize * 0.3), fontsize=(self._fontsize * 1.2), alignCenter=True)
-				_hPos += self.__renderText('1) Read the QR-Codes with PaperStorage', _hPos, fontsize=(self._fontsize * 1))
-				_hPos += self.__renderText('Scan all pages (including this one) with any kind of scanner / scanning app available to you and save the resulting scans as images on your computer. Install Python and the PaperStorage module (available on pip, \'python -m pip install paperstorage\') on your computer and start the restore process by typing \'python -m paperstorage --interactiverestore\' into a terminal.',
-					_hPos - (self._fontsize * 0.5), self._border + _offset, fontsize=(self._fontsize * 1), maxWidth=((self._width * mm) - (2 * self._border) - _offset))
-				_hPos += self.__renderText('2) Read the QR-Codes manually', _hPos, fontsize=(self._fontsize * 1))
-				_hPos += self.__renderText('Every page (except this first one) contains a QR-Code with one data block. Use any QR-Reader available to you to save the data blocks as plain text files. The first four characters of every data block contain the block id (starting from 0), the following four characters contain a document id, both Base64 encoded big endian integers. The remaining string is the binary data of the data block, also encoded in Base64. Concatenate the binary data in the correct order to restore the original file. The following shell script restores a backup from JPEG or PNG scans of a backup using zbar:',
+				_concatenate = f'Concatenate the binary data in the correct order and decompress the result ({self._compression}) to restore the original file.'
+				_decompress = f' \\\n{MANUAL_DECOMPRESSION[self._compression]}'
+			_parityNote, _skipParity = '', ''
+			if (self._parityGroupSize is not None):
+				_parityMarker = '%' if (self._qrEncoding == 'base64') else ':'
+				_parityNote = f' The last {self.__amountOfParityBlocks()} QR-Codes contain parity blocks (starting with a {_parityMarker} sign), the XOR of {self._parityGroupSize} consecutive data blocks each. They are only needed to rebuild missing data blocks and must be skipped otherwise.'
+				_skipParity = f' \\\n[ "${{block:0:1}}" = "{_parityMarker}" ] && continue;'
+			_qrCodesPerPage = 'a QR-Code with one data block' if (self._grid is None) else f'up to {self._blocksPerPage} QR-Codes, each with one data block'
+			_pagePrompt = 'page {i + 2} of {rB + 1}' if (self._grid is None) else f'page {{i // {self._blocksPerPage} + 2}}, block {{i}}'
+			_import = '' if (self._compression is None) else f', {self._compression}' # the python modules are named like the codecs
+			_decoded = 'base64.b32decode(eD)' if (self._compression is None) else f'{self._compression}.decompress(base64.b32decode(eD))'
+			_hPos += self.__renderText('To restore this backup, follow one of the following restore methods:', _hPos + (self._fontsize * 0.3), fontsize=(self._fontsize * 1.2), alignCenter=True)
+			_hPos += self.__renderText('1) Read the QR-Codes with PaperStorage', _hPos, fontsize=(self._fontsize * 1))
+			_hPos += self.__renderText('Scan all pages (including this one) with any kind of scanner / scanning app available to you and save the resulting scans as images on your computer. Install Python and the PaperStorage module (available on pip, \'python -m pip install paperstorage\') on your computer and start the restore process by typing \'python -m paperstorage --interactiverestore\' into a terminal.',
+				_hPos - (self._fontsize * 0.5), self._border + _offset, fontsize=(self._fontsize * 1), maxWidth=((self._width * mm) - (2 * self._border) - _offset))
+			_hPos += self.__renderText('2) Read the QR-Codes manually', _hPos, fontsize=(self._fontsize * 1))
+			if (self._formatVersion == 1):
+				_hPos += self.__renderText(f'Every page (except this first one) contains a QR-Code with one data block. Use any QR-Reader available to you to save the data blocks as plain text files. The first four characters of every data block contain the block id (starting from 0), the following four characters contain a document id, both Base64 encoded big endian integers. The remaining string is the binary data of the data block, also encoded in Base64. {_concatenate}{_parityNote} The following shell script restores a backup from JPEG or PNG scans of a backup using zbar:',
 					_hPos - (self._fontsize * 0.5), self._border + _offset, fontsize=(self._fontsize * 1), maxWidth=((self._width * mm) - (2 * self._border) - _offset))
 				_hPos += self.__renderText('for i in *.{jpg,png}; do block=$(zbarimg --raw --quiet $i); if [ "$block" = "" ]; then \\\n'\
 					'echo "image $i not readable!"; continue; fi; echo $block | tail -c +9 | base64 -d > "$(echo $block | \\\n'\
 					'head -c 4 | base64 -d | od --endian big -A n -t u2 -w2 | xargs).hcpbblock"; done; \\\n'\
-					'for i in *.hcpbblock; do cat $i >> restored_backup; rm -f $i; done;', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
-				_hPos += self.__renderText('3) Manual backup restoration', _hPos, fontsize=(self._fontsize * 1))
-				_hPos += self.__renderText('Each page also contains the binary data encoded in Base32, below the QR-Code. Each line contains a line number, up to 80 characters of base32 encoded data (splitted into 8 character chunks for enhanced readability). The last five characters are a Base85 encoded CRC32 checksum of the decoded binary data of the line, allowing the verification of each line. Only the Base32 encoded binary data is necessary to restore the original file. The following python script can be used to manually restore a backup from the Base32 data:',
+					f'for i in *.hcpbblock; do cat $i >> restored_backup; rm -f $i; done;{_decompress}', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+			elif (self._qrEncoding == 'base32'):
+				_hPos += self.__renderText(f'Every page (except this first one) contains {_qrCodesPerPage}. Use any QR-Reader available to you to save the data blocks as plain text files. Every data block starts with a * sign, the remaining string is Base32 encoded (without the padding = signs). It contains the block id (three bytes, a big endian integer starting from 0), the document id (six bytes) and the binary data of the data block. {_concatenate}{_parityNote} The following shell script restores a backup from JPEG or PNG scans of a backup using zbar:',
+					_hPos - (self._fontsize * 0.5), self._border + _offset, fontsize=(self._fontsize * 1), maxWidth=((self._width * mm) - (2 * self._border) - _offset))
+				_decodeBlock = ' \\\nb=${block:1}; while [ $(( ${#b} % 8 )) -ne 0 ]; do b="$b="; done; \\\n'\
+					'echo $b | base32 -d > block; tail -c +10 block > "$(printf %08d $( (printf \'\\0\'; head -c 3 block) | \\\n'\
+					'od --endian big -A n -t u4 -w4 | xargs)).hcpbblock";'
+				if (self._grid is None):
+					_hPos += self.__renderText('for i in *.{jpg,png}; do block=$(zbarimg --raw --quiet $i); if [ "$block" = "" ]; then \\\n'\
+						f'echo "image $i not readable!"; continue; fi;{_skipParity}{_decodeBlock} done; rm -f block; \\\n'\
+						f'for i in *.hcpbblock; do cat $i >> restored_backup; rm -f $i; done;{_decompress}', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+				else: # zbarimg prints one line per QR-Code, only data blocks start with a * sign
+					_hPos += self.__renderText('for i in *.{jpg,png}; do zbarimg --raw --quiet $i | while read -r block; do \\\n'\
+						f'[ "${{block:0:1}}" = "*" ] || continue;{_decodeBlock} done; done; rm -f block; \\\n'\
+						f'for i in *.hcpbblock; do cat $i >> restored_backup; rm -f $i; done;{_decompress}', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+			else:
+				_hPos += self.__renderText(f'Every page (except this first one) contains {_qrCodesPerPage}. Use any QR-Reader available to you to save the data blocks as plain text files. Every data block starts with a $ sign, the following four characters contain the block id (starting from 0), the following eight characters contain a document id, both Base64 encoded big endian integers. The remaining string is the binary data of the data block, also encoded in Base64. {_concatenate}{_parityNote} The following shell script restores a backup from JPEG or PNG scans of a backup using zbar:',
 					_hPos - (self._fontsize * 0.5), self._border + _offset, fontsize=(self._fontsize * 1), maxWidth=((self._width * mm) - (2 * self._border) - _offset))
-				_hPos += self.__renderText('import base64, sys, math, binascii\n'\
-					'from base64 import b85encode, b32decode\n'\
-					'dS, bS, eD = int(input(\'size of binary data: \')), int(input(\'block size used for backup: \')), \'\'\n'\
-					'rB = (dS // bS)\n'\
-					'if (dS % bS != 0): rB += 1\n'\
-					'for i in range(rB):\n'\
-					'    print(f\'page {i + 2} of {rB + 1}\')\n'\
-					'    if (((dS - (bS * i)) // bS) >= 1): rB, pD = math.ceil((bS * 8 + 4) / 5), \'\'\n'\
-					'    else: rB, pD = math.ceil(((dS - (bS * i)) * 8 + 4) / 5), \'\'\n'\
-					'    for n in range(math.ceil((rB - 1) / 80)):\n'\
-					'        lD, nL = \'\', False\n'\
-					'        while (not nL):\n'\
-					'            lD = input(f\'input line {n + 1} of {math.ceil((rB - 1) / 80)}: \').upper().replace(\' \',\'\')\n'\
-					'            try:\n'\
-					'                c32 = b85encode(binascii.crc32(b32decode(lD)).to_bytes(4, byteorder=\'big\'))\n'\
-					'            except (binascii.Error):\n'\
-					'                print(\'invalid line, restart\')\n'\
-					'                continue\n'\
-					'            if (input(f\'crc32 is {c32.decode("utf-8")}, ok? \')!=\'no\'): nL = True\n'\
-					'        pD += lD\n'\
-					'    eD += pD\n'\
-					'(open(input(\'enter filename: \'), \'wb+\').write(base64.b32decode(eD)))\n', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+				if (self._grid is None):
+					_hPos += self.__renderText('for i in *.{jpg,png}; do block=$(zbarimg --raw --quiet $i); if [ "$block" = "" ]; then \\\n'\
+						f'echo "image $i not readable!"; continue; fi;{_skipParity} echo $block | tail -c +14 | base64 -d > \\\n'\
+						'"$(printf %08d $( (printf \'\\0\'; echo $block | head -c 5 | tail -c 4 | base64 -d) | \\\n'\
+						'od --endian big -A n -t u4 -w4 | xargs)).hcpbblock"; done; \\\n'\
+						f'for i in *.hcpbblock; do cat $i >> restored_backup; rm -f $i; done;{_decompress}', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+				else: # zbarimg prints one line per QR-Code, only data blocks start with a $ sign
+					_hPos += self.__renderText('for i in *.{jpg,png}; do zbarimg --raw --quiet $i | while read -r block; do \\\n'\
+						'[ "${block:0:1}" = "$" ] || continue; echo $block | tail -c +14 | base64 -d > \\\n'\
+						'"$(printf %08d $( (printf \'\\0\'; echo $block | head -c 5 | tail -c 4 | base64 -d) | \\\n'\
+						'od --endian big -A n -t u4 -w4 | xargs)).hcpbblock"; done; done; \\\n'\
+						f'for i in *.hcpbblock; do cat $i >> restored_backup; rm -f $i; done;{_decompress}', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+			if (not self._textLayer): return
+			_hPos += self.__renderText('3) Manual backup restoration', _hPos, fontsize=(self._fontsize * 1))
+			_hPos += self.__renderText('Each page also contains the binary data encoded in Base32, below the QR-Code. Each line contains a line number, up to 80 characters of base32 encoded data (splitted into 8 character chunks for enhanced readability). The last five characters are a Base85 encoded CRC32 checksum of the decoded binary data of the line, allowing the verification of each line. Only the Base32 encoded binary data is necessary to restore the original file. The following python script can be used to manually restore a backup from the Base32 data:',
+				_hPos - (self._fontsize * 0.5), self._border + _offset, fontsize=(self._fontsize * 1), maxWidth=((self._width * mm) - (2 * self._border) - _offset))
+			_hPos += self.__renderText(f'import base64, sys, math, binascii{_import}\n'\
+				'from base64 import b85encode, b32decode\n'\
+				'dS, bS, eD = int(input(\'size of binary data: \')), int(input(\'block size used for backup: \')), \'\'\n'\
+				'rB = (dS // bS)\n'\
+				'if (dS % bS != 0): rB += 1\n'\
+				'for i in range(rB):\n'\
+				f'    print(f\'{_pagePrompt}\')\n'\
+				'    if (((dS - (bS * i)) // bS) >= 1): rB, pD = math.ceil((bS * 8 + 4) / 5), \'\'\n'\
+				'    else: rB, pD = math.ceil(((dS - (bS * i)) * 8 + 4) / 5), \'\'\n'\
+				'    for n in range(math.ceil((rB - 1) / 80)):\n'\
+				'        lD, nL = \'\', False\n'\
+				'        while (not nL):\n'\
+				'            lD = input(f\'input line {n + 1} of {math.ceil((rB - 1) / 80)}: \').upper().replace(\' \',\'\')\n'\
+				'            try:\n'\
+				'                c32 = b85encode(binascii.crc32(b32decode(lD)).to_bytes(4, byteorder=\'big\'))\n'\
+				'            except (binascii.Error):\n'\
+				'                print(\'invalid line, restart\')\n'\
+				'                continue\n'\
+				'            if (input(f\'crc32 is {c32.decode("utf-8")}, ok? \')!=\'no\'): nL = True\n'\
+				'        pD += lD\n'\
+				'    eD += pD\n'\
+				f'(open(input(\'enter filename: \'), \'wb+\').write({_decoded}))\n', _hPos - (self._fontsize), self._border + _offset, fontsize=(self._fontsize * 0.9))
+
+
+	def __renderPDF(self, target) -> bool:
+		"""
+		Creates the PDF document from the available data and writes it to target, a binary file object
+
+		Returns False if generation failed, True otherwise
+		"""
+		if ((self._rawData is None) and (self._stream is None)): return False
+		if (self._streamConsumed): return False
+		self.__pageLayout()
+		from reportlab.pdfgen.canvas import Canvas
+		self._document = Canvas(filename=target, pagesize=(self._width * mm, self._height * mm), pageCompression=(1 if self._vectorQRCodes else None))
+		self._textState = None
+		self._deferredForms = []
+		self._checksums = _Checksums()
+
+		_renderStart = time.perf_counter()
+		if (self._stream is None):
+			self._amountOfBlocks = math.ceil(self._dataSize / self._blockSize)
+			self._checksums.update(self._rawData)
+			self.__notify('stage', stage='hash', seconds=(time.perf_counter() - _renderStart))
+			if (self._identifier is None): self._identifier = f'Backup of {self._originalSize} byte file'
+		else:
+			self._streamConsumed = True
+			self._amountOfBlocks = 0
+			self._dataSize = 0
+			self._originalSize = 0
+
+		# first page with meta info
+		if (not self._noMetaPage):
+			self.__newPage(False)
+			self.__renderWhenComplete('paperstorageMetaPage', self.__renderMetaPage)
 		# end of first page
-		for n in range(self._amountOfBlocks):
-			self.__newPage(False if (self._noMetaPage and (n == 0)) else True)
-			self._blocks[n] = self._rawData[(n * self._blockSize) : ((n+1) * self._blockSize)]
-			_blockID = b64encode((n).to_bytes(2, byteorder='big'))
-			_qrData = (_blockID + self._documentID + b64encode(self._blocks[n]))
-			assert(_qrData.decode('ascii')[3] == "=") 	# as we encoded two two byte (ushort) value to base64, we always (even at ushort_max)
-			assert(_qrData.decode('ascii')[7] == "=")	# should have a fill-character (=) at position 4 and 8. We can use it to detect the end of the
-														# page id and the start of the base64 encoded data block
-														# TODO: replace with nicer check & error message, even though this should *never* fail
-			_qrSize = min((self._width * mm) - (2 * self._border), (self._height * mm) - (40 * self._fontsize * 1.15))
-			self.__renderQRCode(_qrData.decode("ascii"), self._border + (((self._width * mm) - ((2 * self._border) + _qrSize)) / 2), 5.5 * self._fontsize, _qrSize, True)
-			_b32DataBlock = b32encode(self._blocks[n])
-			_amountOfLines = math.ceil(len(_b32DataBlock) / 80)
-			for k in range(_amountOfLines):
-				_hPos = (6.5 * self._fontsize) + _qrSize + (k * self._fontsize * 1.15)
-				_lineData = _b32DataBlock[(k * 80) : ((k+1) * 80)]
-				_lineDataCrc32InBase85 = b85encode(binascii.crc32(b32decode(_lineData)).to_bytes(4, byteorder='big')).decode('ascii')
-				_lineDataInBlocks = ''
-				for i in range(10):
-					_lineDataInBlocks += f'{_lineData[(i * 8) : ((i+1) * 8)].decode("ascii")} '
-				self.__renderText(f'{(k+1):02d}', _hPos, alpha=0.4)
-				self.__renderText(f'   {_lineDataInBlocks}', _hPos)
-				self.__renderText(_lineDataCrc32InBase85, _hPos, alignRight=True, alpha=0.4)
+		_amountOfBlocks = None if (self._stream is not None) else (self._amountOfBlocks + self.__amountOfParityBlocks()) # unknown for streams
+		_start = time.perf_counter()
+		for n, (_qrMatrix, _block) in enumerate(encodeQRMatrices(self.__blockPayloads(), self._workers, (self._grid is None), self._qrParameters)):
+			self.__notify('stage', stage='encode', seconds=(time.perf_counter() - _start)) # reading, hashing and QR-Code encoding of the block
+			self.__notify('block', n=(n + 1), of=_amountOfBlocks, bytes=(self._dataSize if (self._stream is not None) else min(((n + 1) * self._blockSize), self._dataSize)))
+			if ((n % self._blocksPerPage) == 0):
+				self.__newPage(False if (self._noMetaPage and (n == 0)) else True)
+			if (self._grid is not None):
+				# data blocks are counted as they are read, so all blocks past that count are parity blocks
+				_label = f'Block {n}' if (n < self._amountOfBlocks) else f'Parity block {n - self._amountOfBlocks}'
+				self.__renderGridBlock(n % self._blocksPerPage, _qrMatrix, _block, _label)
+			else:
+				_qrSize = self._layout.qrSize
+				self.__renderQRCode(_qrMatrix, self._border + (((self._width * mm) - ((2 * self._border) + _qrSize)) / 2), 5.5 * self._fontsize, _qrSize)
+				if (self._textLayer): self.__renderBase32Lines(_block, (6.5 * self._fontsize) + _qrSize)
+			_start = time.perf_counter()
+
+		if (self._stream is not None):
+			if (self._identifier is None): self._identifier = f'Backup of {self._originalSize} byte file'
+			for _name, _render in self._deferredForms:
+				self._document.beginForm(_name)
+				_render()
+				self._document.endForm()
+			self._deferredForms = []
+		self._document.setTitle(f'{self._softwareIdentifier} - {self._identifier}')
+		_start = time.perf_counter()
 		self._document.save()
+		self.__notify('stage', stage='save', seconds=(time.perf_counter() - _start))
+		self.__notify('done', pages=self.getPageCount(), bytes=self._originalSize, seconds=(time.perf_counter() - _renderStart))
 		return True
 
-	
+
 	def setBackupType(self, typename: str) -> None:
 		"""
 		Changes the string that is written on the first page
@@ -543,6 +1377,7 @@ class PaperStorage:
 		"""
 		if (not isinstance(typename, str)): raise TypeError('expected str')
 		self._backupType = typename
+		self.__invalidate()
 
 
 	def setSoftwareIdentifier(self, softwareIdentifier: str) -> None:
@@ -557,12 +1392,80 @@ class PaperStorage:
 		"""
 		if (not isinstance(softwareIdentifier, str)): raise TypeError('expected str')
 		self._softwareIdentifier = softwareIdentifier
+		self.__invalidate()
+
+
+	def setObserver(self, observer) -> None:
+		"""
+		Sets a callback that receives timings and progress of the rendering and the restore of the document
+
+		The observer is called as observer(event, info) with info being a dict:
+			'stage': time spent in a stage, info has the keys stage and seconds, with the stages
+				hash, encode (reading, hashing and QR-Code encoding of a block), qrDraw, text and save when rendering
+				and decode (loading and decoding an image file) when restoring
+			'block': a block was rendered, info has the keys n, of (None for streams) and bytes (of data rendered so far)
+			'image': an image file (or a page of a scan file) was decoded, info has the keys filename, n, of (None for pages) and codes (amount of QR-Codes found)
+			'done': the document was rendered, info has the keys pages, bytes and seconds
+			'qrCode': a QR-Code string was restored, info has the keys kind ('metadata', 'data', 'parity' or None if unknown), id (of the block or
+				parity group, None for meta data) and result ('received', 'duplicate', 'wrongDocument' or 'invalid')
+
+		Parameters:
+			observer (callable or None):
+				the callback, or None to remove it, see instrumentation.StatsCollector for an observer collecting statistics
+
+		Returns None
+		"""
+		if (not (callable(observer) or (observer is None))): raise TypeError('observer must be callable or None')
+		self._observer = observer
+
+
+	def getObserver(self):
+		"""
+		Returns the callback set with setObserver, None if there is none
+		"""
+		return self._observer
+
+
+	def __notify(self, event: str, **info) -> None:
+		if (self._observer is not None): self._observer(event, info)
+
+
+	def __restored(self, kind: str, id: int, result: str) -> bool:
+		"""
+		Notifies the observer of the result of restoring a QR-Code
+
+		Returns True if the QR-Code was received, False otherwise
+		"""
+		if (self._observer is not None): self._observer('qrCode', {'kind': kind, 'id': id, 'result': result})
+		return (result == 'received')
+
+
+	def __invalidate(self) -> None:
+		"""
+		Discards the cached document after a change that affects its content
+		"""
+		self._renderedDocument = None
+
+
+	def __renderCached(self) -> bool:
+		"""
+		Renders the document into the cache, unless it is already cached
+
+		Returns False if generation failed, True otherwise
+		"""
+		if (self._renderedDocument is not None): return True
+		_renderedDocument = io.BytesIO()
+		if (not self.__renderPDF(_renderedDocument)): return False
+		self._renderedDocument = _renderedDocument
+		return True
 
 
 	def savePDF(self, filename: str) -> bool:
 		"""
 		Saves the generated PDF document to the specified path
 
+		The document is only rendered once and cached for further calls of savePDF, getPDF and writePDF.
+
 		Parameters:
 			filename (str):
 				filename to save the pdf to, must not be empty and should end with '.pdf'
@@ -572,70 +1475,265 @@ class PaperStorage:
 		if ((not isinstance(filename, str)) or (len(filename) == 0)):
 			raise TypeError('filename must be non-empty str') # Should be ValueError for ''
 
-		if (not self.__renderPDF()):
+		if (not self.__renderCached()):
 			return False
-		assert(self._document != None)
 		try:
 			_file = open(filename, "wb")
 		except (Exception):
 			return False
-		_file.write(self._binaryDocument.getvalue())
+		_file.write(self._renderedDocument.getbuffer())
 		_file.close()
 		return True
 
 
+	def writePDF(self, file) -> bool:
+		"""
+		Writes the generated PDF document to a binary file object, e.g. an opened file or a socket file
+
+		If the document is not cached yet, it is rendered directly into the file object without any intermediate copy.
+		In this case, the document is not cached.
+
+		Parameters:
+			file (binary file object):
+				the file object to write the pdf to
+
+		Returns False if generation failed, True otherwise
+		"""
+		if (not callable(getattr(file, 'write', None))): raise TypeError('file must be a binary file object')
+
+		if (self._renderedDocument is not None):
+			file.write(self._renderedDocument.getbuffer())
+			return True
+		return self.__renderPDF(file)
+
+
+	def getPageCount(self) -> int:
+		"""
+		Returns the amount of pages of the document, None if there is no data (or the document of a stream was not rendered yet)
+		"""
+		if ((self._rawData is None) and (not self._streamConsumed)): return None
+		return math.ceil((math.ceil(self._dataSize / self._blockSize) + self.__amountOfParityBlocks()) / self._blocksPerPage) + (0 if self._noMetaPage else 1)
+
+
 	def getPDF(self) -> bytes:
 		"""
 		Fetches the generated PDF document as a bytes object
 
+		The document is only rendered once and cached for further calls of savePDF, getPDF and writePDF.
+
 		Returns None if generation failed, a bytes object otherwise
 		"""
-		if (not self.__renderPDF()):
+		if (not self.__renderCached()):
 			return None
-		assert(self._document != None)
-		return self._binaryDocument.getvalue()
+		return self._renderedDocument.getvalue()
 
 
 	def isDataReady(self) -> bool:
 		"""
 		Returns true if binary data is available, e.g. if all blocks of a backup are already read
 		(or if the PaperStorage object was initialized with data), False otherwise
+
+		Compressed backups are decompressed as soon as all blocks are read. Raises ValueError if the
+		restored data cannot be decompressed.
 		"""
-		if (self._rawData != None):
+		if ((self._rawData != None) or self._restoreFileComplete):
 			return True
+		if (not self._blockStore.isComplete()):
+			return False
+		if (self._restoreFile is None):
+			_data = self._blockStore.data()
+			self._rawData = _data if (self._compression is None) else b''.join(decompressChunks(self._compression, (_data,)))
 		else:
-			if (self._amountOfBlocks == 0):
-				return False
-			else:
-				if (len(self._blocks) == self._amountOfBlocks):
-					self._rawData = bytes()
-					for n in range(self._amountOfBlocks):
-						self._rawData += self._blocks[n]
-					return True
-		return False
+			self._restoreFile.flush()
+			if (self._compression is not None): self.__decompressRestoreFile()
+			self._restoreFileComplete = True
+		return True
+
+
+	def __decompressRestoreFile(self) -> None:
+		"""
+		Replaces the compressed data in the restore file with the decompressed data
+
+		The data is decompressed in chunks into a temporary file next to the restore file, so
+		it is never held in memory as a whole.
+		"""
+		_filename = self._restoreFile.name
+		self._restoreFile.seek(0)
+		try:
+			with open(f'{_filename}.tmp', 'wb') as _target:
+				for _chunk in decompressChunks(self._compression, iter(lambda: self._restoreFile.read(1 << 20), b'')):
+					_target.write(_chunk)
+		except (ValueError):
+			os.remove(f'{_filename}.tmp')
+			raise
+		self._restoreFile.close()
+		os.replace(f'{_filename}.tmp', _filename)
+		self._restoreFile = open(_filename, 'r+b')
 
 
 	def getData(self) -> bytes:
 		"""
 		Fetches the binary data of the PaperStorage object
-		
+
+		If the data is restored to a file (see restoreToFile), it is read back from that file.
+
 		Returns None if no data is available, a bytes object otherwise
 		"""
 		if (not self.isDataReady()):
 			return None
+		elif (self._rawData is None):
+			self._restoreFile.seek(0)
+			return self._restoreFile.read()
 		else:
 			return self._rawData
 
 
+	def restoreToFile(self, filename: str) -> bool:
+		"""
+		Writes the restored data blocks directly to a file instead of keeping them in memory
+
+		Every block is written to its offset in the file as soon as it is read, so a restored backup is never
+		held in memory as a whole. Blocks that were already read are moved to the file.
+
+		Parameters:
+			filename (str):
+				path of the file to restore the data to, an existing file will be overwritten
+
+		Returns False if data is already available or the file could not be opened, True otherwise
+		"""
+		if ((not isinstance(filename, str)) or (len(filename) == 0)): raise TypeError('filename must be non-empty str')
+		if ((self._rawData != None) or (self._restoreFile is not None)): return False
+		try:
+			self._restoreFile = open(filename, 'w+b')
+		except (Exception):
+			return False
+		self._blockStore.attachFile(self._restoreFile)
+		return True
+
+
+	def setCheckpoint(self, filename: str) -> bool:
+		"""
+		Records the restore progress in an append-only checkpoint file, to continue an interrupted restore later
+
+		The QR-Codes already recorded in the file are restored first (a record cut off by a crash is discarded),
+		then every QR-Code restored by restoreFromQRString (and therefore restoreFromFolder, restoreFromFile,
+		the command line tool and asyncrestore.AsyncRestore) is appended as one line. An append is a single
+		write to the end of the file, flushed right away, so the progress survives a crash or Ctrl+C of the
+		process. Data blocks rebuilt from parity blocks are rebuilt again when the file is read.
+
+		Parameters:
+			filename (str or None):
+				path of the checkpoint file, created if it does not exist, or None to stop recording and close the file
+
+		Returns False if the file could not be opened, True otherwise
+		"""
+		if (not (isinstance(filename, str) or (filename is None))): raise TypeError('filename must be str or None')
+		if (self._checkpoint is not None):
+			self._checkpoint.close()
+			self._checkpoint = None
+		if (filename is None): return True
+		try:
+			_file = open(filename, 'a+b')
+		except (Exception):
+			return False
+		_file.seek(0)
+		_records = _file.read().split(b'\n')
+		if (len(_records[-1]) > 0): _file.truncate(_file.tell() - len(_records[-1])) # incomplete last record
+		for _record in _records[:-1]:
+			if (self.__restoreQRString(_record) and _record.startswith(b'hcpb')): self._checkpointMetaData = _record
+		self._checkpoint = _file
+		return True
+
+
+	def __appendCheckpoint(self, record: bytes) -> None:
+		"""
+		Appends a restored QR data string to the checkpoint file, the meta data only if it changed
+		"""
+		if (record.startswith(b'hcpb')):
+			if (record == self._checkpointMetaData): return
+			self._checkpointMetaData = record
+		self._checkpoint.write(record + b'\n')
+		self._checkpoint.flush()
+
+
+	def hasDataBlock(self, blockID: int) -> bool:
+		"""
+		Returns True if the data block with the given id was already read, False otherwise
+		"""
+		if (not isinstance(blockID, int)): raise TypeError('blockID must be int')
+		return self._blockStore.has(blockID)
+
+
 	def getMissingDataBlocks(self) -> list:
 		"""
 		Returns a list with the ids of the missing data blocks
 
-		You can calculate the page number of the page containung the missing data block by adding 2
+		Use getPageOfDataBlock to get the page number of the page containing a missing data block
 		Careful: Works only if the number of blocks is known and set (by reading the meta page first) or if the last page / block has already been read.
 		"""
-		_missingBlocks = []
-		for n in range(self._amountOfBlocks):
-			if (self._blocks.get(n, None) == None):
-				_missingBlocks.append(n)
-		return _missingBlocks
\ No newline at end of file
+		return self._blockStore.missing()
+
+
+	def getMissingDataBlockCount(self) -> int:
+		"""
+		Returns the amount of missing data blocks
+
+		Same restrictions as getMissingDataBlocks apply, but the amount is known without looking at every block.
+		"""
+		return self._blockStore.missingCount()
+
+
+	def getPageOfDataBlock(self, blockID: int) -> int:
+		"""
+		Returns the number of the page containing the data block with the given id (the first page with meta information is page 1)
+
+		Backups with a grid layout have several data blocks per page, the layout is known after the meta page was read.
+		"""
+		if (not isinstance(blockID, int)): raise TypeError('blockID must be int')
+		return (blockID // self._blocksPerPage) + 2
+
+
+	def getMissingPageRanges(self) -> list:
+		"""
+		Returns a list of (first page, last page) tuples, one for every gap of consecutive pages with missing data blocks
+
+		Same restrictions as getMissingDataBlocks apply. Pages are numbered like getPageOfDataBlock.
+		"""
+		_ranges = []
+		for _first, _last in self._blockStore.missingRanges():
+			_first, _last = self.getPageOfDataBlock(_first), self.getPageOfDataBlock(_last)
+			if ((len(_ranges) > 0) and (_ranges[-1][1] >= (_first - 1))):
+				_ranges[-1] = (_ranges[-1][0], _last)
+			else:
+				_ranges.append((_first, _last))
+		return _ranges
+
+
+	def getBlocksPerPage(self) -> int:
+		"""
+		Returns the amount of data blocks (QR-Codes) per page, more than 1 for grid layouts (also read from the meta data)
+
+		Useful as codesPerPage of a DecodeLadder, see restoreFromFolder
+		"""
+		return self._blocksPerPage
+
+
+	def getQRRegionHint(self) -> tuple:
+		"""
+		Returns the area between the header and the footer of a page as (left, top, right, bottom) fractions of the page
+
+		The area holds the data QR-Code or every QR-Code of a grid layout, whose rows reach down to the footer
+		without the text layer. Useful as regionHint of a DecodeLadder, see restoreFromFolder
+		"""
+		_width, _height = (self._width * mm), (self._height * mm)
+		_fontsize = self.__pageLayout().fontsize
+		return (self._border / _width, (5.5 * _fontsize) / _height, (_width - self._border) / _width, (_height - (5 * _fontsize)) / _height)
+
+
+	def getMissingDataBlockRanges(self) -> list:
+		"""
+		Returns a list of (first block id, last block id) tuples, one for every gap of consecutive missing data blocks
+
+		Same restrictions as getMissingDataBlocks apply. Useful to print compact lists like 'pages 4-17, 20'.
+		"""
+		return self._blockStore.missingRanges()
@@ -0,0 +1,128 @@
+import math
+from reportlab.lib.units import mm
+from .layout import layoutFor
+
+
+ERROR_CORRECTION = {'L': 1, 'M': 0, 'Q': 3, 'H': 2} # weakest to strongest, the values of qrcode.ERROR_CORRECT_*, qrcode is only imported to plan QR-Codes
+MAX_BLOCK_SIZE = 2650 # largest block (multiple of 50) a QR-Code can hold, Base32 encoded at version 40, level L
+BORDER = 20 * mm # left and right border of the pages, see PaperStorage._border
+
+
+def payloadLength(blockSize: int, qrEncoding: str = 'base64') -> int:
+	"""
+	Returns the length of the hcpb02 QR-Code payload of a full block, see encoding.encodeBlockPayload
+	"""
+	if (qrEncoding == 'base32'): return 1 + math.ceil(((9 + blockSize) * 8) / 5)
+	return 13 + (4 * math.ceil(blockSize / 3))
+
+
+def _payloadBits(length: int, qrEncoding: str, version: int) -> int:
+	"""
+	Returns the bits a payload needs in a QR-Code of the given version, Base64 in byte mode, Base32 in alphanumeric mode
+	"""
+	import qrcode.util
+	_mode = qrcode.util.MODE_ALPHA_NUM if (qrEncoding == 'base32') else qrcode.util.MODE_8BIT_BYTE
+	_dataBits = ((11 * (length // 2)) + (6 * (length % 2))) if (qrEncoding == 'base32') else (8 * length)
+	return 4 + qrcode.util.length_in_bits(_mode, version) + _dataBits
+
+
+def qrParameters(blockSize: int, qrEncoding: str = 'base64', errorCorrection: str = 'M', maxVersion: int = 40) -> tuple:
+	"""
+	Returns the version and error correction level of the QR-Codes of a block size
+
+	The version is the smallest one that holds a full block at the given error correction level. The
+	strongest level that still fits into that version is used, so the error correction is never
+	weaker than requested.
+
+	Parameters:
+		blockSize (int):
+			size of a full data block in bytes
+		qrEncoding (str):
+			'base64' or 'base32', see PaperStorage
+		errorCorrection (str):
+			minimum error correction level, 'L', 'M', 'Q' or 'H', defaults to 'M'
+		maxVersion (int):
+			largest version allowed, defaults to 40
+
+	Returns a tuple with the version and the error correction level (str), or None if the block does not fit
+	"""
+	if (errorCorrection not in ERROR_CORRECTION): raise ValueError('errorCorrection must be \'L\', \'M\', \'Q\' or \'H\'')
+	import qrcode.util
+	_length = payloadLength(blockSize, qrEncoding)
+	_fits = lambda version, level: (_payloadBits(_length, qrEncoding, version) <= qrcode.util.BIT_LIMIT_TABLE[ERROR_CORRECTION[level]][version])
+	for _version in range(1, maxVersion + 1):
+		if (_fits(_version, errorCorrection)): break
+	else:
+		return None
+	_levels = list(ERROR_CORRECTION)
+	for _level in reversed(_levels[_levels.index(errorCorrection):]):
+		if (_fits(_version, _level)): return (_version, _level)
+
+
+def planPage(size: (int, int) = (210, 297), dpi: int = 300, errorCorrection: str = 'M', qrEncoding: str = 'base64', textLayer: bool = True, dotsPerModule: float = 3, fontname: str = 'Courier') -> dict:
+	"""
+	Plans the block size and the QR-Codes that store the most data on a page
+
+	A QR-Code module must be at least dotsPerModule dots wide at the resolution the pages are printed
+	or scanned with, which limits the QR-Code version. With the text layer, the Base32 lines of a block
+	must fit below the QR-Code, which limits the block size.
+
+	Parameters:
+		size (int, int):
+			tupel of the width and height of the page in millimeters, defaults to DIN A4 (210mm x 297mm)
+		dpi (int):
+			resolution the pages are printed and scanned with (the lower of both), defaults to 300
+		errorCorrection (str):
+			minimum error correction level of the QR-Codes, 'L', 'M', 'Q' or 'H', defaults to 'M'
+		qrEncoding (str):
+			'base64' or 'base32', see PaperStorage
+		textLayer (bool):
+			plans for pages with the Base32 lines below the QR-Code, defaults to True
+		dotsPerModule (float):
+			smallest QR-Code module in dots at the given resolution, defaults to 3
+		fontname (str):
+			font of the document, it determines the size of the QR-Code, defaults to Courier
+
+	Returns a dict with the keys size, dpi, qrEncoding, textLayer, blockSize, version, errorCorrection,
+	modules (per side), qrSize and moduleSize (both in millimeters) and dotsPerModule
+	"""
+	if ((not isinstance(dpi, int)) or isinstance(dpi, bool)): raise TypeError('dpi must be int')
+	if (dpi < 1): raise ValueError('dpi must be positive')
+	if (qrEncoding not in ('base64', 'base32')): raise ValueError('qrEncoding must be \'base64\' or \'base32\'')
+	_layout = layoutFor(fontname, size[0], size[1], BORDER)
+	_qrSize = _layout.qrSize
+	_maxModules = math.floor(((_qrSize / 72) * dpi) / dotsPerModule)
+	_maxVersion = min(40, (_maxModules - 17) // 4)
+	if (_maxVersion < 1): raise ValueError('page too small for the resolution, no QR-Code fits')
+	_maxBlockSize = min(MAX_BLOCK_SIZE, (_layout.textLines * 50) if (textLayer) else MAX_BLOCK_SIZE)
+	for _blockSize in range(_maxBlockSize - (_maxBlockSize % 50), 49, -50):
+		_parameters = qrParameters(_blockSize, qrEncoding, errorCorrection, _maxVersion)
+		if (_parameters is not None): break
+	else:
+		raise ValueError('page too small for the resolution and error correction level')
+	_modules = 17 + (4 * _parameters[0])
+	return {'size': tuple(size), 'dpi': dpi, 'qrEncoding': qrEncoding, 'textLayer': textLayer, 'blockSize': _blockSize,
+		'version': _parameters[0], 'errorCorrection': _parameters[1], 'modules': _modules, 'qrSize': _qrSize / mm,
+		'moduleSize': (_qrSize / mm) / _modules, 'dotsPerModule': ((_qrSize / 72) * dpi) / _modules}
+
+
+def expectedPages(blockSize: int, dataSize: int, parityGroupSize: int = None, blocksPerPage: int = 1, noMetaPage: bool = False) -> int:
+	"""
+	Returns the amount of pages of a backup of dataSize bytes (before compression), including parity pages and the first page
+	"""
+	_blocks = math.ceil(dataSize / blockSize)
+	if (parityGroupSize is not None): _blocks += math.ceil(_blocks / parityGroupSize)
+	return math.ceil(_blocks / blocksPerPage) + (0 if (noMetaPage) else 1)
+
+
+def formatPlan(plan: dict, dataSize: int = None, parityGroupSize: int = None) -> str:
+	"""
+	Returns a plan (see planPage) and the expected amount of pages for dataSize bytes as printable text
+	"""
+	_lines = [f'page format:       {plan["size"][0]} x {plan["size"][1]} mm at {plan["dpi"]} dpi, {"with" if (plan["textLayer"]) else "without"} text layer',
+		f'block size:        {plan["blockSize"]} bytes per page',
+		f'QR-Code:           version {plan["version"]} ({plan["modules"]} x {plan["modules"]} modules), error correction level {plan["errorCorrection"]}, {plan["qrEncoding"]} encoded',
+		f'QR-Code size:      {plan["qrSize"]:.1f} mm, modules of {plan["moduleSize"]:.2f} mm ({plan["dotsPerModule"]:.1f} dots)']
+	if (dataSize is not None):
+		_lines.append(f'expected pages:    {expectedPages(plan["blockSize"], dataSize, parityGroupSize)} for {dataSize} bytes (without compression)')
+	return '\n'.join(_lines)
@@ -41,4 +41,276 @@ class TestGeneration(unittest.TestCase):
 		self.assertEqual(type(self.testDocumentFile.getPDF()), bytes)
 
 		self.assertEqual(self.testDocumentStr.getData(), self.testDocumentBytes.getData())
-		
\ No newline at end of file
+		
+	def testWorkers(self):
+		self.assertRaises(TypeError, PaperStorage, workers='2') # string
+		self.assertRaises(ValueError, PaperStorage, workers=0) # too low
+
+		from reportlab import rl_config
+		_invariant = rl_config.invariant
+		rl_config.invariant = 1 # no timestamps / random ids in the pdf, so documents can be compared
+		try:
+			_serial = PaperStorage(bytes(self.testDataStr.encode('utf-8')), blockSize=500, writeDate=False, writeHostname=False)
+			_parallel = PaperStorage(bytes(self.testDataStr.encode('utf-8')), blockSize=500, writeDate=False, writeHostname=False, workers=2)
+			_parallel._documentID = _serial._documentID
+			self.assertEqual(_serial.getPDF(), _parallel.getPDF())
+		finally:
+			rl_config.invariant = _invariant
+
+	def testVectorQRCodes(self):
+		self.assertRaises(TypeError, PaperStorage, vectorQRCodes='yes') # string
+
+		_document = PaperStorage(bytes(self.testDataStr.encode('utf-8')), vectorQRCodes=True)
+		self.assertEqual(type(_document.getPDF()), bytes)
+		self.assertLess(len(_document.getPDF()), len(PaperStorage(bytes(self.testDataStr.encode('utf-8'))).getPDF())) # smaller than the raster images
+		import os
+		import tempfile
+		with tempfile.TemporaryDirectory() as _folder:
+			self.assertEqual(_document.savePDF(os.path.join(_folder, 'vector.pdf')), True)
+
+	def testStream(self):
+		import io
+		self.assertRaises(TypeError, PaperStorage.fromStream, stream=self.testDataStr) # not a file object
+
+		_document = PaperStorage.fromStream(io.BytesIO(bytes(self.testDataStr.encode('utf-8'))), blockSize=500, writeDate=False, writeHostname=False)
+		_pdf = _document.getPDF()
+		self.assertEqual(type(_pdf), bytes)
+		self.assertEqual(_document._dataSize, len(self.testDataStr.encode('utf-8')))
+		self.assertEqual(_document._amountOfBlocks, -(-len(self.testDataStr.encode('utf-8')) // 500))
+		self.assertEqual(_document.getPDF(), _pdf) # cached, the stream is already consumed
+		_document.setBackupType('Unittest')
+		self.assertEqual(_document.getPDF(), None) # cache invalidated, but the stream can't be read again
+		self.assertEqual(_document.getData(), None)
+		self.assertEqual(_document._formatVersion, 1) # size unknown, hcpb01 unless the block limit is known to be exceeded
+
+		import os
+		_read, _write = os.pipe() # e.g. otherapplication | python -m paperstorage
+		os.write(_write, bytes(self.testDataStr.encode('utf-8')))
+		os.close(_write)
+		with os.fdopen(_read, 'rb') as _pipe:
+			self.assertEqual(PaperStorage.fromStream(_pipe)._formatVersion, 1)
+
+		import tempfile
+		with open('paperstorage/tests/random_testfile', 'rb') as _file, tempfile.TemporaryDirectory() as _folder:
+			_document = PaperStorage.fromStream(_file)
+			self.assertEqual(_document._formatVersion, 1)
+			self.assertEqual(_document._identifier, 'paperstorage/tests/random_testfile')
+			self.assertEqual(_document.savePDF(os.path.join(_folder, 'stream.pdf')), True)
+
+	def testCachedRendering(self):
+		import io
+		self.assertRaises(TypeError, self.testDocumentBytes.writePDF, 'cached.pdf') # filename instead of file object
+
+		_direct = io.BytesIO()
+		self.assertEqual(self.testDocumentBytes.writePDF(_direct), True) # not cached, rendered directly
+		self.assertEqual(self.testDocumentBytes._renderedDocument, None)
+		_pdf = self.testDocumentBytes.getPDF()
+		import os
+		import tempfile
+		with tempfile.TemporaryDirectory() as _folder:
+			self.assertEqual(self.testDocumentBytes.savePDF(os.path.join(_folder, 'cached.pdf')), True)
+			with open(os.path.join(_folder, 'cached.pdf'), 'rb') as _file:
+				self.assertEqual(_file.read(), _pdf)
+		_cached = io.BytesIO()
+		self.assertEqual(self.testDocumentBytes.writePDF(_cached), True)
+		self.assertEqual(_cached.getvalue(), _pdf)
+
+		self.testDocumentBytes.setSoftwareIdentifier('Unittest')
+		self.assertEqual(self.testDocumentBytes._renderedDocument, None)
+		self.assertNotEqual(self.testDocumentBytes.getPDF(), None)
+		self.assertEqual(self.testDocumentEmpty.writePDF(io.BytesIO()), False)
+
+	def testFormatVersion(self):
+		self.assertRaises(ValueError, PaperStorage, formatVersion=3)
+		self.assertRaises(ValueError, PaperStorage, bytes(65537 * 50), blockSize=50, formatVersion=1) # too many blocks for hcpb01
+
+		self.assertEqual(self.testDocumentBytes._formatVersion, 1)
+		self.assertEqual(PaperStorage(bytes(65537 * 50), blockSize=50)._formatVersion, 2)
+		from paperstorage.encoding import encodeBlockPayload
+		self.assertEqual(encodeBlockPayload(1, b'AAA=', b'Unittest', 1), 'AAE=AAA=VW5pdHRlc3Q=')
+		self.assertRaises(ValueError, encodeBlockPayload, 1, b'AAAAAAAA', b'Unittest', 1) # hcpb02 document id
+		import os
+		import tempfile
+		_document = PaperStorage(bytes(self.testDataStr.encode('utf-8')), formatVersion=2)
+		with tempfile.TemporaryDirectory() as _folder:
+			self.assertEqual(_document.savePDF(os.path.join(_folder, 'hcpb02.pdf')), True)
+
+	def testCompression(self):
+		import io
+		import os
+		self.assertRaises(ValueError, PaperStorage, compression='zip')
+		self.assertRaises(ValueError, PaperStorage, bytes(1000), compression='zlib', formatVersion=1) # hcpb01 cannot record the codec
+
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_document = PaperStorage(_data, compression='auto')
+		self.assertIn(_document._compression, ('zlib', 'lzma', 'bz2'))
+		self.assertEqual(_document._formatVersion, 2)
+		self.assertLess(_document._dataSize, len(_data))
+		self.assertEqual(_document.getData(), _data)
+		self.assertIsNotNone(_document.getPDF())
+		self.assertIsNone(PaperStorage(os.urandom(5000), compression='auto')._compression) # incompressible
+		self.assertIsNotNone(PaperStorage.fromStream(io.BytesIO(_data), compression='lzma').getPDF())
+		_stream = PaperStorage.fromStream(io.BytesIO(_data), compression='auto', formatVersion=1) # hcpb01 cannot record the codec
+		self.assertIsNone(_stream._compression)
+		self.assertIsNotNone(_stream.getPDF())
+		self.assertRaises(ValueError, PaperStorage.fromStream, io.BytesIO(_data), compression='zlib', formatVersion=1)
+
+	def testParity(self):
+		self.assertRaises(TypeError, PaperStorage, parityGroupSize='4') # string
+		self.assertRaises(ValueError, PaperStorage, parityGroupSize=1) # too low
+		self.assertRaises(ValueError, PaperStorage, bytes(1000), parityGroupSize=4, formatVersion=1) # hcpb01 has no parity blocks
+
+		_document = PaperStorage(bytes(self.testDataStr.encode('utf-8')), blockSize=500, parityGroupSize=4)
+		self.assertEqual(_document._formatVersion, 2)
+		self.assertIsNotNone(_document.getPDF())
+		_payloads = [n for n, _block in _document._PaperStorage__blockPayloads()]
+		self.assertEqual(len(_payloads), 11 + 3) # 11 data blocks, 3 parity blocks
+		self.assertEqual([n[0] for n in _payloads[-3:]], ['%', '%', '%'])
+
+	def testGridLayout(self):
+		self.assertRaises(TypeError, PaperStorage, grid=2) # not a tupel
+		self.assertRaises(ValueError, PaperStorage, grid=(0, 2)) # no columns
+		self.assertRaises(ValueError, PaperStorage, grid=(8, 8)) # QR-Codes too small
+		self.assertRaises(TypeError, PaperStorage, textLayer='no') # string
+
+		import os
+		import tempfile
+		_document = PaperStorage(bytes(self.testDataStr.encode('utf-8')), blockSize=500, grid=(2, 2))
+		self.assertEqual(_document._formatVersion, 2)
+		with tempfile.TemporaryDirectory() as _folder:
+			self.assertEqual(_document.savePDF(os.path.join(_folder, 'grid.pdf')), True)
+		self.assertEqual(type(PaperStorage(bytes(self.testDataStr.encode('utf-8')), blockSize=300, grid=(3, 3), textLayer=False).getPDF()), bytes)
+		self.assertEqual(type(PaperStorage(bytes(self.testDataStr.encode('utf-8')), textLayer=False).getPDF()), bytes)
+
+	def testBatch(self):
+		import os
+		import tempfile
+		from paperstorage.batch import collectInputs, backupFiles, formatReport
+		with tempfile.TemporaryDirectory() as _folder:
+			os.makedirs(os.path.join(_folder, 'input', 'keys'))
+			with open(os.path.join(_folder, 'input', 'config'), 'wb') as _file: _file.write(bytes(self.testDataStr.encode('utf-8')))
+			with open(os.path.join(_folder, 'input', 'keys', 'key'), 'wb') as _file: _file.write(os.urandom(2000))
+			with open(os.path.join(_folder, 'manifest'), 'w') as _file: _file.write('# nightly\ninput/keys/key\n\ninput/missing\n')
+
+			_inputs = collectInputs(os.path.join(_folder, 'input'))
+			self.assertEqual([n[1] for n in _inputs], ['config', os.path.join('keys', 'key')])
+			self.assertRaises(ValueError, list, backupFiles(_inputs, _folder, workers=0))
+			self.assertRaises(TypeError, list, backupFiles(_inputs, _folder, blockSize='1000')) # checked before the first backup
+			self.assertRaises(TypeError, list, backupFiles(_inputs, _folder, pageSize=(210, 297))) # no such option
+			from unittest import mock
+			with mock.patch.object(PaperStorage, 'fromFile', side_effect=MemoryError('out of memory')):
+				_results = list(backupFiles(_inputs, os.path.join(_folder, 'failing')))
+			self.assertEqual([n['error'] for n in _results], ['MemoryError: out of memory'] * 2) # every file is tried
+			for _workers in (1, 2):
+				_results = sorted(backupFiles(_inputs, os.path.join(_folder, 'output'), workers=_workers, blockSize=1000), key=lambda n: n['input'])
+				self.assertEqual([n['error'] for n in _results], [None, None])
+				self.assertEqual([n['pages'] for n in _results], [1 + 6, 1 + 2])
+				self.assertTrue(os.path.isfile(os.path.join(_folder, 'output', 'keys', 'key.pdf'))) # the folders of the input files are mirrored
+
+			_results = list(backupFiles(collectInputs(os.path.join(_folder, 'manifest')), os.path.join(_folder, 'output')))
+			self.assertEqual(_results[0]['error'], None)
+			self.assertNotEqual(_results[1]['error'], None) # missing input files are reported, not raised
+			self.assertIn('1 of 2 files backed up', formatReport(_results))
+
+			os.makedirs(os.path.join(_folder, 'input', 'a'))
+			with open(os.path.join(_folder, 'input', 'a', 'b'), 'wb') as _file: _file.write(os.urandom(100))
+			with open(os.path.join(_folder, 'input', 'a_b'), 'wb') as _file: _file.write(os.urandom(100))
+			_results = list(backupFiles(collectInputs(os.path.join(_folder, 'input')), os.path.join(_folder, 'mirrored')))
+			self.assertEqual(sorted(os.path.relpath(n['output'], os.path.join(_folder, 'mirrored')) for n in _results),
+				sorted([os.path.join('a', 'b.pdf'), 'a_b.pdf', 'config.pdf', os.path.join('keys', 'key.pdf')])) # no longer the same PDF
+			self.assertRaises(ValueError, list, backupFiles([(os.path.join(_folder, 'input', 'config'), 'config')] * 2, _folder))
+
+
+	def testObserver(self):
+		from paperstorage.instrumentation import StatsCollector
+		_ps = PaperStorage.fromStr(self.testDataStr, blockSize=1000)
+		self.assertRaises(TypeError, _ps.setObserver, 'observer')
+		_blocks = []
+		_collector = StatsCollector(progress=lambda event, info: _blocks.append(info['n']))
+		_ps.setObserver(_collector)
+		self.assertNotEqual(_ps.getPDF(), None)
+		_stats = _collector.stats()
+		for n in ('hash', 'encode', 'qrDraw', 'text', 'save'):
+			self.assertIn(n, _stats['stages'])
+		self.assertEqual(_stats['pages'], _ps.getPageCount())
+		self.assertEqual(_stats['blocks'], _ps.getPageCount() - 1)
+		self.assertEqual(_blocks, list(range(1, _ps.getPageCount())))
+		self.assertIn('pages/s', _collector.report())
+
+
+	def testLayout(self):
+		from reportlab.pdfbase.pdfmetrics import stringWidth
+		from paperstorage.layout import metricsFor, layoutFor
+		self.assertRaises(ValueError, metricsFor, 'NoSuchFont')
+		self.assertTrue(metricsFor('Courier').monospaced())
+		self.assertFalse(metricsFor('Helvetica').monospaced())
+		for _text in ('MFRGGZDF MZTWQ2LK ', 'Übung', ''):
+			for _font in ('Courier', 'Helvetica'):
+				self.assertEqual(metricsFor(_font).width(_text, 7.3), stringWidth(_text, _font, 7.3))
+		_layout = layoutFor('Courier', *PaperStorage.A4, PaperStorage._border)
+		self.assertIs(layoutFor('Courier', *PaperStorage.A4, PaperStorage._border), _layout)
+		self.assertIsNone(self.testDocumentStr._layout) # the default layout is measured on first use
+		self.testDocumentStr.getQRRegionHint()
+		self.assertIs(self.testDocumentStr._layout, _layout)
+		self.assertEqual(_layout.fontsize, self.testDocumentStr._fontsize)
+		self.assertEqual(_layout.wrap('short line'), ['short line '])
+		_lines = _layout.wrap(self.testDataStr[:1000], maxWidth=300)
+		self.assertGreater(len(_lines), 1)
+		self.assertTrue(all(stringWidth(n.rstrip(' '), 'Courier', _layout.fontsize) <= 300 for n in _lines))
+		self.assertEqual(''.join(_lines), self.testDataStr[:1000] + ' ')
+
+	def testPlanner(self):
+		from paperstorage.planner import planPage, qrParameters, expectedPages
+		from paperstorage.encoding import encodeQRMatrix, encodeBlockPayload
+		_plan = planPage(PaperStorage.A4, 300, 'M')
+		self.assertEqual((_plan['blockSize'], _plan['version'], _plan['errorCorrection']), (1500, 38, 'M')) # 30 Base32 lines fit below the QR-Code
+		self.assertGreater(planPage(PaperStorage.A4, 300, 'M', textLayer=False)['blockSize'], 1500)
+		self.assertLess(planPage(PaperStorage.A4, 72, 'M')['version'], 38) # larger modules at a low resolution
+		for _level in 'LMQH': # never weaker than requested, the smallest version holding the block at that level
+			_version, _errorCorrection = qrParameters(500, errorCorrection=_level)
+			self.assertGreaterEqual('LMQH'.index(_errorCorrection), 'LMQH'.index(_level))
+			self.assertIsNone(qrParameters(500, errorCorrection=_level, maxVersion=(_version - 1)))
+		self.assertIsNone(qrParameters(2650, errorCorrection='H'))
+		self.assertRaises(ValueError, planPage, PaperStorage.A4, 300, 'X')
+		self.assertRaises(TypeError, planPage, PaperStorage.A4, 300.0)
+		self.assertEqual(expectedPages(1500, 3001, parityGroupSize=2), 6)
+		for _qrEncoding in ('base64', 'base32'):
+			_plan = planPage(PaperStorage.A4, 300, 'Q', _qrEncoding, textLayer=False)
+			_matrix = encodeQRMatrix(encodeBlockPayload(0, b'AAAAAAAA', bytes(_plan['blockSize']), 2, (_qrEncoding == 'base32')), parameters=(_plan['version'], _plan['errorCorrection']))
+			self.assertEqual(len(_matrix), _plan['modules'])
+
+		self.assertRaises(ValueError, PaperStorage, errorCorrection='X')
+		self.assertRaises(ValueError, PaperStorage, errorCorrection='M', formatVersion=1)
+		self.assertRaises(ValueError, PaperStorage, blockSize=1600) # too many Base32 lines for the page
+		_document = PaperStorage(bytes(self.testDataStr.encode('utf-8')), blockSize=1700, textLayer=False, errorCorrection='M')
+		self.assertEqual((_document._formatVersion, _document._qrParameters), (2, (40, 'M')))
+		self.assertEqual(type(_document.getPDF()), bytes)
+
+	def testImportTime(self):
+		import sys
+		import subprocess
+		def _imported(code: str) -> set:
+			_result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+			return {n.split('|')[-1].strip() for n in _result.stderr.splitlines() if n.startswith('import time:')}
+		_imports = _imported('import paperstorage, paperstorage.__main__')
+		self.assertTrue(_imports.isdisjoint({'qrcode', 'reportlab.pdfgen.canvas', 'reportlab.pdfbase.pdfmetrics', 'PIL', 'pyzbar.pyzbar', 'PIL.ImageOps', 'paperstorage.capture', 'paperstorage.batch', 'concurrent.futures.process'}))
+		_imports = _imported('from paperstorage import PaperStorage; PaperStorage().restoreFromQRString("hcpb01,AAA=,VGVzdA==,100,1500,0")') # restore path
+		self.assertTrue(_imports.isdisjoint({'qrcode', 'reportlab.pdfgen.canvas', 'reportlab.pdfbase.pdfmetrics'}))
+		_imports = _imported('from paperstorage import PaperStorage; PaperStorage(b"Test").getPDF()') # generation path
+		self.assertTrue({'qrcode', 'reportlab.pdfgen.canvas'} <= _imports)
+		self.assertTrue(_imports.isdisjoint({'pyzbar.pyzbar', 'PIL.ImageOps', 'concurrent.futures.process'}))
+
+	def testCommandLineRenderError(self):
+		import os
+		import sys
+		import tempfile
+		import subprocess
+		with tempfile.TemporaryDirectory() as _folder:
+			_output = os.path.join(_folder, 'backup.pdf')
+			_code = ('import sys; from paperstorage import PaperStorage; PaperStorage.MAX_BLOCKS = {1: 2, 2: 16777216}; from paperstorage.__main__ import main; ' # the third block fails while rendering
+				f'sys.argv = ["paperstorage", "-f", "paperstorage/tests/random_testfile", "-b", "50", "--format-version", "1", "-o", {_output!r}]; main()')
+			_result = subprocess.run([sys.executable, '-c', _code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+			self.assertEqual(_result.returncode, 1)
+			self.assertEqual(_result.stdout.strip(), 'Cannot create backup: data too large for the format version / block size')
+			self.assertEqual(_result.stderr, '') # no traceback
+			self.assertFalse(os.path.exists(_output))
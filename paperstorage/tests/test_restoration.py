@@ -1,5 +1,7 @@
 import unittest
-from paperstorage import PaperStorage
+import os
+import tempfile
+from paperstorage import PaperStorage, DecodeCache, DecodeLadder
 
 class TestRestoration(unittest.TestCase):
 
@@ -19,3 +21,376 @@ class TestRestoration(unittest.TestCase):
 
 		self.assertEqual(self.testDocument.getData(), bytes(self.testDataStr.encode('utf-8')))
 
+	def testRestoreWithWorkers(self):
+		self.assertRaises(ValueError, self.testDocument.restoreFromFolder, 'paperstorage/tests/sample_images', workers=0)
+
+		self.assertEqual(self.testDocument.restoreFromFolder('paperstorage/tests/sample_images', workers=2), False)
+		self.assertEqual(self.testDocument.getMissingDataBlocks(), [2])
+
+	def testDecodeCache(self):
+		self.assertRaises(ValueError, DecodeCache, maxEntries=0)
+		self.assertRaises(TypeError, self.testDocument.restoreFromFolder, 'paperstorage/tests/sample_images', decodeCache='cache.json')
+
+		with tempfile.TemporaryDirectory() as _folder:
+			_cache = DecodeCache(os.path.join(_folder, 'cache.json'), maxEntries=2, hashContent=True)
+			self.assertEqual(_cache.get('paperstorage/tests/random_testfile'), None)
+			_cache.set('paperstorage/tests/random_testfile', [])
+			_cache.set('paperstorage/tests/sample_images/unittest-scan-1.png', ['AAI=NhE=', 'AAM=NhE='])
+			self.assertEqual(_cache.get('paperstorage/tests/random_testfile'), [])
+			self.assertEqual(_cache.save(), True)
+
+			_cache = DecodeCache(os.path.join(_folder, 'cache.json'), maxEntries=2, hashContent=True)
+			self.assertEqual(_cache.get('paperstorage/tests/sample_images/unittest-scan-1.png'), ['AAI=NhE=', 'AAM=NhE='])
+			_cache.set('paperstorage/tests/sample_images/unittest-scan-2.png', [])
+			self.assertEqual(_cache.get('paperstorage/tests/random_testfile'), None) # least recently used, evicted
+			self.assertEqual(_cache.get('paperstorage/tests/sample_images/unittest-scan-1.png'), ['AAI=NhE=', 'AAM=NhE='])
+
+			_cache = DecodeCache(os.path.join(_folder, 'folder.json'))
+			self.assertEqual(self.testDocument.restoreFromFolder('paperstorage/tests/sample_images', decodeCache=_cache), False)
+			_cachedDocument = PaperStorage()
+			self.assertEqual(_cachedDocument.restoreFromFolder('paperstorage/tests/sample_images', decodeCache=_cache), False)
+			self.assertEqual(_cachedDocument.getMissingDataBlocks(), [2])
+
+	def testDecodeLadder(self):
+		import PIL.Image
+		self.assertRaises(TypeError, DecodeLadder, 'plain') # not a tupel
+		self.assertRaises(ValueError, DecodeLadder, ()) # no steps
+		self.assertRaises(ValueError, DecodeLadder, ('plain', 'denoise')) # unknown step
+		self.assertRaises(TypeError, self.testDocument.restoreFromFolder, 'paperstorage/tests/sample_images', decodeLadder=('plain',))
+
+		_ladder = DecodeLadder(('plain', 'binarize', 'rotate'))
+		self.assertEqual(_ladder.decode(PIL.Image.new('L', (300, 300), 255)), []) # no QR-Code, every step is tried
+		self.assertEqual([n['attempts'] for n in _ladder.stats().values()], [1, 1, 1])
+		self.assertEqual(len(_ladder.decode(PIL.Image.open('paperstorage/tests/sample_images/unittest-scan-1.png'))), 1)
+		self.assertEqual(_ladder.stats()['plain'], dict(_ladder.stats()['plain'], attempts=2, successes=1)) # readable, no escalation
+		self.assertEqual(_ladder.stats()['binarize']['attempts'], 1)
+		_ladder.merge(_ladder.stats())
+		self.assertEqual(_ladder.stats()['plain']['attempts'], 4)
+		_ladder.reset()
+		self.assertEqual(_ladder.stats()['plain']['attempts'], 0)
+
+		self.assertRaises(TypeError, DecodeLadder, regionHint=0.5) # not a tupel
+		self.assertRaises(ValueError, DecodeLadder, regionHint=(0.5, 0.1, 0.2, 0.9)) # right of left
+
+		for _workers in (1, 2):
+			_ladder = DecodeLadder()
+			_document = PaperStorage()
+			self.assertEqual(_document.restoreFromFolder('paperstorage/tests/sample_images', workers=_workers, decodeLadder=_ladder), False)
+			self.assertEqual(_document.getMissingDataBlocks(), [2])
+			self.assertEqual(_ladder.stats()['plain']['attempts'], 4) # counted in the worker processes as well
+
+	def testLocateQRRegion(self):
+		import random
+		import PIL.Image
+		import PIL.ImageDraw
+		from paperstorage.decoding import locateQRRegion
+		_page = PIL.Image.new('L', (3000, 4200), 255) # a large scan
+		_draw = PIL.ImageDraw.Draw(_page)
+		_random = random.Random(42)
+		for y in range(600, 2600, 40): # QR-Code like modules
+			for x in range(500, 2500, 40):
+				if (_random.random() < 0.5): _draw.rectangle((x, y, x + 39, y + 39), fill=0)
+		for y in range(2700, 3500, 50): # thin text lines
+			_draw.text((300, y), 'MFRGGZDFMZTWQ2LKNNWG23TPOBYXE43UOV3HO6DZPJQWEY3EMVTGO2DJNJVWY3LON5YHC', fill=0)
+		_box = locateQRRegion(_page, PaperStorage().getQRRegionHint())
+		self.assertTrue((_box[0] <= 500) and (_box[1] <= 600) and (_box[2] >= 2540) and (_box[3] >= 2640))
+		self.assertTrue((_box[0] >= 300) and (_box[1] >= 400) and (_box[2] <= 2750) and (_box[3] <= 2850)) # no text lines
+		self.assertEqual(locateQRRegion(PIL.Image.new('L', (3000, 4200), 255)), None) # blank page
+
+	def testRestoreFromFile(self):
+		import PIL.Image
+		self.assertRaises(TypeError, self.testDocument.restoreFromFile, None)
+
+		with tempfile.TemporaryDirectory() as _folder:
+			_scans = [PIL.Image.open(f'paperstorage/tests/sample_images/unittest-scan-{n}.png') for n in (1, 2, 3, 5)]
+			_scans[0].save(os.path.join(_folder, 'batch.tiff'), save_all=True, append_images=_scans[1:]) # one multi-page TIFF
+			self.assertEqual(self.testDocument.restoreFromFile(os.path.join(_folder, 'batch.tiff')), False)
+			self.assertEqual(self.testDocument.getMissingDataBlocks(), [2])
+			_document = PaperStorage()
+			self.assertEqual(_document.restoreFromFolder(_folder), False) # every frame, not only the first one
+			self.assertEqual(_document.getMissingDataBlocks(), [2])
+			self.assertEqual(PaperStorage().restoreFromFile('paperstorage/tests/random_testfile'), False) # no image
+
+	def testBlockStore(self):
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_blocks = [_data[n : (n + 100)] for n in range(0, len(_data), 100)]
+		self.assertEqual(self.testDocument.restoreMetaData('Unittest', len(_data), 'NhE=', 100), True)
+		self.assertEqual(self.testDocument.getMissingDataBlockCount(), len(_blocks))
+		for n in [0, 1, 2, 5, 9]:
+			self.assertEqual(self.testDocument.restoreDataBlock(n, _blocks[n], 'NhE='), True)
+		self.assertEqual(self.testDocument.restoreDataBlock(5, _blocks[5], 'NhE='), False) # duplicate
+		self.assertEqual(self.testDocument.restoreDataBlock(3, _blocks[3][:50], 'NhE='), False) # wrong size
+		self.assertEqual(self.testDocument.restoreDataBlock(3, _blocks[3], 'AAE='), False) # wrong document
+		self.assertEqual(self.testDocument.hasDataBlock(5), True)
+		self.assertEqual(self.testDocument.hasDataBlock(6), False)
+		self.assertEqual(self.testDocument.getMissingDataBlockCount(), len(_blocks) - 5)
+		self.assertEqual(self.testDocument.getMissingDataBlockRanges(), [(3, 4), (6, 8), (10, len(_blocks) - 1)])
+		self.assertEqual(self.testDocument.getMissingDataBlocks()[:5], [3, 4, 6, 7, 8])
+
+		with tempfile.TemporaryDirectory() as _folder:
+			self.assertEqual(self.testDocument.restoreToFile(os.path.join(_folder, 'restored')), True)
+			for n in reversed(range(len(_blocks))):
+				self.testDocument.restoreDataBlock(n, _blocks[n], 'NhE=')
+			self.assertEqual(self.testDocument.isDataReady(), True)
+			self.assertEqual(self.testDocument.getData(), _data)
+			self.testDocument._restoreFile.close()
+			with open(os.path.join(_folder, 'restored'), 'rb') as _file:
+				self.assertEqual(_file.read(), _data)
+
+		_document = PaperStorage() # no meta page, layout is derived from the blocks
+		for n in reversed(range(len(_blocks))):
+			self.assertEqual(_document.isDataReady(), False)
+			_document.restoreDataBlock(n, _blocks[n])
+		self.assertEqual(_document.getData(), _data)
+
+	def testLargeFormat(self):
+		from paperstorage.encoding import encodeBlockPayload
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_document = PaperStorage(_data, blockSize=100, formatVersion=2)
+		self.assertEqual(len(_document._documentID), 8)
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, _data[:100], 2) for n in range(_document.MAX_BLOCKS[1] + 1, _document.MAX_BLOCKS[1] + 3)] # beyond the hcpb01 limit
+		self.assertEqual(self.testDocument.restoreFromQRString(_qrStrings[0]), True)
+		self.assertEqual(self.testDocument.restoreFromQRString(_qrStrings[0]), False) # duplicate
+		self.assertEqual(self.testDocument.hasDataBlock(_document.MAX_BLOCKS[1] + 1), True)
+		self.assertEqual(self.testDocument.getMissingDataBlockCount(), _document.MAX_BLOCKS[1] + 1)
+		self.assertEqual(self.testDocument.restoreFromQRString('$AAAAInvalid!'), False)
+
+		_restored = PaperStorage()
+		self.assertEqual(_restored.restoreFromQRString(f'hcpb02,{_document._documentID.decode("ascii")},VW5pdHRlc3Q=,{len(_data)},100,0,x=1'), True) # unknown fields are ignored
+		_qrString = encodeBlockPayload(0, _document._documentID, _data[:100], 2)
+		self.assertEqual(_restored.restoreFromQRString(_qrString[:5] + 'AAAAAAAA' + _qrString[13:]), False) # wrong document
+		for n in range(-(-len(_data) // 100)):
+			self.assertEqual(_restored.restoreFromQRString(encodeBlockPayload(n, _document._documentID, _data[(n * 100) : ((n + 1) * 100)], 2)), True)
+		self.assertEqual(_restored.getData(), _data)
+		self.assertEqual(_restored._identifier, 'Unittest')
+
+	def testCompressedRestore(self):
+		from paperstorage.encoding import encodeBlockPayload
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_document = PaperStorage(_data, blockSize=100, compression='zlib')
+		_stored = _document._storedData
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, _stored[(n * 100) : ((n + 1) * 100)], 2) for n in range(-(-len(_stored) // 100))]
+		_metadata = f'hcpb02,{_document._documentID.decode("ascii")},VW5pdHRlc3Q=,{len(_stored)},100,0,c=zlib,o={len(_data)}'
+
+		self.assertEqual(PaperStorage().restoreFromQRString(_metadata.replace('c=zlib', 'c=zip')), False) # unknown codec
+		self.assertEqual(self.testDocument.restoreFromQRString(_metadata), True)
+		for _qrString in _qrStrings:
+			self.assertEqual(self.testDocument.restoreFromQRString(_qrString), True)
+		self.assertEqual(self.testDocument.getData(), _data)
+
+		_filename = os.path.join(tempfile.mkdtemp(), 'restored')
+		_restored = PaperStorage()
+		self.assertEqual(_restored.restoreToFile(_filename), True)
+		for _qrString in reversed(_qrStrings + [_metadata]):
+			_restored.restoreFromQRString(_qrString)
+		self.assertEqual(_restored.isDataReady(), True)
+		self.assertEqual(_restored.getData(), _data)
+		with open(_filename, 'rb') as _file:
+			self.assertEqual(_file.read(), _data)
+
+	def testParity(self):
+		from paperstorage.encoding import encodeBlockPayload, encodeParityPayload
+		from paperstorage.blockstore import xorBlocks
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_blocks = [_data[n : (n + 500)] for n in range(0, len(_data), 500)]
+		_document = PaperStorage(_data, blockSize=500, parityGroupSize=4)
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, _blocks[n], 2) for n in range(len(_blocks))]
+		_parityStrings = [encodeParityPayload(n // 4, _document._documentID, xorBlocks(_blocks[n : (n + 4)], 500)) for n in range(0, len(_blocks), 4)]
+		_metadata = f'hcpb02,{_document._documentID.decode("ascii")},VW5pdHRlc3Q=,{len(_data)},500,0,p=4'
+
+		for _qrString in _parityStrings + _qrStrings[1:9] + _qrStrings[10:]: # one block missing in two groups, read before the meta data
+			self.assertEqual(self.testDocument.restoreFromQRString(_qrString), True)
+		self.assertEqual(self.testDocument.restoreFromQRString(_parityStrings[0]), False) # duplicate
+		self.assertEqual(self.testDocument.isDataReady(), False)
+		self.assertEqual(self.testDocument.restoreFromQRString(_metadata), True)
+		self.assertEqual(self.testDocument.getMissingDataBlocks(), [])
+		self.assertEqual(self.testDocument.getData(), _data)
+
+		_restored = PaperStorage()
+		_restored.restoreFromQRString(_metadata)
+		for _qrString in _qrStrings[2:] + _parityStrings: # two blocks of the same group missing
+			_restored.restoreFromQRString(_qrString)
+		self.assertEqual(_restored.getMissingDataBlocks(), [0, 1])
+		self.assertEqual(_restored.restoreFromQRString(_qrStrings[1]), True) # rebuilds block 0
+		self.assertEqual(_restored.getData(), _data)
+
+	def testGridLayout(self):
+		self.assertEqual(self.testDocument.getPageOfDataBlock(3), 5) # one block per page
+		self.assertEqual(self.testDocument.getBlocksPerPage(), 1)
+		self.assertEqual(self.testDocument.restoreFromQRString('hcpb02,AAAAAAAA,VW5pdHRlc3Q=,5000,100,0,b=4'), True)
+		self.assertEqual(self.testDocument.getBlocksPerPage(), 4)
+		self.assertEqual(self.testDocument.getPageOfDataBlock(3), 2)
+		self.assertEqual(self.testDocument.getPageOfDataBlock(4), 3)
+		self.assertEqual(self.testDocument.restoreDataBlock(5, bytes(100)), True)
+		self.assertEqual(self.testDocument.restoreDataBlock(18, bytes(100)), True)
+		self.assertEqual(self.testDocument.getMissingPageRanges(), [(2, 14)]) # no page is complete
+		for n in range(20, 28):
+			self.testDocument.restoreDataBlock(n, bytes(100))
+		self.assertEqual(self.testDocument.getMissingPageRanges(), [(2, 6), (9, 14)])
+
+	def testPlannedQRCodes(self):
+		_metadata = 'hcpb02,AAAAAAAA,VW5pdHRlc3Q=,5000,100,0,v=11,e=H'
+		self.assertEqual(PaperStorage().restoreFromQRString(_metadata.replace('e=H', 'e=X')), False) # unknown error correction level
+		self.assertEqual(PaperStorage().restoreFromQRString(_metadata.replace(',e=H', '')), False) # version without level
+		self.assertEqual(PaperStorage().restoreFromQRString(_metadata.replace('v=11', 'v=10')), False) # block does not fit
+		self.assertEqual(PaperStorage().restoreFromQRString(_metadata.replace('v=11', 'v=41')), False)
+		self.assertRaises(TypeError, self.testDocument.restoreMetaData, 'Unittest', 5000, blockSize=100, qrVersion='11', errorCorrection='H')
+		self.assertEqual(self.testDocument.restoreFromQRString(_metadata), True)
+		self.assertEqual(self.testDocument._qrParameters, (11, 'H'))
+
+	def testBase32Payloads(self):
+		from paperstorage.encoding import encodeBlockPayload, encodeParityPayload, encodeQRMatrix
+		from paperstorage.blockstore import xorBlocks
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_blocks = [_data[n : (n + 500)] for n in range(0, len(_data), 500)]
+		_document = PaperStorage(_data, blockSize=500, qrEncoding='base32')
+		self.assertEqual(_document._formatVersion, 2)
+		self.assertRaises(ValueError, PaperStorage, _data, formatVersion=1, qrEncoding='base32')
+		self.assertRaises(ValueError, PaperStorage, _data, qrEncoding='base85')
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, _blocks[n], 2, True) for n in range(len(_blocks))]
+		_parityString = encodeParityPayload(0, _document._documentID, xorBlocks(_blocks[0:2], 500), True)
+		self.assertTrue(all(set(n) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZ234567*:') for n in _qrStrings + [_parityString])) # alphanumeric mode only
+		_random = os.urandom(1500)
+		self.assertLess(len(encodeQRMatrix(encodeBlockPayload(0, b'AAAAAAAA', _random, 2, True), True)), len(encodeQRMatrix(encodeBlockPayload(0, b'AAAAAAAA', _random, 2), True)))
+
+		self.assertEqual(self.testDocument.restoreFromQRString(f'hcpb02,{_document._documentID.decode("ascii")},VW5pdHRlc3Q=,{len(_data)},500,0,p=2'), True)
+		self.assertEqual(self.testDocument.restoreFromQRString(_parityString), True)
+		for _qrString in _qrStrings[1:]: # raw bytes, as returned by pyzbar
+			self.assertEqual(self.testDocument.restoreFromQRString(_qrString.encode('ascii')), True)
+		self.assertEqual(self.testDocument.restoreFromQRString(_qrStrings[1]), False) # duplicate
+		self.assertEqual(self.testDocument.restoreFromQRString(encodeBlockPayload(0, b'BBBBBBBB', _blocks[0], 2, True)), False) # other document
+		self.assertEqual(self.testDocument.getData(), _data) # block 0 rebuilt from the parity block
+
+	def testCapturePipeline(self):
+		import PIL.Image
+		from paperstorage.capture import CapturePipeline
+		self.assertRaises(TypeError, CapturePipeline, None) # not callable
+		self.assertRaises(ValueError, CapturePipeline, list, workers=0)
+
+		_frames = [PIL.Image.new('RGB', (64, 36), (n * 40, 0, 0)) for n in range(5) for _ in range(3)] # every frame three times
+		def _grabFrame():
+			return _frames.pop(0) if (len(_frames) > 0) else None
+		_pipeline = CapturePipeline(_grabFrame, workers=2, queueSize=len(_frames), duplicateTimeout=60, # room for every frame, none is dropped however slow the decoders are
+			decode=lambda frame: [str(frame.getpixel((0, 0))[0])])
+		_results = [n for _qrStrings in _pipeline.results() for n in _qrStrings]
+		self.assertEqual(sorted(_results, key=int), ['0', '40', '80', '120', '160'])
+		_stats = _pipeline.stats()
+		self.assertEqual(_stats['captured'], 15)
+		self.assertEqual(_stats['dropped'], 0)
+		self.assertEqual(_stats['decoded'], 5)
+		self.assertEqual(_stats['skipped'], 10) # near-duplicates
+		self.assertEqual(_stats['captured'], _stats['dropped'] + _stats['skipped'] + _stats['decoded'])
+
+		_failing = CapturePipeline(lambda: 1 / 0)
+		with self.assertRaises(ZeroDivisionError):
+			list(_failing.results())
+
+	def testAsyncRestore(self):
+		import asyncio
+		from paperstorage.asyncrestore import AsyncRestore
+		from paperstorage.encoding import encodeBlockPayload, encodeParityPayload
+		from paperstorage.blockstore import xorBlocks
+		self.assertRaises(ValueError, AsyncRestore, self.testDocument, maxConcurrency=0)
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_blocks = [_data[n : (n + 500)] for n in range(0, len(_data), 500)]
+		_document = PaperStorage(_data, blockSize=500, parityGroupSize=4)
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, _blocks[n], 2) for n in range(len(_blocks))]
+		_parityString = encodeParityPayload(0, _document._documentID, xorBlocks(_blocks[0:4], 500))
+		_metadata = f'hcpb02,{_document._documentID.decode("ascii")},VW5pdHRlc3Q=,{len(_data)},500,0,p=4'
+		_observed = []
+		self.testDocument.setObserver(lambda event, info: _observed.append(event))
+		_session = AsyncRestore(self.testDocument, maxConcurrency=1) # every image is decoded before the next item is read
+
+		async def _source(): # e.g. a queue of a scanning service
+			for _item in [_metadata, _qrStrings[1], _qrStrings[1], encodeBlockPayload(2, b'BBBBBBBB', _blocks[2], 2), 'no QR-Code']:
+				yield _item
+			with open('paperstorage/tests/sample_images/unittest-scan-2.png', 'rb') as _file: # a page of another backup
+				yield _file.read()
+			for _item in [_parityString] + _qrStrings[2:] + ['never read']:
+				yield _item
+
+		async def _restore():
+			return [n async for n in _session.restoreEvents(_source())]
+		_loop = asyncio.new_event_loop()
+		try:
+			_events = _loop.run_until_complete(_restore())
+			_loop.run_until_complete(_loop.shutdown_asyncgens()) # the source is not read to the end
+		finally:
+			_loop.close()
+		self.assertEqual([n[0] for n in _events[:5]], ['metadata', 'blockReceived', 'duplicate', 'wrongDocument', 'invalid'])
+		self.assertEqual(_events[0][1]['missing'], len(_blocks))
+		self.assertEqual(_events[1][1], {'kind': 'data', 'id': 1, 'missing': len(_blocks) - 1})
+		self.assertEqual(_events[5], ('image', {'n': 1, 'codes': 1, 'seconds': _events[5][1]['seconds']}))
+		self.assertEqual(_events[6][0], 'wrongDocument')
+		self.assertEqual(_events[-1], ('complete', {'images': 1, 'codes': len(_blocks) + 5}))
+		self.assertEqual(_session.isComplete(), True)
+		self.assertEqual(self.testDocument.getData(), _data) # block 0 rebuilt from the parity block
+		self.assertEqual(_observed.count('qrCode'), len(_blocks) + 5) # the observer set before the session still receives all events
+
+		async def _concurrent(): # several sessions driven by one event loop
+			_sessions = [AsyncRestore(PaperStorage()) for n in range(3)]
+			for _session in _sessions:
+				_session.feedQRString(_metadata)
+			_images = [open('paperstorage/tests/sample_images/unittest-scan-2.png', 'rb').read()] * 2
+			_results = await asyncio.gather(*[n.feedImage(_image) for n in _sessions for _image in _images])
+			for _qrString in _qrStrings:
+				for _session in _sessions: _session.feedQRString(_qrString)
+			return _results, [n.isComplete() for n in _sessions]
+		_loop = asyncio.new_event_loop()
+		try:
+			_results, _complete = _loop.run_until_complete(_concurrent())
+		finally:
+			_loop.close()
+		self.assertEqual([n[0][0] for n in _results], ['image'] * 6)
+		self.assertEqual(_complete, [True] * 3)
+
+	def testCheckpoint(self):
+		from paperstorage.encoding import encodeBlockPayload
+		_data = bytes(self.testDataStr.encode('utf-8'))
+		_blocks = [_data[n : (n + 500)] for n in range(0, len(_data), 500)]
+		_document = PaperStorage(_data, blockSize=500, formatVersion=2)
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, _blocks[n], 2) for n in range(len(_blocks))]
+		_metadata = f'hcpb02,{_document._documentID.decode("ascii")},VW5pdHRlc3Q=,{len(_data)},500,0'
+		with tempfile.TemporaryDirectory() as _folder:
+			_checkpoint = os.path.join(_folder, 'restore.checkpoint')
+			self.assertRaises(ValueError, PaperStorage.resume, _folder) # a folder
+			_interrupted = PaperStorage.resume(_checkpoint)
+			for _qrString in [_metadata, _metadata, _qrStrings[0], _qrStrings[0], 'no QR-Code', _qrStrings[3].encode('ascii')]:
+				_interrupted.restoreFromQRString(_qrString)
+			with open(_checkpoint, 'rb') as _file:
+				self.assertEqual(_file.read().count(b'\n'), 3) # neither duplicates nor invalid strings are recorded
+			with open(_checkpoint, 'ab') as _file:
+				_file.write(_qrStrings[4][:100].encode('ascii')) # cut off by a crash
+
+			_resumed = PaperStorage.resume(_checkpoint)
+			self.assertEqual(_resumed.getMissingDataBlocks(), [n for n in range(len(_blocks)) if (n not in (0, 3))])
+			for _qrString in _qrStrings[1:]:
+				_resumed.restoreFromQRString(_qrString)
+			self.assertEqual(_resumed.getData(), _data)
+			self.assertEqual(_resumed.setCheckpoint(None), True)
+			with open(_checkpoint, 'rb') as _file:
+				self.assertEqual(_file.read().split(b'\n')[-2:], [_qrStrings[-1].encode('ascii'), b''])
+			_restored = PaperStorage.resume(_checkpoint)
+			self.assertEqual(_restored.getData(), _data)
+			_restored.setCheckpoint(None)
+
+	def testGridRegion(self):
+		import PIL.Image
+		from paperstorage.encoding import encodeBlockPayload, encodeQRMatrix
+		_document = PaperStorage(bytes(3000), blockSize=500, grid=(2, 3), textLayer=False)
+		_qrStrings = [encodeBlockPayload(n, _document._documentID, bytes([n]) * 500, 2) for n in range(6)]
+		_page = PIL.Image.new('L', (2480, 3508), 255) # A4 at 300 dpi, the rows of the grid reach down to the footer
+		_left, _top, _right, _bottom = _document.getQRRegionHint()
+		_cellSize = min(int(((_right - _left) * 2480) / 2), int(((_bottom - _top) * 3508) / 3))
+		for n, _qrString in enumerate(_qrStrings):
+			_matrix = encodeQRMatrix(_qrString, True)
+			_code = PIL.Image.new('L', (len(_matrix), len(_matrix)), 255)
+			_code.putdata([(0 if _module else 255) for _row in _matrix for _module in _row])
+			_page.paste(_code.resize((_cellSize - 60, _cellSize - 60), PIL.Image.NEAREST), (int(_left * 2480) + ((n % 2) * _cellSize) + 30, int(_top * 3508) + ((n // 2) * _cellSize) + 30))
+		self.assertGreater(((_top * 3508) + (3 * _cellSize)) / 3508, 0.9)
+
+		self.assertTrue(set(_qrStrings) <= set(DecodeLadder(('plain',), PaperStorage().getQRRegionHint()).decode(_page)))
+		_ladder = DecodeLadder(('plain',), (_left, _top, _right, 0.35), codesPerPage=6) # a region with the first row only
+		self.assertTrue(set(_qrStrings) <= set(_ladder.decode(_page))) # the whole image is decoded as well
+		self.assertEqual(_ladder.stats()['region']['successes'], 0)
+		self.assertRaises(ValueError, DecodeLadder, codesPerPage=0)
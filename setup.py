@@ -31,7 +31,7 @@ setuptools.setup(
 		"qrcode>=6.1", "reportlab>=3.5", "six>=1.15", "Pillow>=8.1.0", "pyzbar>=0.1.8"
 	],
 	extras_require = {
-		'full':  [ "pygame~=2.0.0" ],
+		'full':  [ "pygame~=2.0.0", "pymupdf>=1.18" ],
 	},
 	python_requires='>=3.6',
 )
\ No newline at end of file